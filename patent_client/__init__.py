@@ -1,22 +1,14 @@
 # flake8: noqa
 # nopycln: file
-import time
-
-import patent_client.patches  # noqa # Run patching code
-
-from .version import __version__  # noqa
-
-start = time.time()
-
+import importlib
+import logging
 from pathlib import Path
 
 from .settings import Settings
+from .version import __version__  # noqa
 
 SETTINGS = Settings()
 
-import logging
-import logging.handlers
-
 # Revert base directory to local if there's an access problem
 
 BASE_DIR = SETTINGS.base_dir
@@ -29,30 +21,49 @@ except OSError:
 
 LOG_FILENAME = BASE_DIR / SETTINGS.log_file
 CACHE_DIR = BASE_DIR / "cache"
-CACHE_DIR.mkdir(exist_ok=True, parents=True)
 
 # Set up a specific logger with our desired output level
 logger = logging.getLogger(__name__)
 logger.setLevel(SETTINGS.log_level)
 
 
-# Add the log message handler to the logger
-handler = logging.FileHandler(LOG_FILENAME)
+# Add the log message handler to the logger. The file is opened on the first record.
+handler = logging.FileHandler(LOG_FILENAME, delay=True)
 handler.setFormatter(logging.Formatter("%(asctime)s:%(levelname)s:%(name)s:%(message)s"))
 logger.addHandler(handler)
 
-logger.info(f"Starting Patent Client with log level {SETTINGS.log_level}")
+# The models are imported from ._sync on first access, so that `import patent_client` stays
+# cheap for callers that only need one of them
+_lazy_imports = [
+    "Inpadoc",
+    "Assignment",
+    "USApplication",
+    "PtabDecision",
+    "PtabDocument",
+    "PtabProceeding",
+    "GlobalDossier",
+    "GlobalDossierApplication",
+    "PublicSearchBiblio",
+    "PublicSearchDocument",
+    "Patent",
+    "PatentBiblio",
+    "PublishedApplication",
+    "PublishedApplicationBiblio",
+    "odp",
+]
+
+
+def __getattr__(name):
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("._sync", __name__), name)
+    globals()[name] = value
+    return value
 
-try:
-    from ._sync import *
-except ImportError:
-    pass
 
-elapsed = time.time() - start
-logger.info(f"Startup Complete!, took {elapsed:.3f} seconds")
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
 
-cache_dir = Path("~/.patent_client/cache").expanduser()
-cache_dir.parent.mkdir(exist_ok=True, parents=True)
 
 __all__ = [
     "Inpadoc",
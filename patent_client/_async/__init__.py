@@ -1,17 +1,39 @@
-from . import odp
-from .epo.ops.published.model import Inpadoc
-from .uspto.assignment.model import Assignment
-from .uspto.global_dossier.model import GlobalDossier, GlobalDossierApplication
-from .uspto.peds.model import USApplication
-from .uspto.ptab.model import PtabDecision, PtabDocument, PtabProceeding
-from .uspto.public_search.model import (
-    Patent,
-    PatentBiblio,
-    PublicSearchBiblio,
-    PublicSearchDocument,
-    PublishedApplication,
-    PublishedApplicationBiblio,
-)
+import importlib
+
+# Public name -> module it is imported from on first access
+_lazy_imports = {
+    "odp": ".odp",
+    "Inpadoc": ".epo.ops.published.model",
+    "Assignment": ".uspto.assignment.model",
+    "GlobalDossier": ".uspto.global_dossier.model",
+    "GlobalDossierApplication": ".uspto.global_dossier.model",
+    "USApplication": ".uspto.peds.model",
+    "PtabDecision": ".uspto.ptab.model",
+    "PtabDocument": ".uspto.ptab.model",
+    "PtabProceeding": ".uspto.ptab.model",
+    "Patent": ".uspto.public_search.model",
+    "PatentBiblio": ".uspto.public_search.model",
+    "PublicSearchBiblio": ".uspto.public_search.model",
+    "PublicSearchDocument": ".uspto.public_search.model",
+    "PublishedApplication": ".uspto.public_search.model",
+    "PublishedApplicationBiblio": ".uspto.public_search.model",
+}
+
+
+def __getattr__(name):
+    try:
+        module_name = _lazy_imports[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = importlib.import_module(module_name, __name__)
+    value = module if module_name == f".{name}" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
+
 
 __all__ = [
     "Inpadoc",
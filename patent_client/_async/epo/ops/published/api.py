@@ -1,8 +1,13 @@
 import logging
+import re
+import typing as tp
 from io import BytesIO
 
+from lxml import etree
 from yankee.data import AttrDict
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
+
 from ..session import session
 from .model.biblio import BiblioResult
 from .model.fulltext import Claims, Description
@@ -11,8 +16,54 @@ from .model.search import Search
 
 logger = logging.getLogger(__name__)
 
+EXCHANGE_NS = "http://www.epo.org/exchange"
+NUMBER_RE = re.compile(r"^(?P<country>[A-Z]{2})\.?(?P<number>[0-9A-Z]+?)\.?(?P<kind>[A-Z][0-9]?)?$")
+
+
+def split_exchange_documents(
+    text: str, numbers: tp.Iterable[str], match_kind: bool = True
+) -> tp.Dict[str, str]:
+    """Split a multi-document OPS response into one response per requested number
+
+    Each exchange-document is matched to a number by its country, doc-number and, if the
+    number has one and match_kind is True, kind attributes. Each returned document keeps
+    the envelope of the original response, so it parses like a single-document response.
+    Numbers with no matching document are left out.
+    """
+    root = etree.fromstring(text.encode("utf-8"))
+    documents = list()
+    for doc in root.iter(f"{{{EXCHANGE_NS}}}exchange-document"):
+        documents.append((doc.getparent(), doc))
+    for parent, doc in documents:
+        parent.remove(doc)
+    results = dict()
+    for number in numbers:
+        match = NUMBER_RE.match(number.replace(" ", "").upper())
+        if match is None:
+            continue
+        matches = [
+            (parent, doc)
+            for parent, doc in documents
+            if doc.get("country") == match.group("country")
+            and doc.get("doc-number") == match.group("number")
+            and (
+                not match_kind or not match.group("kind") or doc.get("kind") == match.group("kind")
+            )
+        ]
+        if not matches:
+            continue
+        for parent, doc in matches:
+            parent.append(doc)
+        results[number] = etree.tostring(root, encoding="unicode")
+        for parent, doc in matches:
+            parent.remove(doc)
+    return results
+
 
 class PublishedBiblioApi:
+    # Published-data POST requests accept up to 100 numbers
+    batch_size = 100
+
     @classmethod
     async def get_constituents(
         cls, number, doc_type="publication", format="docdb", constituents=("biblio",)
@@ -31,6 +82,7 @@ class PublishedBiblioApi:
             constituents = (constituents,)
         url = base_url + ",".join(constituents)
         response = await session.get(url)
+        response.raise_for_status()
         return response.text
 
     @classmethod
@@ -46,6 +98,107 @@ class PublishedBiblioApi:
     async def get_full_cycle(cls, number, doc_type="publication", format="docdb"):
         return await cls.get_constituents(number, doc_type, format, constituents="full-cycle")
 
+    @classmethod
+    async def get_constituents_many(
+        cls,
+        numbers,
+        doc_type="publication",
+        format="docdb",
+        constituents=("biblio",),
+        concurrency=DEFAULT_CONCURRENCY,
+        return_exceptions=False,
+    ) -> tp.Dict[str, str]:
+        """Batch form of get_constituents
+
+        Numbers are sent in POST requests of up to `batch_size` numbers each, and the
+        responses are split back into one XML document per number. Numbers that OPS
+        doesn't return are missing from the result.
+
+        If a batch request fails, the numbers in that batch are looked up one by one. Numbers
+        whose own lookup fails are left out too, unless `return_exceptions` is True, in which
+        case they map to the exception.
+        """
+        if isinstance(constituents, str):
+            constituents = (constituents,)
+        url = (
+            f"http://ops.epo.org/3.2/rest-services/published-data/{doc_type}/{format}/"
+            + ",".join(constituents)
+        )
+        unique = list(dict.fromkeys(numbers))
+        chunks = [unique[i : i + cls.batch_size] for i in range(0, len(unique), cls.batch_size)]
+
+        async def post_chunk(chunk):
+            response = await session.post(
+                url,
+                content=",".join(chunk),
+                headers={"Content-Type": "text/plain"},
+                extensions={"idempotent": True},  # A lookup, so safe to retry
+            )
+            if response.status_code == 404:  # None of the numbers were found
+                return dict()
+            response.raise_for_status()
+            # Full-cycle responses include every publication stage, whatever kind was asked for
+            match_kind = "full-cycle" not in constituents
+            return split_exchange_documents(response.text, chunk, match_kind=match_kind)
+
+        async def get_one(number):
+            return await cls.get_constituents(number, doc_type, format, constituents)
+
+        results = dict()
+        failed = list()
+        chunk_results = abounded_map(post_chunk, chunks, limit=concurrency, return_exceptions=True)
+        for chunk, chunk_result in zip(chunks, [result async for result in chunk_results]):
+            if isinstance(chunk_result, Exception):
+                logger.warning(
+                    f"Batch lookup of {len(chunk)} numbers failed ({chunk_result!r}), looking them up one by one"
+                )
+                failed += chunk
+            else:
+                results.update(chunk_result)
+        texts = abounded_map(get_one, failed, limit=concurrency, return_exceptions=True)
+        for number, text in zip(failed, [text async for text in texts]):
+            if not isinstance(text, Exception) or return_exceptions:
+                results[number] = text
+        return results
+
+    @classmethod
+    async def get_biblio_many(
+        cls,
+        numbers,
+        doc_type="publication",
+        format="docdb",
+        concurrency=DEFAULT_CONCURRENCY,
+        return_exceptions=False,
+    ) -> tp.Dict[str, "BiblioResult"]:
+        texts = await cls.get_constituents_many(
+            numbers,
+            doc_type,
+            format,
+            constituents="biblio",
+            concurrency=concurrency,
+            return_exceptions=return_exceptions,
+        )
+        return {
+            number: text if isinstance(text, Exception) else BiblioResult.model_validate(text)
+            for number, text in texts.items()
+        }
+
+    @classmethod
+    async def get_abstract_many(
+        cls, numbers, doc_type="publication", format="docdb", concurrency=DEFAULT_CONCURRENCY
+    ) -> tp.Dict[str, str]:
+        return await cls.get_constituents_many(
+            numbers, doc_type, format, constituents="abstract", concurrency=concurrency
+        )
+
+    @classmethod
+    async def get_full_cycle_many(
+        cls, numbers, doc_type="publication", format="docdb", concurrency=DEFAULT_CONCURRENCY
+    ) -> tp.Dict[str, str]:
+        return await cls.get_constituents_many(
+            numbers, doc_type, format, constituents="full-cycle", concurrency=concurrency
+        )
+
 
 class PublishedFulltextApi:
     fulltext_jurisdictions = "EP, WO, AT, BE, BG, CA, CH, CY, CZ, DK, EE, ES, FR, GB, GR, HR, IE, IT, LT, LU, MC, MD, ME, NO, PL, PT, RO, RS, SE, SK".split(
@@ -122,8 +275,8 @@ class PublishedImagesApi:
         response = await session.get(
             f"https://ops.epo.org/3.2/rest-services/published-data/images/{country}/{number}/{kind}/{image_type}.{image_format}",
             params={"Range": page_number},
-            extensions={"force_cache": True},
         )
+        response.raise_for_status()
         return BytesIO(response.content)
 
     @classmethod
@@ -131,8 +284,8 @@ class PublishedImagesApi:
         response = await session.get(
             f"https://ops.epo.org/3.2/rest-services/{link}.{image_format}",
             params={"Range": page_number},
-            extensions={"force_cache": True},
         )
+        response.raise_for_status()
         return BytesIO(response.content)
 
 
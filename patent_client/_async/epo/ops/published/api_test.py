@@ -1,9 +1,17 @@
 import json
+from io import BytesIO
 from pathlib import Path
 
+import httpx
 import pytest
+from pypdf import PdfReader, PdfWriter
 
-from .api import PublishedApi
+from patent_client._async.http_client import PatentClientSession
+
+from . import api as api_module
+from .api import PublishedApi, split_exchange_documents
+from .model import InpadocBiblio
+from .model.images import ImageDocument, Section
 
 fixture_dir = Path(__file__).parent / "fixtures"
 
@@ -64,3 +72,182 @@ class TestFullTextAsyncApi:
         expected = json.loads(expected_file.read_text())
         actual = json.loads(result.model_dump_json())
         assert actual == expected
+
+
+def batch_response_text():
+    """The EP1000000 full-cycle response (kinds A1 and B1) plus a copy renumbered as EP1000001"""
+    text = (fixture_dir / "ep1000000_full_cycle_result.xml").read_text(encoding="utf8")
+    start = text.index("<exchange-documents>")
+    end = text.index("</exchange-documents>") + len("</exchange-documents>")
+    copy = text[start:end].replace('doc-number="1000000"', 'doc-number="1000001"')
+    return text[:end] + copy + text[end:]
+
+
+class TestBatchBiblioApi:
+    def test_split_exchange_documents(self):
+        numbers = ["EP1000000.A1", "EP1000000", "EP1000001B1", "EP5"]
+        split = split_exchange_documents(batch_response_text(), numbers)
+        assert list(split) == numbers[:3]
+        assert split["EP1000000.A1"].count("<exchange-document ") == 1
+        assert split["EP1000000"].count("<exchange-document ") == 2
+        assert 'doc-number="1000001" kind="B1"' in split["EP1000001B1"]
+        assert "1000001" not in split["EP1000000"]
+        unmatched_kind = split_exchange_documents(batch_response_text(), numbers, match_kind=False)
+        assert unmatched_kind["EP1000000.A1"].count("<exchange-document ") == 2
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_get_biblio_many(self, monkeypatch):
+        requests = list()
+
+        def handler(request):
+            requests.append((request.method, request.content.decode()))
+            if request.method == "GET":
+                return httpx.Response(404)
+            return httpx.Response(200, text=batch_response_text())
+
+        session = PatentClientSession(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(api_module, "session", session)
+        monkeypatch.setattr(PublishedApi.biblio, "batch_size", 2)
+        numbers = ["EP1000000.A1", "EP1000001.B1", "EP1000000.A1", "EP1000000"]
+        results = await PublishedApi.biblio.get_biblio_many(numbers)
+        assert requests == [("POST", "EP1000000.A1,EP1000001.B1"), ("POST", "EP1000000")]
+        assert [doc.kind for doc in results["EP1000000"].documents] == ["A1", "B1"]
+        assert results["EP1000001.B1"].documents[0].doc_number == "1000001"
+
+        requests.clear()
+        docs = await InpadocBiblio.objects.get_many(numbers + ["EP5"])
+        assert [doc.kind for doc in docs[:3]] == ["A1", "B1", "A1"]
+        assert isinstance(docs[3], ValueError)  # More than one kind matches
+        assert isinstance(docs[4], Exception)  # Not found, even when looked up on its own
+        assert [method for method, _ in requests] == ["POST", "POST", "GET"]
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_failed_batch_falls_back_to_single_lookups(self, monkeypatch):
+        requests = list()
+
+        def handler(request):
+            if request.method == "POST":
+                numbers = request.content.decode()
+                requests.append(("POST", numbers))
+                if "EP9" in numbers:  # One malformed number fails the whole batch
+                    return httpx.Response(400)
+                return httpx.Response(200, text=batch_response_text())
+            number = request.url.path.split("/")[-2]
+            requests.append(("GET", number))
+            if number == "EP9":
+                return httpx.Response(404)
+            return httpx.Response(200, text=batch_response_text())
+
+        session = PatentClientSession(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(api_module, "session", session)
+        monkeypatch.setattr(PublishedApi.biblio, "batch_size", 2)
+        numbers = ["EP1000000.A1", "EP1000001.B1", "EP1000000.B1", "EP9"]
+        docs = await InpadocBiblio.objects.get_many(numbers)
+        # Only the numbers of the failed batch are looked up one by one
+        assert sorted(requests) == [
+            ("GET", "EP1000000.B1"),
+            ("GET", "EP9"),
+            ("POST", "EP1000000.A1,EP1000001.B1"),
+            ("POST", "EP1000000.B1,EP9"),
+        ]
+        assert [doc.kind for doc in docs[:2]] == ["A1", "B1"]
+        assert isinstance(docs[2], ValueError)  # The single lookup returns both kinds
+        assert isinstance(docs[3], httpx.HTTPStatusError)
+
+        requests.clear()
+        results = await PublishedApi.biblio.get_biblio_many(numbers)
+        assert "EP9" not in results
+        assert results["EP1000001.B1"].documents[0].doc_number == "1000001"
+
+
+def one_page_pdf(width):
+    writer = PdfWriter()
+    writer.add_blank_page(width=width, height=100)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+class TestImageDownload:
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_download_resumes_and_keeps_page_order(self, monkeypatch, tmp_path):
+        requested = list()
+
+        def handler(request):
+            page = int(request.url.params["Range"])
+            requested.append(page)
+            return httpx.Response(200, content=one_page_pdf(width=100 + page))
+
+        monkeypatch.setattr(
+            api_module, "session", PatentClientSession(transport=httpx.MockTransport(handler))
+        )
+        document = ImageDocument(
+            num_pages=5,
+            link="published-data/images/EP/1000000/A1/fullimage",
+            sections=[Section(name="DESCRIPTION", start_page=1)],
+            doc_number="EP1000000A1",
+        )
+        # Pages left over from an interrupted download aren't fetched again
+        parts_dir = tmp_path / "EP1000000A1.pdf.parts"
+        parts_dir.mkdir()
+        (parts_dir / "00002.pdf").write_bytes(one_page_pdf(width=102))
+
+        out_file = await document.download(tmp_path, concurrency=3)
+        assert sorted(requested) == [1, 3, 4, 5]
+        assert not parts_dir.exists()
+        pages = PdfReader(out_file).pages
+        assert [int(page.mediabox.width) for page in pages] == [101, 102, 103, 104, 105]
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_existing_download_is_kept_unless_overwritten(self, monkeypatch, tmp_path):
+        requested = list()
+
+        def handler(request):
+            requested.append(int(request.url.params["Range"]))
+            return httpx.Response(200, content=one_page_pdf(width=200))
+
+        monkeypatch.setattr(
+            api_module, "session", PatentClientSession(transport=httpx.MockTransport(handler))
+        )
+        document = ImageDocument(
+            num_pages=2,
+            link="published-data/images/EP/1000000/A1/fullimage",
+            doc_number="EP1000000A1",
+        )
+        existing = tmp_path / "EP1000000A1.pdf"
+        existing.write_bytes(one_page_pdf(width=100))
+
+        assert await document.download(tmp_path) == existing
+        assert requested == []
+        assert [int(page.mediabox.width) for page in PdfReader(existing).pages] == [100]
+
+        await document.download(tmp_path, overwrite=True)
+        assert sorted(requested) == [1, 2]
+        assert [int(page.mediabox.width) for page in PdfReader(existing).pages] == [200, 200]
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_failed_page_is_not_saved(self, monkeypatch, tmp_path):
+        def handler(request):
+            page = int(request.url.params["Range"])
+            if page == 2:
+                return httpx.Response(404, text="<fault>Not found</fault>")
+            return httpx.Response(200, content=one_page_pdf(width=100 + page))
+
+        monkeypatch.setattr(
+            api_module, "session", PatentClientSession(transport=httpx.MockTransport(handler))
+        )
+        document = ImageDocument(
+            num_pages=3,
+            link="published-data/images/EP/1000000/A1/fullimage",
+            doc_number="EP1000000A1",
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            await document.download(tmp_path, concurrency=1)
+        parts_dir = tmp_path / "EP1000000A1.pdf.parts"
+        assert sorted(f.name for f in parts_dir.iterdir()) == ["00001.pdf"]
+        assert not (tmp_path / "EP1000000A1.pdf").exists()
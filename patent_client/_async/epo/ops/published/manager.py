@@ -1,44 +1,40 @@
-import math
+import datetime
+import logging
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
 from patent_client.util.manager import AsyncManager
 
 from .api import PublishedApi
-from .cql import generate_query
+from .cql import generate_query, publication_date_window
 from .model.biblio import BiblioResult
 from .model.fulltext import Claims, Description
 from .model.images import ImageDocument
 
+logger = logging.getLogger(__name__)
 
-def get_ranges(limit=None, offset=0, page_size=100):
-    offset = offset or 0
-    offset += 1
-    if not limit:
-        page_no = 0
-        while True:
-            start = page_no * page_size + offset
-            yield (start, start + page_size - 1)
-            page_no += 1
-    else:
-        num_full_pages = math.floor(limit / page_size)
-        last_page_size = limit % page_size
-        for i in range(num_full_pages):
-            start = i * page_size + offset
-            yield (start, start + page_size - 1)
-        if last_page_size:
-            start = num_full_pages * page_size + offset
-            yield (start, start + last_page_size - 1)
+# Earliest publication date searched by sharded searches unless a date_range is given
+FIRST_PUBLICATION_DATE = datetime.date(1782, 1, 1)
+
+
+def _to_date(value) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value))
 
 
 class SearchManager(AsyncManager["BiblioResult"]):
     result_size = 100
     primary_key = "publication"
+    # OPS refuses result ranges that end past this
+    max_results = 2000
 
-    async def _get_search_results_range(self, start=1, end=100):
+    def _query(self):
         if "cql_query" in self.config.filter:
-            query = self.config.filter["cql_query"]
-        else:
-            query = generate_query(**self.config.filter)
-        return await PublishedApi.search.search(query, start, end)
+            return self.config.filter["cql_query"][0]
+        return generate_query(**self.config.filter)
+
+    async def _get_search_results_range(self, start=1, end=100):
+        return await PublishedApi.search.search(self._query(), start, end)
 
     async def count(self) -> int:
         page = await self._get_search_results_range(1, 100)
@@ -50,12 +46,95 @@ class SearchManager(AsyncManager["BiblioResult"]):
         return num_results
 
     async def _get_results(self):
-        for start, end in get_ranges(self.config.limit, self.config.offset, self.result_size):
-            page = await self._get_search_results_range(start, end)
-            for result in page.results:
+        if self.config.options.get("shard"):
+            async for result in self._get_sharded_results():
                 yield result
-            if len(page.results) < self.result_size:
-                break
+            return
+
+        async def fetch_page(start, rows):
+            # OPS ranges are 1-based and inclusive
+            page = await self._get_search_results_range(start + 1, start + rows)
+            return page.results, page.num_results
+
+        async for result in self._paginate(fetch_page, self.result_size):
+            yield result
+
+    async def _get_shards(self, concurrency: int) -> list:
+        """Split the query into publication date windows that each fit under `max_results`
+
+        Windows are probed concurrently, level by level. A window with too many results is
+        cut in half and its halves probed again, down to single days. Returns
+        ``(query, first_page)`` pairs in date order.
+        """
+        start, end = self.config.options.get(
+            "date_range", (FIRST_PUBLICATION_DATE, datetime.date.today())
+        )
+        windows = [(_to_date(start), _to_date(end))]
+        shards = dict()
+
+        async def probe(window):
+            query = publication_date_window(self._query(), *window)
+            return window, query, await PublishedApi.search.search(query, 1, self.result_size)
+
+        while windows:
+            split = list()
+            async for window, query, page in abounded_map(probe, windows, limit=concurrency):
+                low, high = window
+                if page.num_results <= self.max_results or low == high:
+                    if page.num_results > self.max_results:
+                        logger.warning(
+                            f"{page.num_results} results published on {low}, only the first {self.max_results} can be retrieved"
+                        )
+                    shards[window] = (query, page)
+                    continue
+                middle = low + (high - low) // 2
+                split += [(low, middle), (middle + datetime.timedelta(days=1), high)]
+            windows = split
+        return [shards[window] for window in sorted(shards)]
+
+    async def _get_sharded_results(self):
+        """Yield the results of every publication date window, fetching pages concurrently
+
+        Pages are yielded in date order and documents already seen are skipped. The limit
+        and offset apply to the merged stream.
+        """
+        concurrency = self.config.options.get("concurrency", DEFAULT_CONCURRENCY)
+        shards = await self._get_shards(concurrency)
+
+        def pages():
+            for query, first_page in shards:
+                yield query, 1, first_page
+                total = min(first_page.num_results, self.max_results)
+                for start in range(1 + self.result_size, total + 1, self.result_size):
+                    yield query, start, None
+
+        async def fetch(page):
+            query, start, result = page
+            if result is None:
+                end = min(start + self.result_size - 1, self.max_results)
+                result = await PublishedApi.search.search(query, start, end)
+            return result.results
+
+        seen = set()
+        skip = self.config.offset or 0
+        remaining = self.config.limit
+        results = abounded_map(fetch, pages(), limit=concurrency)
+        try:
+            async for items in results:
+                for item in items:
+                    if item.docdb_number in seen:
+                        continue
+                    seen.add(item.docdb_number)
+                    if skip:
+                        skip -= 1
+                        continue
+                    yield item
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining <= 0:
+                            return
+        finally:
+            await results.aclose()
 
     async def get(self, number, doc_type="publication", format="docdb") -> BiblioResult:
         result = await PublishedApi.biblio.get_biblio(number, doc_type, format)
@@ -65,12 +144,39 @@ class SearchManager(AsyncManager["BiblioResult"]):
 
 
 class BiblioManager(AsyncManager):
-    async def get(self, doc_number) -> "BiblioResult":
-        result = await PublishedApi.biblio.get_biblio(doc_number)
+    @staticmethod
+    def _only_document(doc_number, result: BiblioResult):
         if len(result.documents) > 1:
             raise ValueError(f"More than one result found for {doc_number}!")
         return result.documents[0]
 
+    async def get(self, doc_number) -> "BiblioResult":
+        result = await PublishedApi.biblio.get_biblio(doc_number)
+        return self._only_document(doc_number, result)
+
+    async def get_many(self, numbers, concurrency=DEFAULT_CONCURRENCY) -> list:
+        """Look up many documents with batched requests of up to 100 numbers each
+
+        Results are returned in the same order as `numbers`, and failed lookups are returned
+        as exceptions. Numbers missing from the batch responses, and the numbers of a batch
+        request that failed, are looked up one by one.
+        """
+        numbers = list(numbers)
+        batch = await PublishedApi.biblio.get_biblio_many(
+            numbers, concurrency=concurrency, return_exceptions=True
+        )
+        missing = [number for number in dict.fromkeys(numbers) if number not in batch]
+        by_number = dict(zip(missing, await super().get_many(missing, concurrency)))
+        for number, result in batch.items():
+            if isinstance(result, Exception):
+                by_number[number] = result
+                continue
+            try:
+                by_number[number] = self._only_document(number, result)
+            except ValueError as e:
+                by_number[number] = e
+        return [by_number[number] for number in numbers]
+
 
 class ClaimsManager(AsyncManager):
     async def get(self, doc_number) -> "Claims":
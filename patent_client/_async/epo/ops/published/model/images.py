@@ -1,9 +1,12 @@
+import shutil
 from pathlib import Path
 from typing import List, Optional
 
 from pydantic import Field, computed_field
 from pypdf import PdfReader, PdfWriter
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
+
 from ...util import EpoBaseModel, InpadocModel
 from ..schema.images import ImagesSchema
 
@@ -21,23 +24,57 @@ class ImageDocument(EpoBaseModel):
     sections: List[Section] = Field(default_factory=list)
     doc_number: Optional[str] = None
 
-    async def download(self, path="."):
+    async def download(
+        self, path=".", concurrency: int = DEFAULT_CONCURRENCY, overwrite: bool = False
+    ) -> Path:
+        """Download the whole document as one PDF
+
+        Pages are fetched up to `concurrency` at a time, and the OPS fair use throttle paces
+        them further. Each page is saved to a ``<doc_number>.pdf.parts`` directory as soon as
+        it arrives, so an interrupted download resumes with only the missing pages. Pages are
+        appended to the PDF in order as they arrive, reading one page file at a time, and the
+        parts directory is removed once the PDF is written. A PDF that was already downloaded
+        is returned as is unless `overwrite` is set.
+        """
         from ..api import PublishedImagesApi
 
         out_file = Path(path) / f"{self.doc_number}.pdf"
+        if out_file.exists() and not overwrite:
+            return out_file
+        parts_dir = out_file.with_name(f"{out_file.name}.parts")
+        parts_dir.mkdir(exist_ok=True, parents=True)
+
+        async def fetch_page(page_number):
+            page_file = parts_dir / f"{page_number:05d}.pdf"
+            if not page_file.exists():
+                page_data = await PublishedImagesApi.get_page_image_from_link(
+                    self.link, page_number=page_number
+                )
+                # Written under a temporary name so a partial page is never mistaken for a whole one
+                tmp_file = page_file.with_suffix(".tmp")
+                tmp_file.write_bytes(page_data.getvalue())
+                tmp_file.replace(page_file)
+            return page_file
+
         writer = PdfWriter()
-        for i in range(1, self.num_pages + 1):
-            page_data = await PublishedImagesApi.get_page_image_from_link(self.link, page_number=i)
-            page = PdfReader(page_data).pages[0]
-            if page["/Rotate"] == 90:
-                page.rotate_clockwise(-90)
-            writer.add_page(page)
+        pages = range(1, self.num_pages + 1)
+        async for page_file in abounded_map(fetch_page, pages, limit=concurrency):
+            # The writer copies the page, so closing the reader frees the page file's buffer
+            with PdfReader(page_file) as reader:
+                page = reader.pages[0]
+                if page.get("/Rotate") == 90:
+                    page.rotate_clockwise(-90)
+                writer.add_page(page)
 
         for section in self.sections:
             writer.add_outline_item(section.name.capitalize(), section.start_page)
 
-        with out_file.open("wb") as f:
+        tmp_out = out_file.with_name(f"{out_file.name}.tmp")
+        with tmp_out.open("wb") as f:
             writer.write(f)
+        tmp_out.replace(out_file)
+        shutil.rmtree(parts_dir)
+        return out_file
 
     async def download_image(self, path=".", image_format="tif", page_number=1):
         from ..api import PublishedImagesApi
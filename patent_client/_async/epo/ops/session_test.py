@@ -0,0 +1,109 @@
+import time
+
+import httpx
+import pytest
+
+from patent_client.util.concurrency import abounded_map
+
+from .session import OpsAuthenticationError, OpsSession, OpsTokenStore
+
+BASE = "https://ops.epo.org/3.2/rest-services"
+
+
+class FakeOps:
+    def __init__(self, valid_tokens=("token-1",)):
+        self.valid_tokens = list(valid_tokens)
+        self.token_requests = 0
+        self.requests = list()
+
+    def __call__(self, request):
+        if request.url.path.endswith("/auth/accesstoken"):
+            token = self.valid_tokens[self.token_requests]
+            self.token_requests += 1
+            return httpx.Response(
+                200, json={"access_token": token, "expires_in": "1199", "issued_at": "0"}
+            )
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        self.requests.append(token)
+        if token not in self.valid_tokens[: self.token_requests]:
+            return httpx.Response(
+                400,
+                headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+                text="<fault><code>CLIENT.InvalidAccessToken</code><message>invalid_access_token</message></fault>",
+            )
+        return httpx.Response(200, text="<ok/>")
+
+
+def make_session(ops, path, key="key"):
+    return OpsSession(
+        key=key,
+        secret="secret",
+        token_store=OpsTokenStore(path, key),
+        transport=httpx.MockTransport(ops),
+    )
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_concurrent_requests_fetch_one_token(tmp_path):
+    ops = FakeOps()
+    session = make_session(ops, tmp_path / "ops_token.json")
+
+    async def fetch(i):
+        return await session.get(f"{BASE}/published-data/publication/docdb/EP{i}/biblio")
+
+    responses = [r async for r in abounded_map(fetch, range(8), limit=8)]
+    assert [r.status_code for r in responses] == [200] * 8
+    assert ops.token_requests == 1
+    assert ops.requests == ["token-1"] * 8
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_token_is_shared_through_the_store(tmp_path):
+    path = tmp_path / "ops_token.json"
+    ops = FakeOps()
+    await make_session(ops, path).get(f"{BASE}/family/publication/docdb/EP1")
+    # A new process starts with the stored token instead of a rejected request
+    response = await make_session(ops, path).get(f"{BASE}/family/publication/docdb/EP1")
+    assert response.status_code == 200
+    assert ops.token_requests == 1
+    assert ops.requests == ["token-1", "token-1"]
+
+    # Tokens issued for other credentials are ignored
+    ops = FakeOps(valid_tokens=["token-2"])
+    await make_session(ops, path, key="other").get(f"{BASE}/family/publication/docdb/EP1")
+    assert ops.token_requests == 1
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_refresh_before_expiry_and_after_rejection(tmp_path):
+    path = tmp_path / "ops_token.json"
+    store = OpsTokenStore(path, "key")
+    # About to expire: refreshed before the request is sent
+    store.write("token-1", time.time() + 30)
+    ops = FakeOps(valid_tokens=["token-2"])
+    await make_session(ops, path).get(f"{BASE}/family/publication/docdb/EP1")
+    assert ops.requests == ["token-2"]
+    assert store.read()[0] == "token-2"
+
+    # Revoked early: refreshed once and the request is sent again
+    store.write("revoked", time.time() + 1000)
+    ops = FakeOps(valid_tokens=["token-3"])
+    response = await make_session(ops, path).get(f"{BASE}/family/publication/docdb/EP1")
+    assert response.status_code == 200
+    assert ops.requests == ["revoked", "token-3"]
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_bad_credentials(tmp_path):
+    session = OpsSession(
+        key="key",
+        secret="wrong",
+        token_store=OpsTokenStore(tmp_path / "ops_token.json", "key"),
+        transport=httpx.MockTransport(lambda request: httpx.Response(401)),
+    )
+    with pytest.raises(OpsAuthenticationError):
+        await session.get(f"{BASE}/family/publication/docdb/EP1")
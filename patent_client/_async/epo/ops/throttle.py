@@ -0,0 +1,171 @@
+"""Pacing for the EPO OPS fair use policy.
+
+Every OPS response carries an ``X-Throttling-Control`` header such as::
+
+    busy (images=green:100, inpadoc=yellow:45, other=green:1000, retrieval=green:50, search=green:15)
+
+The first word is the overall system state. Each service then has a traffic light colour and
+the number of requests per minute it currently allows. OpsThrottle spaces the requests to
+each service so that they stay under that rate, slowing down further as the light turns
+yellow or red. A black light means the service has blocked us, so requests to it raise
+OpsFairUseError instead of being sent.
+
+Data usage is reported in ``X-IndividualQuotaPerHour-Used`` and
+``X-RegisteredQuotaPerWeek-Used``. Requests are slowed to the red pace near the hourly
+quota, and refused with OpsFairUseError near the weekly quota.
+"""
+
+import asyncio
+import re
+import threading
+import time
+import typing as tp
+
+import httpx
+
+from patent_client import SETTINGS
+from patent_client.util.metrics import metrics
+
+THROTTLING_RE = re.compile(r"^\s*(?P<state>[\w-]+)\s*\((?P<services>.*)\)")
+SERVICE_RE = re.compile(r"(?P<service>\w+)=(?P<color>\w+):(?P<limit>\d+)")
+
+# Multipliers applied to the interval between requests
+COLOR_PACING = {"green": 1.0, "yellow": 1.5, "red": 3.0}
+STATE_PACING = {"idle": 1.0, "busy": 1.0, "overloaded": 2.0}
+
+# Requests per minute assumed until OPS reports the real limits
+DEFAULT_LIMITS = {"search": 15, "retrieval": 50, "inpadoc": 45, "images": 100, "other": 1000}
+
+
+class OpsFairUseError(Exception):
+    pass
+
+
+def service_for(url: httpx.URL) -> tp.Optional[str]:
+    """The OPS service a request counts against, or None for requests that aren't throttled"""
+    path = url.path
+    if "/auth/" in path:
+        return None
+    if "/search" in path:
+        return "search"
+    if "/images" in path:
+        return "images"
+    if "/family/" in path or "/legal/" in path:
+        return "inpadoc"
+    if "/published-data/" in path or "/register/" in path:
+        return "retrieval"
+    return "other"
+
+
+class ServiceState:
+    def __init__(self, limit: int):
+        self.color = "green"
+        self.limit = limit
+        self.last_slot = float("-inf")
+        self.blocked_until = 0.0
+
+
+class OpsThrottle:
+    """Per-service request pacing driven by the OPS throttling headers
+
+    Args:
+        weekly_quota: Bytes allowed per week. None disables the weekly check.
+        hourly_quota: Bytes allowed per hour. None disables the hourly check.
+        quota_margin: Fraction of a quota that may be used before the throttle steps in.
+        black_backoff: Seconds to refuse requests to a service after it turns black.
+    """
+
+    def __init__(
+        self,
+        weekly_quota: tp.Optional[int] = SETTINGS.epo_weekly_quota,
+        hourly_quota: tp.Optional[int] = SETTINGS.epo_hourly_quota,
+        quota_margin: float = 0.95,
+        black_backoff: float = 60.0,
+    ):
+        self.weekly_quota = weekly_quota
+        self.hourly_quota = hourly_quota
+        self.quota_margin = quota_margin
+        self.black_backoff = black_backoff
+        self.state = "idle"
+        self.services = {name: ServiceState(limit) for name, limit in DEFAULT_LIMITS.items()}
+        self.hourly_used = 0
+        self.weekly_used = 0
+        self._lock = threading.Lock()
+
+    def _over(self, used: int, quota: tp.Optional[int]) -> bool:
+        return quota is not None and used >= quota * self.quota_margin
+
+    def interval(self, service: str) -> float:
+        """Seconds between requests to a service at its current colour and limit"""
+        state = self.services[service]
+        color = "red" if self._over(self.hourly_used, self.hourly_quota) else state.color
+        return (
+            60.0
+            / max(state.limit, 1)
+            * COLOR_PACING.get(color, 1.0)
+            * STATE_PACING.get(self.state, 1.0)
+        )
+
+    def reserve(self, url: httpx.URL) -> float:
+        """Claim the next request slot for the service of url and return the seconds to wait"""
+        service = service_for(url)
+        if service is None:
+            return 0.0
+        with self._lock:
+            if self._over(self.weekly_used, self.weekly_quota):
+                raise OpsFairUseError(
+                    f"{self.weekly_used} of the {self.weekly_quota} byte weekly OPS quota used"
+                )
+            state = self.services.setdefault(service, ServiceState(DEFAULT_LIMITS["other"]))
+            now = time.monotonic()
+            if state.blocked_until > now:
+                raise OpsFairUseError(f"OPS {service} service is blocked (black)")
+            # The interval is applied at reservation time, so new limits take effect at once
+            slot = max(now, state.last_slot + self.interval(service))
+            state.last_slot = slot
+            return slot - now
+
+    async def acquire(self, url: httpx.URL) -> None:
+        wait = self.reserve(url)
+        if wait > 0:
+            metrics.increment(url, "throttled")
+            await asyncio.sleep(wait)
+
+    def update(self, headers: httpx.Headers) -> None:
+        """Record the throttling state and quota usage reported in a response"""
+        with self._lock:
+            match = THROTTLING_RE.match(headers.get("X-Throttling-Control", ""))
+            if match:
+                self.state = match.group("state").lower()
+                for item in SERVICE_RE.finditer(match.group("services")):
+                    name, color = item.group("service"), item.group("color").lower()
+                    state = self.services.setdefault(name, ServiceState(int(item.group("limit"))))
+                    state.color, state.limit = color, int(item.group("limit"))
+                    if color == "black":
+                        state.blocked_until = time.monotonic() + self.black_backoff
+            for header, attr in (
+                ("X-IndividualQuotaPerHour-Used", "hourly_used"),
+                ("X-RegisteredQuotaPerWeek-Used", "weekly_used"),
+            ):
+                if headers.get(header, "").isdigit():
+                    setattr(self, attr, int(headers[header]))
+
+
+class ThrottledTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that paces requests with an OpsThrottle
+
+    It sits below the cache, so responses served from the cache are never delayed.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, throttle: OpsThrottle):
+        self.transport = transport
+        self.throttle = throttle
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.throttle.acquire(request.url)
+        response = await self.transport.handle_async_request(request)
+        self.throttle.update(response.headers)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
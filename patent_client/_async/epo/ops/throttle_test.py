@@ -0,0 +1,77 @@
+import time
+
+import httpx
+import pytest
+
+from .throttle import OpsFairUseError, OpsThrottle, ThrottledTransport, service_for
+
+BASE = "https://ops.epo.org/3.2/rest-services"
+
+
+def test_service_for():
+    assert service_for(httpx.URL(f"{BASE}/published-data/search/biblio?q=ti%3Dplastic")) == "search"
+    assert service_for(httpx.URL(f"{BASE}/published-data/publication/docdb/EP1000000/biblio")) == (
+        "retrieval"
+    )
+    assert service_for(httpx.URL(f"{BASE}/published-data/images/EP/1000000/A1/fullimage")) == (
+        "images"
+    )
+    assert service_for(httpx.URL(f"{BASE}/family/publication/docdb/EP1000000")) == "inpadoc"
+    assert service_for(httpx.URL(f"{BASE}/number-service/application/original/US123")) == "other"
+    assert service_for(httpx.URL("https://ops.epo.org/3.2/auth/accesstoken")) is None
+
+
+def test_update_parses_headers():
+    throttle = OpsThrottle()
+    throttle.update(
+        httpx.Headers(
+            {
+                "X-Throttling-Control": "overloaded (images=green:200, inpadoc=yellow:60, "
+                "other=green:1000, retrieval=red:30, search=green:30)",
+                "X-RegisteredQuotaPerWeek-Used": "12345",
+            }
+        )
+    )
+    assert throttle.state == "overloaded"
+    assert (throttle.services["retrieval"].color, throttle.services["retrieval"].limit) == (
+        "red",
+        30,
+    )
+    assert throttle.weekly_used == 12345
+    # 60 s / 30 rpm, three times slower on red and twice as slow while overloaded
+    assert throttle.interval("retrieval") == pytest.approx(12.0)
+    assert throttle.interval("search") == pytest.approx(4.0)
+
+
+def test_black_service_and_weekly_quota_raise():
+    throttle = OpsThrottle(weekly_quota=1000)
+    throttle.update(
+        httpx.Headers({"X-Throttling-Control": "busy (search=black:0, retrieval=green:200)"})
+    )
+    with pytest.raises(OpsFairUseError):
+        throttle.reserve(httpx.URL(f"{BASE}/published-data/search?q=x"))
+    assert throttle.reserve(httpx.URL(f"{BASE}/published-data/publication/docdb/EP1/biblio")) == 0
+    throttle.update(httpx.Headers({"X-RegisteredQuotaPerWeek-Used": "990"}))
+    with pytest.raises(OpsFairUseError):
+        throttle.reserve(httpx.URL(f"{BASE}/published-data/publication/docdb/EP1/biblio"))
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_transport_paces_each_service():
+    def handler(request):
+        return httpx.Response(
+            200, headers={"X-Throttling-Control": "idle (search=green:1200, retrieval=green:60000)"}
+        )
+
+    throttle = OpsThrottle()
+    transport = ThrottledTransport(httpx.MockTransport(handler), throttle)
+    await transport.handle_async_request(httpx.Request("GET", f"{BASE}/number-service/x"))
+    start = time.monotonic()
+    for _ in range(3):
+        await transport.handle_async_request(httpx.Request("GET", f"{BASE}/published-data/search"))
+        await transport.handle_async_request(
+            httpx.Request("GET", f"{BASE}/published-data/x/biblio")
+        )
+    # Search is limited to one request every 50 ms. Retrieval runs alongside it unhindered.
+    assert 0.09 <= time.monotonic() - start < 0.5
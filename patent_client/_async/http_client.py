@@ -1,18 +1,39 @@
+import asyncio
+import datetime
+import json
+import logging
 import re
+import time
 import typing as tp
 import warnings
+from collections import Counter
 from hashlib import blake2b
 from pathlib import Path
 
 import hishel
 import httpcore
 import httpx
+from hishel._serializers import BaseSerializer, Metadata
 from hishel._utils import normalized_url
 
-from patent_client import CACHE_DIR
+import patent_client.patches  # noqa: F401 # nopycln: import # Run patching code
+from patent_client import CACHE_DIR, SETTINGS
+from patent_client.util.cache_policy import CachePolicies, PolicyController
+from patent_client.util.compression import compress, decompress, get_codec
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, AsyncSingleFlight, abounded_map
+from patent_client.util.metrics import metrics
+from patent_client.util.retry import DEFAULT_RETRY_POLICY, RETRY_EXCEPTIONS, RetryPolicy
+from patent_client.util.sqlite_cache import SQLiteCache
 from patent_client.version import __version__
 
+logger = logging.getLogger(__name__)
+
 filename_re = re.compile(r'filename="([^"]+)"')
+content_range_re = re.compile(r"bytes \d+-\d+/(\d+)")
+
+
+class DownloadError(Exception):
+    pass
 
 
 def cache_key_generator(request: httpcore.Request):
@@ -29,21 +50,134 @@ def cache_key_generator(request: httpcore.Request):
     return key.hexdigest()
 
 
+def request_key(request: httpx.Request) -> tp.Optional[str]:
+    """Key identifying identical requests, or None if the body is a stream that can't be read"""
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        return None
+    key = blake2b(digest_size=16)
+    key.update(str(request.url).encode("utf-8"))
+    key.update(request.method.encode("ascii"))
+    key.update(body)
+    return key.hexdigest()
+
+
+class AsyncCacheStorage(hishel.AsyncBaseStorage):
+    """Hishel storage that keeps serialized responses in a shared SQLiteCache
+
+    Responses are compressed with the given codec before they are written. Reads detect the
+    codec from the stored value, so changing the codec doesn't invalidate the cache. If a
+    CachePolicies table is given, responses older than the ttl of their URL's policy are
+    treated as missing.
+    """
+
+    def __init__(
+        self,
+        cache: SQLiteCache,
+        serializer: tp.Optional[BaseSerializer] = None,
+        ttl: tp.Optional[tp.Union[int, float]] = None,
+        compression: str = SETTINGS.cache_compression,
+        compression_level: tp.Optional[int] = SETTINGS.cache_compression_level,
+        policies: tp.Optional[CachePolicies] = None,
+    ):
+        super().__init__(serializer, ttl)
+        self.cache = cache
+        self.policies = policies
+        get_codec(compression)  # Fail fast on an unknown or unavailable codec
+        self.compression = compression
+        self.compression_level = compression_level
+
+    def _dumps(self, response, request, metadata) -> bytes:
+        data = self._serializer.dumps(response=response, request=request, metadata=metadata)
+        data = data if isinstance(data, bytes) else data.encode("utf-8")
+        return compress(data, self.compression, self.compression_level)
+
+    async def store(
+        self,
+        key: str,
+        response: httpcore.Response,
+        request: httpcore.Request,
+        metadata: tp.Optional[Metadata] = None,
+    ) -> None:
+        metadata = metadata or Metadata(
+            cache_key=key,
+            created_at=datetime.datetime.now(datetime.timezone.utc),
+            number_of_uses=0,
+        )
+        data = self._dumps(response, request, metadata)
+        self.cache.set(key, data)
+        metrics.increment(normalized_url(request.url), "cache_bytes_stored", len(data))
+
+    async def update_metadata(
+        self,
+        key: str,
+        response: httpcore.Response,
+        request: httpcore.Request,
+        metadata: Metadata,
+    ) -> None:
+        # hishel calls this on every cache hit to count uses, which nothing here reads.
+        # Rewriting the entry would turn each hit into a full write, so hits only refresh the
+        # access time, which SQLiteCache.get already does at most once per touch_interval.
+        return
+
+    async def retrieve(self, key: str):
+        data = self.cache.get(key, ttl=self._ttl)
+        if data is None:
+            return None
+        data = decompress(data)
+        stored = self._serializer.loads(
+            data if self._serializer.is_binary else data.decode("utf-8")
+        )
+        if self.policies is not None:
+            _, request, metadata = stored
+            ttl = self.policies.get(normalized_url(request.url)).ttl
+            created_at = metadata["created_at"]
+            if created_at.tzinfo is None:  # The JSON serializer drops the (UTC) timezone
+                created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+            age = datetime.datetime.now(datetime.timezone.utc) - created_at
+            if ttl is not None and age.total_seconds() > ttl:
+                self.cache.delete(key)
+                return None
+        return stored
+
+    async def aclose(self) -> None:
+        return
+
+
+response_cache = SQLiteCache(CACHE_DIR / "http_cache.sqlite", max_bytes=SETTINGS.cache_max_bytes)
+cache_policies = CachePolicies.with_defaults(SETTINGS.cache_policies)
+
 patent_client_transport = hishel.AsyncCacheTransport(
     transport=httpx.AsyncHTTPTransport(
         verify=False,
         http2=True,
+        # Retries failed connection attempts only, on top of the session's retry policy
         retries=3,
     ),
-    storage=hishel.AsyncFileStorage(base_path=CACHE_DIR),
-    controller=hishel.Controller(allow_heuristics=True),
+    storage=AsyncCacheStorage(response_cache, policies=cache_policies),
+    controller=PolicyController(cache_policies, allow_heuristics=True),
 )
 
+if SETTINGS.metrics_log_interval:
+    metrics.start_periodic_log(SETTINGS.metrics_log_interval)
+
+
+def cache_status(response: httpx.Response) -> tp.Optional[str]:
+    """Classify a response as a cache "hit", "miss" or "revalidated", or None if uncached"""
+    if "from_cache" not in response.extensions:
+        return None
+    if response.request.extensions.get("revalidated"):
+        return "revalidated"
+    return "hit" if response.extensions["from_cache"] else "miss"
+
 
 class PatentClientSession(httpx.AsyncClient):
     _default_user_agent = f"Mozilla/5.0 Python Patent Clientbot/{__version__} (parkerhancock@users.noreply.github.com)"
+    # Requests with these methods are coalesced when an identical request is already in flight
+    coalesce_methods = ("GET", "HEAD")
 
-    def __init__(self, **kwargs):
+    def __init__(self, retry_policy: tp.Optional[RetryPolicy] = None, **kwargs):
         kwargs["transport"] = kwargs.get("transport", patent_client_transport)
         headers = kwargs.get("headers", dict())
         headers["User-Agent"] = headers.get("User-Agent", self._default_user_agent)
@@ -51,6 +185,97 @@ class PatentClientSession(httpx.AsyncClient):
         kwargs["follow_redirects"] = kwargs.get("follow_redirects", True)
         kwargs["timeout"] = kwargs.get("timeout", 60 * 5)
         super().__init__(**kwargs)
+        self.in_flight = AsyncSingleFlight()
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Send a request, sharing the response of an identical request that is already in flight
+
+        Coalesced callers receive the same Response object. Streamed requests and requests
+        that opt out of caching are always sent on their own. Transient failures are retried
+        according to `retry_policy`.
+        """
+        key = request_key(request)
+        if (
+            key is None
+            or kwargs.get("stream")
+            or request.method not in self.coalesce_methods
+            or request.extensions.get("cache_disabled")
+        ):
+            return await self._send_with_retries(request, **kwargs)
+        sent = list()
+
+        def fetch():
+            sent.append(request)
+            return self._send_with_retries(request, **kwargs)
+
+        response = await self.in_flight.run(key, fetch)
+        if not sent:
+            metrics.increment(request.url, "coalesced")
+        return response
+
+    async def _send_with_retries(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Send a request, retrying retryable statuses and connection errors with back-off
+
+        Once the retries for a status are used up, or the next wait would pass the policy's
+        deadline, the last response is returned (or the last connection error raised).
+        """
+        policy = self.retry_policy
+        if request_key(request) is None:  # A streamed body can't be sent twice
+            return await self._send_recorded(request, **kwargs)
+        start = time.monotonic()
+        attempts: Counter = Counter()  # Retries so far per status, None for connection errors
+        while True:
+            response, error = None, None
+            try:
+                response = await self._send_recorded(request, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                error = e
+            status = None if response is None else response.status_code
+            retry = error is not None or status in policy.statuses
+            if retry:
+                attempts[status] += 1
+                delay = policy.delay(sum(attempts.values()), response)
+                retry = attempts[status] <= policy.retries_for(request, status) and (
+                    policy.deadline is None or time.monotonic() - start + delay <= policy.deadline
+                )
+            if not retry:
+                if error is not None:
+                    raise error
+                return response
+            logger.info(
+                "Retrying %s %s in %.1fs after %s",
+                request.method,
+                request.url,
+                delay,
+                status or type(error).__name__,
+            )
+            metrics.increment(request.url, "retries")
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def _send_recorded(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        """Send a request and record its latency, size, status and cache status in `metrics`"""
+        start = time.perf_counter()
+        try:
+            response = await super().send(request, **kwargs)
+        except httpx.TransportError:
+            metrics.increment(request.url, "transport_errors")
+            raise
+        metrics.record_response(
+            request.url,
+            response.status_code,
+            time.perf_counter() - start,
+            bytes_out=int(request.headers.get("Content-Length", 0)),
+            bytes_in=(
+                int(response.headers.get("Content-Length", 0))
+                if kwargs.get("stream")
+                else len(response.content)
+            ),
+            cache=cache_status(response),
+        )
+        return response
 
     def get_filename(self, url, path, filename, headers):
         if path.is_dir() or None:
@@ -89,3 +314,143 @@ class PatentClientSession(httpx.AsyncClient):
                 async for chunk in response.aiter_bytes():
                     f.write(chunk)
         return path
+
+    async def download_ranges(
+        self,
+        url,
+        path: tp.Union[str, Path],
+        size: tp.Optional[int] = None,
+        connections: int = DEFAULT_CONCURRENCY,
+        segment_size: int = 32 * 1024**2,
+    ) -> Path:
+        """Download a large file in byte ranges over several connections, resuming if interrupted
+
+        The file is written to ``<path>.part`` in segments of `segment_size` bytes, fetched up
+        to `connections` at a time with HTTP Range requests. ``<path>.part.json`` lists the
+        segments already on disk, so a later call for the same url and size only fetches the
+        rest. The finished file must be `size` bytes (or the length reported by the server)
+        before it replaces `path`. An existing file of the right size is not downloaded
+        again. Servers that ignore Range requests get a single streamed download.
+        """
+        path = Path(path)
+        if size is not None and path.exists() and path.stat().st_size == size:
+            return path
+        total, ranged = await self._probe_ranges(url)
+        if size is not None and total is not None and total != size:
+            raise DownloadError(f"{url} is {total} bytes, but {size} bytes were expected")
+        size = total if size is None else size
+        part_file = path.with_name(f"{path.name}.part")
+        manifest_file = path.with_name(f"{path.name}.part.json")
+        if not ranged or size is None:
+            await self._download_whole(url, part_file)
+        else:
+            await self._download_segments(
+                url, part_file, manifest_file, size, connections, segment_size
+            )
+        if size is not None and part_file.stat().st_size != size:
+            raise DownloadError(
+                f"Downloaded {part_file.stat().st_size} bytes from {url}, but expected {size}"
+            )
+        part_file.replace(path)
+        manifest_file.unlink(missing_ok=True)
+        return path
+
+    async def _probe_ranges(self, url) -> tp.Tuple[tp.Optional[int], bool]:
+        """The size of the file at url, if known, and whether the server honours Range requests"""
+        async with self.stream(
+            "GET", url, headers={"Range": "bytes=0-0"}, extensions={"cache_disabled": True}
+        ) as response:
+            response.raise_for_status()
+            if response.status_code == 206:
+                match = content_range_re.match(response.headers.get("Content-Range", ""))
+                if match:
+                    return int(match.group(1)), True
+            length = response.headers.get("Content-Length", "")
+            return (int(length) if length.isdigit() else None), False
+
+    async def _download_whole(self, url, part_file: Path) -> None:
+        async with self.stream("GET", url, extensions={"cache_disabled": True}) as response:
+            response.raise_for_status()
+            with part_file.open("wb") as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+
+    async def _download_segments(
+        self,
+        url,
+        part_file: Path,
+        manifest_file: Path,
+        size: int,
+        connections: int,
+        segment_size: int,
+    ) -> None:
+        manifest = {"url": str(url), "size": size, "segment_size": segment_size, "done": []}
+        try:
+            saved = json.loads(manifest_file.read_text())
+        except (OSError, ValueError):
+            saved = dict()
+        resumable = part_file.exists() and part_file.stat().st_size == size
+        if resumable and all(saved.get(k) == manifest[k] for k in ("url", "size", "segment_size")):
+            manifest["done"] = saved["done"]
+            logger.info("Resuming %s with %s segments done", url, len(manifest["done"]))
+        else:
+            with part_file.open("wb") as f:
+                f.truncate(size)
+
+        async def fetch_segment(segment):
+            start = segment * segment_size
+            await self._download_range(url, part_file, start, min(start + segment_size, size) - 1)
+            return segment
+
+        done = set(manifest["done"])
+        segments = [i for i in range(-(-size // segment_size)) if i not in done]
+        async for segment in abounded_map(fetch_segment, segments, limit=connections):
+            manifest["done"].append(segment)
+            # Written under a temporary name so an interruption never leaves a torn manifest
+            tmp_file = manifest_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(manifest))
+            tmp_file.replace(manifest_file)
+
+    async def _download_range(self, url, part_file: Path, start: int, end: int) -> None:
+        """Write bytes start-end (inclusive) of url into part_file, retrying broken transfers
+
+        Error statuses are retried by send(). Connections dropped mid-body are retried here,
+        up to the retry policy's connection_retries.
+        """
+        length = end - start + 1
+        attempt = 0
+        while True:
+            written = 0
+            try:
+                async with self.stream(
+                    "GET",
+                    url,
+                    headers={"Range": f"bytes={start}-{end}"},
+                    extensions={"cache_disabled": True},
+                ) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError(f"{url} ignored the request for bytes {start}-{end}")
+                    with part_file.open("r+b") as f:
+                        f.seek(start)
+                        async for chunk in response.aiter_bytes():
+                            if written + len(chunk) > length:
+                                raise DownloadError(f"{url} sent more than bytes {start}-{end}")
+                            f.write(chunk)
+                            written += len(chunk)
+                if written == length:
+                    return
+                error: Exception = httpx.RemoteProtocolError(
+                    f"Got {written} of {length} bytes for {start}-{end} of {url}"
+                )
+            except RETRY_EXCEPTIONS as e:
+                error = e
+            attempt += 1
+            if attempt > self.retry_policy.connection_retries:
+                raise error
+            delay = self.retry_policy.delay(attempt)
+            logger.info(
+                "Retrying bytes %s-%s of %s in %.1fs after %r", start, end, url, delay, error
+            )
+            metrics.increment(url, "retries")
+            await asyncio.sleep(delay)
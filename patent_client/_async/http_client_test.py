@@ -0,0 +1,333 @@
+import asyncio
+import json
+from email.utils import formatdate
+
+import hishel
+import httpx
+import pytest
+
+from patent_client.util.cache_policy import CachePolicies, PolicyController
+from patent_client.util.compression import compress, decompress
+from patent_client.util.concurrency import abounded_map
+from patent_client.util.metrics import metrics
+from patent_client.util.retry import RetryPolicy
+from patent_client.util.sqlite_cache import SQLiteCache
+
+from . import http_client as http_client_module
+from .http_client import AsyncCacheStorage, DownloadError, PatentClientSession
+
+
+@pytest.mark.asyncio
+async def test_cache_storage_round_trip(tmp_path):
+    calls = list()
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, json={"number": "US123"})
+
+    cache = SQLiteCache(tmp_path / "http_cache.sqlite")
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(handler),
+        storage=AsyncCacheStorage(cache),
+        controller=hishel.Controller(force_cache=True),
+    )
+    for _ in range(2):
+        response = await transport.handle_async_request(
+            httpx.Request("GET", "https://example.com/number/US123")
+        )
+        await response.aread()
+        assert response.json() == {"number": "US123"}
+    assert len(calls) == 1
+    assert response.extensions["from_cache"]
+    assert len(cache) == 1
+    (stored,) = cache.connection.execute("SELECT data FROM responses").fetchone()
+    assert stored.startswith(b"PCZ")
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_does_not_rewrite_entry(tmp_path):
+    def handler(request):
+        return httpx.Response(200, content=b"x" * 100_000)
+
+    cache = SQLiteCache(tmp_path / "http_cache.sqlite")
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(handler),
+        storage=AsyncCacheStorage(cache),
+        controller=hishel.Controller(force_cache=True),
+    )
+    request = httpx.Request("GET", "https://example.com/images/1")
+    await (await transport.handle_async_request(request)).aread()
+    changes = cache.connection.total_changes
+    for _ in range(4):
+        response = await transport.handle_async_request(request)
+        await response.aread()
+        assert response.extensions["from_cache"]
+    assert cache.connection.total_changes == changes
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_only_decompresses(tmp_path, monkeypatch):
+    calls = list()
+
+    def counting(name, func):
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(http_client_module, "compress", counting("compress", compress))
+    monkeypatch.setattr(http_client_module, "decompress", counting("decompress", decompress))
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text="<biblio/>")),
+        storage=AsyncCacheStorage(SQLiteCache(tmp_path / "http_cache.sqlite")),
+        controller=hishel.Controller(force_cache=True),
+    )
+    request = httpx.Request("GET", "https://example.com/biblio/1")
+    await (await transport.handle_async_request(request)).aread()
+    assert calls == ["compress"]
+    calls.clear()
+    response = await transport.handle_async_request(request)
+    await response.aread()
+    assert response.extensions["from_cache"]
+    assert calls == ["decompress"]
+
+
+@pytest.mark.asyncio
+async def test_cache_storage_applies_policy_ttl(tmp_path):
+    calls = list()
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, text="<legal/>")
+
+    policies = CachePolicies({r"/legal": {"mode": "force", "ttl": 0}, r"/biblio": ["force"]})
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(handler),
+        storage=AsyncCacheStorage(SQLiteCache(tmp_path / "http_cache.sqlite"), policies=policies),
+        controller=PolicyController(policies),
+    )
+    for url in ["https://example.com/legal", "https://example.com/biblio"] * 2:
+        response = await transport.handle_async_request(httpx.Request("GET", url))
+        await response.aread()
+    assert [str(url) for url in calls] == [
+        "https://example.com/legal",
+        "https://example.com/biblio",
+        "https://example.com/legal",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_forced_posts_are_cached_per_body(tmp_path):
+    calls = list()
+
+    def handler(request):
+        calls.append(request.content)
+        return httpx.Response(200, json={"query": json.loads(request.content)})
+
+    policies = CachePolicies({r"/queries$": {"mode": "force", "ttl": 3600}})
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(handler),
+        storage=AsyncCacheStorage(SQLiteCache(tmp_path / "http_cache.sqlite"), policies=policies),
+        controller=PolicyController(policies),
+    )
+    bodies = [{"q": 1}, {"q": 2}, {"q": 1}]
+    for body in bodies:
+        response = await transport.handle_async_request(
+            httpx.Request("POST", "https://example.com/api/queries", json=body)
+        )
+        await response.aread()
+        assert response.json() == {"query": body}
+    assert calls == [b'{"q": 1}', b'{"q": 2}']
+    assert response.extensions["from_cache"]
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_session_coalesces_identical_requests():
+    calls = list()
+
+    async def handler(request):
+        calls.append(str(request.url))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"url": str(request.url)})
+
+    session = PatentClientSession(transport=httpx.MockTransport(handler))
+    urls = ["https://example.com/biblio/1"] * 3 + ["https://example.com/biblio/2"]
+    responses = [r async for r in abounded_map(session.get, urls, limit=4)]
+    assert [r.json()["url"] for r in responses] == urls
+    assert sorted(calls) == ["https://example.com/biblio/1", "https://example.com/biblio/2"]
+    posts = abounded_map(lambda url: session.post(url, json={}), urls[:2], limit=2)
+    assert len([r async for r in posts]) == 2
+    assert len(calls) == 4
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_session_records_metrics(tmp_path):
+    def handler(request):
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        # Immediately stale, so the second biblio request is revalidated
+        headers = {"ETag": '"v1"', "Cache-Control": "max-age=0", "Date": formatdate(usegmt=True)}
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, text="body", headers=headers)
+
+    policies = CachePolicies({r"/images/": ["force"]})
+    transport = hishel.AsyncCacheTransport(
+        transport=httpx.MockTransport(handler),
+        storage=AsyncCacheStorage(SQLiteCache(tmp_path / "http_cache.sqlite"), policies=policies),
+        controller=PolicyController(policies),
+    )
+    session = PatentClientSession(transport=transport)
+    metrics.reset()
+    for url in ["/images/1", "/images/2", "/images/1", "/biblio/1", "/biblio/1", "/missing"]:
+        await session.get(f"https://metrics.example.com{url}")
+
+    hosts = metrics.snapshot()["hosts"]["metrics.example.com"]
+    images, biblio = hosts["/images/{}"], hosts["/biblio/{}"]
+    assert (images["requests"], images["cache_miss"], images["cache_hit"]) == (3, 2, 1)
+    assert images["bytes_in"] == 12
+    assert images["cache_bytes_stored"] > 0
+    assert (biblio["cache_miss"], biblio["cache_revalidated"]) == (1, 1)
+    assert hosts["/missing"]["errors_4xx"] == 1
+    assert hosts["/missing"]["statuses"] == {404: 1}
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_session_retries_transient_errors():
+    calls = list()
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path in ("/reset", "/order") and calls.count(request.url.path) == 1:
+            raise httpx.ReadError("Connection reset by peer")
+        if request.url.path == "/busy" and calls.count("/busy") < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, text="ok")
+
+    policy = RetryPolicy(statuses={503: 5}, connection_retries=1, backoff=0.001)
+    session = PatentClientSession(transport=httpx.MockTransport(handler), retry_policy=policy)
+    assert (await session.get("https://retry.example.com/busy")).status_code == 200
+    search = await session.post("https://retry.example.com/reset", extensions={"idempotent": True})
+    assert search.status_code == 200
+    # Other POSTs might not be safe to send twice
+    with pytest.raises(httpx.ReadError):
+        await session.post("https://retry.example.com/order")
+    assert (await session.get("https://retry.example.com/missing")).status_code == 404
+    assert calls == ["/busy"] * 3 + ["/reset"] * 2 + ["/order", "/missing"]
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_session_gives_up_at_limit_and_deadline():
+    calls = list()
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/throttled":
+            return httpx.Response(429, headers={"Retry-After": "3600"})
+        raise httpx.ConnectTimeout("timed out")
+
+    policy = RetryPolicy(statuses={429: 5}, connection_retries=2, backoff=0.001, deadline=60)
+    session = PatentClientSession(transport=httpx.MockTransport(handler), retry_policy=policy)
+    # Waiting an hour would pass the deadline, so the 429 is returned straight away
+    assert (await session.get("https://retry.example.com/throttled")).status_code == 429
+    with pytest.raises(httpx.ConnectTimeout):
+        await session.get("https://retry.example.com/down")
+    assert calls == ["/throttled"] + ["/down"] * 3
+
+
+class RangeServer:
+    """Mock transport handler serving one file, with or without Range support"""
+
+    def __init__(self, data, ranges=True, fail_once=()):
+        self.data = data
+        self.ranges = ranges
+        self.fail_once = set(fail_once)
+        self.calls = list()
+
+    def __call__(self, request):
+        header = request.headers.get("Range")
+        self.calls.append(header)
+        if header is None or not self.ranges:
+            return httpx.Response(200, content=self.data)
+        start, end = (int(x) for x in header.removeprefix("bytes=").split("-"))
+        body = self.data[start : end + 1]
+        if header in self.fail_once:
+            # The connection drops halfway through the segment
+            self.fail_once.remove(header)
+            body = body[: len(body) // 2]
+        return httpx.Response(
+            206,
+            content=body,
+            headers={"Content-Range": f"bytes {start}-{end}/{len(self.data)}"},
+        )
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_download_ranges(tmp_path):
+    data = bytes(range(256)) * 40
+    server = RangeServer(data, fail_once=["bytes=2048-3071"])
+    policy = RetryPolicy(connection_retries=1, backoff=0.001)
+    session = PatentClientSession(transport=httpx.MockTransport(server), retry_policy=policy)
+    out = tmp_path / "file.zip"
+    result = await session.download_ranges(
+        "https://bulk.example.com/file.zip", out, size=len(data), connections=3, segment_size=1024
+    )
+    assert result == out
+    assert out.read_bytes() == data
+    assert sorted(tmp_path.iterdir()) == [out]
+    # A probe, ten segments and one retry of the broken segment
+    assert len(server.calls) == 12
+    assert server.calls.count("bytes=2048-3071") == 2
+
+    # A complete file isn't fetched again
+    server.calls.clear()
+    await session.download_ranges("https://bulk.example.com/file.zip", out, size=len(data))
+    assert server.calls == []
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_download_ranges_resumes(tmp_path):
+    data = bytes(range(256)) * 40
+    server = RangeServer(data)
+    session = PatentClientSession(transport=httpx.MockTransport(server))
+    out = tmp_path / "file.zip"
+    # An earlier run finished segments 0, 1 and 5 before it was interrupted
+    part = bytearray(len(data))
+    for segment in (0, 1, 5):
+        part[segment * 1024 : (segment + 1) * 1024] = data[segment * 1024 : (segment + 1) * 1024]
+    (tmp_path / "file.zip.part").write_bytes(bytes(part))
+    manifest = {
+        "url": "https://bulk.example.com/file.zip",
+        "size": len(data),
+        "segment_size": 1024,
+        "done": [0, 1, 5],
+    }
+    (tmp_path / "file.zip.part.json").write_text(json.dumps(manifest))
+    await session.download_ranges(
+        "https://bulk.example.com/file.zip", out, size=len(data), segment_size=1024
+    )
+    assert out.read_bytes() == data
+    assert "bytes=0-1023" not in server.calls
+    assert "bytes=5120-6143" not in server.calls
+    assert len(server.calls) == 1 + 7
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_download_without_range_support(tmp_path):
+    data = b"x" * 5000
+    session = PatentClientSession(transport=httpx.MockTransport(RangeServer(data, ranges=False)))
+    out = tmp_path / "file.zip"
+    await session.download_ranges("https://bulk.example.com/file.zip", out, segment_size=1024)
+    assert out.read_bytes() == data
+    with pytest.raises(DownloadError):
+        await session.download_ranges("https://bulk.example.com/other.zip", tmp_path / "o", size=10)
@@ -1,15 +1,12 @@
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import Iterator, Optional, Tuple
 
 from yankee.base.schema import ListCollection
 
 from patent_client._async.http_client import PatentClientSession
 
-from .convert import convert_xml_to_json
-from .model import AssignmentPage
-
-if TYPE_CHECKING:
-    from .model import Assignment
+from .convert import convert_xml_to_json, iter_xml_docs
+from .model import Assignment, AssignmentPage
 
 allowed_filters = [
     "PCTNumber",
@@ -39,6 +36,20 @@ class AssignmentApi:
     async def lookup(
         cls, query: str, filter: str, rows=8, start=0, sort="ExecutionDate+desc"
     ) -> ListCollection["Assignment"]:
+        content = await cls._lookup_xml(query, filter, rows, start, sort)
+        return AssignmentPage.model_validate(convert_xml_to_json(content))
+
+    @classmethod
+    async def iter_lookup(
+        cls, query: str, filter: str, rows=8, start=0, sort="ExecutionDate+desc"
+    ) -> Tuple[int, Iterator["Assignment"]]:
+        """Like lookup, but returns the total and an iterator of assignments converted one by one"""
+        content = await cls._lookup_xml(query, filter, rows, start, sort)
+        num_found, docs = iter_xml_docs(content)
+        return int(num_found), (Assignment.model_validate(doc) for doc in docs)
+
+    @classmethod
+    async def _lookup_xml(cls, query: str, filter: str, rows, start, sort) -> bytes:
         # Because of their limited utility, we omit fields, highlight, and facet
         url = "https://assignment-api.uspto.gov/patent/lookup"
         validate_input(filter, "filter", allowed_filters)
@@ -56,7 +67,7 @@ class AssignmentApi:
             headers={"Accept": "application/xml"},
         )
         response.raise_for_status()
-        return AssignmentPage.model_validate(convert_xml_to_json(response.content))
+        return response.content
 
     @classmethod
     async def download_pdf(cls, reel: str, frame: str, path: Optional[Path] = None) -> Path:
@@ -1,7 +1,8 @@
 import json
 from pathlib import Path
 
-from .convert import convert_xml_to_json
+from .convert import convert_xml_to_json, iter_bulk_docs, iter_xml_docs
+from .model import Assignment
 
 fixtures = Path(__file__).parent / "fixtures"
 
@@ -31,3 +32,39 @@ def test_assignment_3():
     # output_doc.write_text(json.dumps(output_data, indent=2))
     expected_data = json.loads(output_doc.read_text())
     assert output_data == expected_data
+
+
+def test_iter_xml_docs():
+    input_doc = fixtures / "assignment_3.xml"
+    expected_data = json.loads((fixtures / "assignment_3.json").read_text())
+    num_found, docs = iter_xml_docs(input_doc.read_text())
+    assert num_found == expected_data["numFound"]
+    assert next(docs) == expected_data["docs"][0]
+    assert list(docs) == expected_data["docs"][1:]
+
+
+def test_iter_bulk_docs():
+    docs = list(iter_bulk_docs(str(fixtures / "bulk_assignments.xml")))
+    assert [d["id"] for d in docs] == ["18247-405", "62100-1", "62100-90"]
+    a = Assignment.model_validate(docs[0])
+    assert a.conveyance_text == "NUNC PRO TUNC ASSIGNMENT"
+    assert a.date_produced.isoformat() == "2023-01-04"
+    assert a.recorded_date.isoformat() == "2006-09-14"
+    assert a.correspondent.address == (
+        "FISH & NEAVE IP GROUP, ROPES & GRAY LLP\n1251 AVENUE OF THE AMERICAS C3\n"
+        "NEW YORK, NY 10020-1105"
+    )
+    assert a.assignees[0].address == "15 WEST 36TH STREET\nNEW YORK, NEW YORK 10018"
+    assert a.properties[0].appl_num == "10628795"
+    assert a.properties[0].pat_num == "7130913"
+    assert a.properties[0].publ_num == "20040073746"
+    assert a.properties[0].issue_date.isoformat() == "2006-10-31"
+
+    a = Assignment.model_validate(docs[1])
+    assert a.pat_assignor_earliest_ex_date.isoformat() == "2022-11-15"
+    assert a.assignors[1].acknowledgement_date.isoformat() == "2022-11-16"
+    assert a.properties[1].pct_num == "PCTUS2021012345"
+
+    a = Assignment.model_validate(docs[2])
+    assert a.pat_assignor_earliest_ex_date is None
+    assert a.assignment_record_has_images is False
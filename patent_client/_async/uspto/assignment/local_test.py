@@ -0,0 +1,101 @@
+import shutil
+import zipfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ..bulk_data.manager import FileManager
+from .local import AssignmentDatabase
+from .model import Assignment
+
+fixtures = Path(__file__).parent / "fixtures"
+bulk_file = fixtures / "bulk_assignments.xml"
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = AssignmentDatabase(tmp_path / "assignments.sqlite")
+    database.ingest(bulk_file)
+    yield database
+    database.close()
+
+
+def ids(docs):
+    return [doc["id"] for doc in docs]
+
+
+def test_ingest_is_recorded_per_file(database):
+    assert len(database) == 3
+    assert database.ingested_files() == {"bulk_assignments.xml"}
+    assert database.ingest(bulk_file) == 0
+    # A forced reload replaces rather than duplicates
+    assert database.ingest(bulk_file, force=True) == 3
+    assert database.count([("PatentNumber", "7130913")]) == 1
+
+
+def test_ingest_zip(tmp_path):
+    archive = tmp_path / "ad20230104.zip"
+    with zipfile.ZipFile(archive, "w") as f:
+        f.write(bulk_file, "ad20230104.xml")
+    database = AssignmentDatabase(tmp_path / "assignments.sqlite")
+    assert database.ingest(archive) == 3
+    assert database.ingested_files() == {"ad20230104.zip"}
+
+
+def test_search(database):
+    assert ids(database.search([("PatentNumber", "7,130,913")])) == ["18247-405"]
+    assert ids(database.search([("ApplicationNumber", "17123456")])) == ["62100-1", "62100-90"]
+    assert ids(database.search([("PublicationNumber", "20220185012")])) == ["62100-1"]
+    assert ids(database.search([("PCTNumber", "PCT/US2021/012345")])) == ["62100-1"]
+    assert ids(database.search([("ReelFrame", "018247-0405")])) == ["18247-405"]
+    assert ids(database.search([("CorrespondentName", "acme ip")])) == ["62100-1", "62100-90"]
+    # Names match by prefix, ignoring case and punctuation
+    assert ids(database.search([("OwnerName", "Acme Widgets Inc")])) == ["62100-1"]
+    assert ids(database.search([("PriorOwnerName", "acme")])) == ["62100-90"]
+    assert ids(database.search([("OwnerName", "WIDGETS")])) == []
+
+
+def test_search_order_and_slicing(database):
+    lookups = [("OwnerName", "REALTIME"), ("ApplicationNumber", "17123456")]
+    # Assignments without an execution date come last in either direction
+    assert ids(database.search(lookups)) == ["62100-1", "18247-405", "62100-90"]
+    assert ids(database.search(lookups, descending=False)) == ["18247-405", "62100-1", "62100-90"]
+    assert ids(database.search(lookups, limit=1, offset=1)) == ["18247-405"]
+    assert database.count(lookups) == 3
+    with pytest.raises(ValueError):
+        list(database.search([("Inventor", "SMITH")]))
+
+
+def test_older_versions_do_not_replace_newer(database):
+    doc = next(database.search([("ReelFrame", "62100-1")]))
+    database.ingest_docs([{**doc, "lastUpdateDate": "20200101", "conveyanceText": "OLD"}])
+    doc = next(database.search([("ReelFrame", "62100-1")]))
+    assert doc["conveyanceText"] != "OLD"
+    database.ingest_docs([{**doc, "lastUpdateDate": "20240101", "conveyanceText": "NEW"}])
+    doc = next(database.search([("ReelFrame", "62100-1")]))
+    assert doc["conveyanceText"] == "NEW"
+    assert Assignment.model_validate(doc).conveyance_text == "NEW"
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_ingest_bulk_files(tmp_path, monkeypatch):
+    class FakeFile(SimpleNamespace):
+        async def download(self, path):
+            out = Path(path) / self.name
+            shutil.copy(bulk_file, out)
+            return out
+
+    async def filter_by_short_name(self, short_name, from_date=None, to_date=None):
+        for name in ("ad20230103.xml", "ad20230104.xml"):
+            yield FakeFile(name=name)
+
+    monkeypatch.setattr(FileManager, "filter_by_short_name", filter_by_short_name)
+    database = AssignmentDatabase(tmp_path / "assignments.sqlite")
+    database.ingest(bulk_file, name="ad20230103.xml")
+    count = await database.ingest_bulk_files(download_dir=tmp_path / "bulk")
+    # The first file was already loaded, and the second only repeats its assignments
+    assert count == 3
+    assert database.ingested_files() == {"ad20230103.xml", "ad20230104.xml"}
+    assert list((tmp_path / "bulk").iterdir()) == []
@@ -1,15 +1,18 @@
+import heapq
 import logging
 import re
 import warnings
 from collections.abc import Sequence
+from pathlib import Path
 from typing import AsyncIterator
 
 from urllib3.connectionpool import InsecureRequestWarning
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
 from patent_client.util.manager import AsyncManager
-from patent_client.util.request_util import get_start_and_row_count
 
 from .api import AssignmentApi
+from .local import DEFAULT_DB_PATH, AssignmentDatabase
 from .model import Assignment
 
 warnings.filterwarnings("ignore", category=InsecureRequestWarning)
@@ -43,37 +46,127 @@ class AssignmentManager(AsyncManager["Assignment"]):
     def allowed_filters(self):
         return list(self.fields.keys())
 
+    def local(self, path=None) -> "AssignmentManager":
+        """Answer queries from a local assignment database instead of the Assignment API
+
+        The database is built from the USPTO bulk files with AssignmentDatabase. Names
+        match by prefix and numbers exactly, and results are ordered as by the API.
+        """
+        return self.option(local=str(path or DEFAULT_DB_PATH))
+
+    def _local_database(self) -> AssignmentDatabase:
+        path = self.config.options["local"]
+        if not Path(path).exists():
+            raise FileNotFoundError(
+                f"No local assignment database at {path}. "
+                "Build one with AssignmentDatabase.ingest_bulk_files"
+            )
+        return AssignmentDatabase(path)
+
+    def _local_lookups(self):
+        return [(query["filter"], query["query"]) for query in self.get_queries()]
+
     async def _get_results(self) -> AsyncIterator["Assignment"]:
-        for start, rows in get_start_and_row_count(
-            self.config.limit, self.config.offset, self.page_size
-        ):
-            response = await AssignmentApi.lookup(
-                **{**self.get_query(), "start": start, "rows": rows}
+        if self.config.options.get("local"):
+            # Indexed lookups with blocking sqlite3 calls, which the async client runs on the loop
+            database = self._local_database()
+            docs = database.search(
+                self._local_lookups(),
+                descending=self.get_queries()[0]["sort"].endswith("desc"),
+                limit=self.config.limit,
+                offset=self.config.offset,
             )
-            for doc in response.docs:
+            for doc in docs:
+                yield Assignment.model_validate(doc)
+            return
+        queries = self.get_queries()
+        if len(queries) > 1:
+            async for doc in self._get_merged_results(queries):
                 yield doc
-            if len(response.docs) < rows:
-                break
+            return
+        query = queries[0]
 
-    def get_query(self):
-        """Get assignments.
-        Args:
-            patent: pat no to search
-            application: app no to search
-            assignee: assignee name to search
+        async def fetch_page(start, rows):
+            num_found, docs = await AssignmentApi.iter_lookup(
+                **{**query, "start": start, "rows": rows}
+            )
+            return docs, num_found
+
+        async for doc in self._paginate(fetch_page, self.page_size):
+            yield doc
+
+    async def _get_merged_results(self, queries) -> AsyncIterator["Assignment"]:
+        """Run several lookups concurrently and merge them in execution date order
+
+        The first page of every lookup is fetched `concurrency` at a time. The results are
+        then merged with a heap that holds the next assignment of each lookup, converting
+        them one at a time, and each lookup's next page is fetched when its page runs out. An assignment returned by several lookups
+        is yielded once, keyed by its reel/frame. The limit and offset apply to the merged
+        stream.
         """
-        if len(self.config.filter) > 1:
-            raise ValueError("Assignment API does not support multiple filters!")
-        for key, value in self.config.filter.items():
-            if isinstance(value, Sequence) and not isinstance(value, str):
-                if len(value) > 1:
-                    raise ValueError("Assignment API does not support multiple values!")
-                else:
-                    value = value[0]
-            field = self.fields[key]
-            query = value
-        if field in ["PatentNumber", "ApplicationNumber"]:
-            query = clean_number(query)
+        concurrency = self.config.options.get("concurrency", DEFAULT_CONCURRENCY)
+        descending = queries[0]["sort"].endswith("desc")
+
+        def sort_key(doc):
+            # The API sorts assignments without an execution date last in either direction
+            date = doc.pat_assignor_earliest_ex_date
+            if date is None:
+                return (1, 0)
+            return (0, -date.toordinal() if descending else date.toordinal())
+
+        async def fetch_page(i, start):
+            num_found, docs = await AssignmentApi.iter_lookup(
+                **{**queries[i], "start": start, "rows": self.page_size}
+            )
+            return i, docs, num_found
+
+        pages, heads, next_start, totals, heap = dict(), dict(), dict(), dict(), list()
+
+        async def advance(i):
+            # Move lookup i on to its next assignment, fetching its next page if needed
+            heads[i] = next(pages[i], None)
+            if heads[i] is None and next_start[i] < totals[i]:
+                _, pages[i], _ = await fetch_page(i, next_start[i])
+                next_start[i] += self.page_size
+                heads[i] = next(pages[i], None)
+            if heads[i] is not None:
+                heapq.heappush(heap, (sort_key(heads[i]), i))
+
+        first_pages = abounded_map(
+            lambda i: fetch_page(i, 0), range(len(queries)), limit=concurrency
+        )
+        async for i, docs, num_found in first_pages:
+            pages[i], next_start[i], totals[i] = docs, self.page_size, num_found
+            await advance(i)
+
+        seen = set()
+        skip = self.config.offset or 0
+        remaining = self.config.limit
+        while heap:
+            _, i = heapq.heappop(heap)
+            doc = heads[i]
+            await advance(i)
+            if doc.id in seen:
+                continue
+            seen.add(doc.id)
+            if skip:
+                skip -= 1
+                continue
+            yield doc
+            if remaining is not None:
+                remaining -= 1
+                if remaining <= 0:
+                    return
+
+    def get_queries(self):
+        """Build one lookup per filter value
+
+        The Assignment API takes a single field and value per lookup, so a filter with
+        several values, or several filters, becomes several lookups whose results are
+        combined (any of them may match).
+        """
+        if not self.config.filter:
+            raise ValueError("Assignment API requires a filter!")
         # Handle Ordering
         order_map = {
             "execution_date": "ExecutionDate+asc",
@@ -86,18 +179,48 @@ class AssignmentManager(AsyncManager["Assignment"]):
         else:
             sort = "ExecutionDate+desc"
 
-        # if isinstance(query, list):
-        #    query = [f'"{q}"' for q in query]
+        queries = list()
+        for key, values in self.config.filter.items():
+            if not isinstance(values, Sequence) or isinstance(values, str):
+                values = [values]
+            field = self.fields[key]
+            for value in values:
+                if field in ["PatentNumber", "ApplicationNumber"]:
+                    value = clean_number(value)
+                queries.append({"filter": field, "query": value, "sort": sort})
+        # Drop repeated lookups, e.g. the same patent number written two ways
+        return list({tuple(q.items()): q for q in queries}.values())
 
-        query = {
-            "filter": field,
-            "query": query,
-            "sort": sort,
-        }
-        return query
+    def get_query(self):
+        """Get assignments.
+        Args:
+            patent: pat no to search
+            application: app no to search
+            assignee: assignee name to search
+        """
+        queries = self.get_queries()
+        if len(queries) > 1:
+            raise ValueError("More than one lookup is needed for this query! Use get_queries")
+        return queries[0]
 
     async def count(self) -> int:
-        response = await AssignmentApi.lookup(**self.get_query())
+        """Count the assignments matching the query
+
+        The local database counts in one query, and a single API lookup is counted from
+        the total the API reports. Several lookups can match the same assignment, e.g. one
+        assignment that covers two of the patents searched for, so their totals can't
+        simply be added. Instead every page of every lookup is fetched and the merged,
+        de-duplicated results are counted, which costs as many requests as iterating over
+        the results (up to the limit, if one is set).
+        """
+        if self.config.options.get("local"):
+            max_len = self._local_database().count(self._local_lookups())
+            max_len = max(max_len - (self.config.offset or 0), 0)
+            return min(max_len, self.config.limit) if self.config.limit else max_len
+        queries = self.get_queries()
+        if len(queries) > 1:
+            return len([doc async for doc in self._get_merged_results(queries)])
+        response = await AssignmentApi.lookup(**queries[0])
         max_len = response.num_found
         return min(max_len, self.config.limit) if self.config.limit else max_len
 
@@ -2,6 +2,7 @@ import calendar
 import datetime
 import typing as tp
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
 from patent_client.util.manager import AsyncManager
 
 from .api import BulkDataApi
@@ -17,6 +18,10 @@ def date_ranges(start_date: datetime.date, end_date: datetime.date):
         start_date.month,
         calendar.monthrange(start_date.year, start_date.month)[1],
     )
+    if end_of_month.date() >= end_date:
+        # Start and end are in the same month
+        yield (start_date, end_date)
+        return
     yield (start_date, end_of_month.date())
 
     # Full months between start and end date
@@ -66,13 +71,25 @@ class FileManager(AsyncManager):
                 else datetime.date.fromisoformat(to_date)
             )
         if from_date is None or to_date is None:
-            product = await BulkDataApi.get_by_short_name(short_name)
+            product = await BulkDataApi.get_product(short_name)
             from_date = from_date or product.from_date
             to_date = to_date or product.to_date
-        for start_date, end_date in date_ranges(from_date, to_date):
+
+        async def fetch_window(window):
+            start_date, end_date = window
             chunk = await BulkDataApi.get_by_short_name(
                 short_name, from_date=start_date, to_date=end_date
             )
-            if chunk.files:
-                for file in chunk.files:
-                    yield file
+            return sorted(chunk.files or list(), key=lambda f: (f.from_date, f.name))
+
+        # Month windows are fetched concurrently, and yielded in date order
+        concurrency = self.config.options.get("concurrency", DEFAULT_CONCURRENCY)
+        windows = abounded_map(fetch_window, date_ranges(from_date, to_date), limit=concurrency)
+        seen = set()
+        async for files in windows:
+            for file in files:
+                # A file can span two windows
+                if file.identifier in seen:
+                    continue
+                seen.add(file.identifier)
+                yield file
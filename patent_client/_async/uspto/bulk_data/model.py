@@ -4,6 +4,7 @@ from pathlib import Path
 
 from pydantic import Field
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY
 from patent_client.util.pydantic_util import BaseModel
 
 
@@ -18,10 +19,25 @@ class File(BaseModel):
     type: str = Field(alias="fileType")
     release_date: datetime.date = Field(alias="fileReleaseDate")
 
-    async def download(self, path: tp.Optional[tp.Union[str, Path]]):
+    async def download(
+        self,
+        path: tp.Optional[tp.Union[str, Path]] = None,
+        connections: int = DEFAULT_CONCURRENCY,
+    ) -> Path:
+        """Download the file to path, or into path if it is a directory
+
+        The file is fetched in byte ranges over `connections` parallel connections and
+        checked against `size`. An interrupted download resumes from the ``.part`` file it
+        left behind, and a complete file already at path is not downloaded again.
+        """
         from .api import client
 
-        return await client.download(self.download_url, path=path)
+        path = Path.cwd() if path is None else Path(path)
+        if path.is_dir():
+            path = path / self.name
+        return await client.download_ranges(
+            self.download_url, path, size=self.size, connections=connections
+        )
 
 
 class Product(BaseModel):
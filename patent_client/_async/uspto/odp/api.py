@@ -1,10 +1,14 @@
 import typing as tp
 from urllib.parse import quote
 
+import httpx
+
 from patent_client import SETTINGS
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, abounded_map
 
 from ...http_client import PatentClientSession
 from .model import (
+    ApplicationRecord,
     Assignment,
     Continuity,
     CustomerNumber,
@@ -26,6 +30,17 @@ def urlescape(s: str) -> str:
 
 class ODPApi:
     base_url = "https://beta-api.uspto.gov"
+    # Parts of an ApplicationRecord and the methods that fetch them
+    record_parts = {
+        "application": "get_application_data",
+        "continuity": "get_continuity_data",
+        "documents": "get_documents",
+        "transactions": "get_transactions",
+        "assignments": "get_assignments",
+        "foreign_priority": "get_foreign_priority_data",
+        "term_adjustment": "get_patent_term_adjustment_data",
+        "attorney": "get_attorney_data",
+    }
 
     def __init__(self):
         if SETTINGS.odp_api_key is None:
@@ -36,7 +51,10 @@ class ODPApi:
         url = self.base_url + "/api/v1/patent/applications/search"
         search_data = prune(search_request.model_dump())
         response = await self.client.post(
-            url, json=search_data, headers={"accept": "application/json"}
+            url,
+            json=search_data,
+            headers={"accept": "application/json"},
+            extensions={"idempotent": True},  # A search, so safe to retry
         )
         if response.status_code == 404 and "No matching records found" in response.text:
             return {
@@ -141,3 +159,59 @@ class ODPApi:
         response = await self.client.get(url)
         response.raise_for_status()
         return [Document(**document) for document in response.json()["documentBag"]]
+
+    # Composite Records
+
+    async def get_full_record(
+        self, application_id: str, parts: tp.Optional[tp.Iterable[str]] = None
+    ) -> ApplicationRecord:
+        """Fetch several parts of an application at once
+
+        Args:
+            application_id: Application number
+            parts: Names from `record_parts` to fetch. All of them by default.
+
+        The endpoints are requested concurrently. A part that ODP has no data for (404) is
+        left as None; any other error is raised.
+        """
+        parts = list(self.record_parts) if parts is None else list(parts)
+        unknown = set(parts) - set(self.record_parts)
+        if unknown:
+            raise ValueError(
+                f"Unknown record parts {sorted(unknown)}! Must be in {list(self.record_parts)}"
+            )
+
+        async def fetch(part):
+            try:
+                return await getattr(self, self.record_parts[part])(application_id)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    return None
+                raise
+
+        results = [r async for r in abounded_map(fetch, parts, limit=max(len(parts), 1))]
+        return ApplicationRecord(appl_id=application_id, **dict(zip(parts, results)))
+
+    async def get_full_records(
+        self,
+        application_ids: tp.Iterable[str],
+        parts: tp.Optional[tp.Iterable[str]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> tp.List[tp.Union[ApplicationRecord, Exception]]:
+        """Fetch full records for many applications, `concurrency` applications at a time
+
+        Each application's parts are also fetched concurrently, so up to `concurrency` times
+        the number of parts requests can be in flight. Results are returned in the same
+        order as `application_ids`, and failed lookups are returned as exceptions. Repeated
+        numbers are fetched once.
+        """
+        application_ids = list(application_ids)
+        parts = None if parts is None else list(parts)
+        unique = list(dict.fromkeys(application_ids))
+
+        async def fetch(application_id):
+            return await self.get_full_record(application_id, parts=parts)
+
+        results = abounded_map(fetch, unique, limit=concurrency, return_exceptions=True)
+        by_id = dict(zip(unique, [result async for result in results]))
+        return [by_id[application_id] for application_id in application_ids]
@@ -1,7 +1,25 @@
+from pathlib import Path
+
+import httpx
 import pytest
 
+from patent_client._async.http_client import PatentClientSession
+
 from .api import ODPApi
-from .model import SearchRequest
+from .model import ApplicationRecord, SearchRequest
+
+fixture_dir = Path(__file__).parent / "fixtures"
+
+# Endpoint suffix -> fixture file
+FIXTURES = {
+    "adjustment": "adjustment.json",
+    "assignment": "assignment.json",
+    "attorney": "attorney.json",
+    "continuity": "continuity.json",
+    "documents": "documents.json",
+    "foreign-priority": "foreign_priority.json",
+    "transactions": "transactions.json",
+}
 
 
 @pytest.fixture
@@ -84,3 +102,56 @@ async def test_get_documents(odp_api):
     application_id = "15123456"
     response = await odp_api.get_documents(application_id)
     assert len(response) > 0, "Expected at least one document"
+
+
+@pytest.fixture
+def fake_odp_api():
+    requests = list()
+
+    def handler(request):
+        requests.append(request.url.path)
+        *_, appl_id, endpoint = request.url.path.split("/")
+        if endpoint.isdigit():
+            appl_id, endpoint = endpoint, None
+        if appl_id == "99999999":
+            return httpx.Response(400, json={"error": "Bad Request"})
+        if appl_id == "16000000" and endpoint == "foreign-priority":
+            return httpx.Response(404, json={"error": "Not Found"})
+        fixture = FIXTURES.get(endpoint, "application.json")
+        return httpx.Response(200, content=(fixture_dir / fixture).read_bytes())
+
+    api = ODPApi()
+    api.client = PatentClientSession(transport=httpx.MockTransport(handler))
+    api.requests = requests
+    return api
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_get_full_record(fake_odp_api):
+    record = await fake_odp_api.get_full_record("16000000")
+    assert isinstance(record, ApplicationRecord)
+    assert len(fake_odp_api.requests) == len(ODPApi.record_parts)
+    assert record.application.appl_id is not None
+    assert record.documents and record.transactions and record.assignments
+    assert record.term_adjustment is not None and record.attorney is not None
+    assert record.foreign_priority is None  # 404
+
+    fake_odp_api.requests.clear()
+    record = await fake_odp_api.get_full_record("16000001", parts=["continuity", "documents"])
+    assert len(fake_odp_api.requests) == 2
+    assert record.continuity is not None and record.transactions is None
+
+    with pytest.raises(ValueError):
+        await fake_odp_api.get_full_record("16000001", parts=["claims"])
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_get_full_records(fake_odp_api):
+    ids = ["16000001", "99999999", "16000002", "16000001"]
+    records = await fake_odp_api.get_full_records(ids, parts=["application"], concurrency=2)
+    assert [r.appl_id for r in (records[0], records[2], records[3])] == [ids[0], ids[2], ids[3]]
+    assert records[0].application.appl_id is not None
+    assert isinstance(records[1], httpx.HTTPStatusError)
+    assert len(fake_odp_api.requests) == 3  # Repeated numbers are fetched once
@@ -1,5 +1,11 @@
+import json
+
+import httpx
 import pytest
 
+from patent_client._async.http_client import PatentClientSession
+
+from . import manager as manager_module
 from .model import USApplication, USApplicationBiblio
 
 
@@ -74,3 +80,55 @@ async def test_can_get_pct_application():
 async def test_can_get_by_customer_number():
     result = USApplication.objects.filter(customer_number="31625")
     assert await result.count() > 0
+
+
+class FakeODP:
+    total = 120
+
+    def __init__(self):
+        self.searches = list()
+        self.lookups = list()
+
+    def __call__(self, request):
+        if request.url.path.endswith("/search"):
+            body = json.loads(request.content)
+            self.searches.append(body)
+            offset, limit = body["pagination"]["offset"], body["pagination"]["limit"]
+            numbers = range(16000000 + offset, 16000000 + min(offset + limit, self.total))
+            bag = [
+                {"applicationNumberText": str(n), "inventionTitle": f"Title {n}"} for n in numbers
+            ]
+            return httpx.Response(200, json={"count": self.total, "patentBag": bag})
+        appl_id = request.url.path.rsplit("/", 1)[1]
+        self.lookups.append(appl_id)
+        record = {"applicationNumberText": appl_id, "inventionTitle": f"Title {appl_id}"}
+        return httpx.Response(200, json={"count": 1, "patentBag": [record]})
+
+
+@pytest.fixture
+def fake_odp(monkeypatch):
+    odp = FakeODP()
+    monkeypatch.setattr(
+        manager_module.api, "client", PatentClientSession(transport=httpx.MockTransport(odp))
+    )
+    return odp
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_search_results_are_fetched_in_order(fake_odp):
+    manager = USApplication.objects.filter(q="tennis").option(concurrency=8)
+    apps = [app async for app in manager]
+    assert [app.appl_id for app in apps] == [str(16000000 + i) for i in range(120)]
+    assert sorted(fake_odp.lookups) == [app.appl_id for app in apps]
+    assert all(search["fields"] == ["applicationNumberText"] for search in fake_odp.searches)
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_full_fields_search_skips_lookups(fake_odp):
+    apps = [app async for app in USApplication.objects.filter(q="tennis").option(full_fields=True)]
+    assert [app.invention_title for app in apps[:2]] == ["Title 16000000", "Title 16000001"]
+    assert len(apps) == 120
+    assert fake_odp.lookups == []
+    assert all("fields" not in search for search in fake_odp.searches)
@@ -1,5 +1,6 @@
 import csv
 import typing as tp
+from functools import lru_cache
 from pathlib import Path
 
 from .model import SearchRequest
@@ -9,18 +10,22 @@ if tp.TYPE_CHECKING:
 
 field_file = Path(__file__).parent / "query_fields.csv"
 
-field_index = dict()
 
-with field_file.open("r") as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        record = {
-            "field_name": row["field_name"],
-            "type": row["type"],
-        }
-        field_index[row["field_name"]] = record
-        field_index[row["underscore_case"]] = record
-        field_index[row["simple_name"]] = record
+@lru_cache(maxsize=None)
+def get_field_index() -> tp.Dict[str, dict]:
+    """Map every accepted spelling of a field name to its record. Loaded on first use"""
+    field_index = dict()
+    with field_file.open("r") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            record = {
+                "field_name": row["field_name"],
+                "type": row["type"],
+            }
+            field_index[row["field_name"]] = record
+            field_index[row["underscore_case"]] = record
+            field_index[row["simple_name"]] = record
+    return field_index
 
 
 def create_post_search_obj(
@@ -32,6 +37,7 @@ def create_post_search_obj(
     )
     q_str = list()
     range_filters = dict()
+    field_index = get_field_index()
     for field, value in config.filter.items():
         if field.endswith("_gte") or field.endswith("_lte"):
             field_name, tail = field.rsplit("_", 1)
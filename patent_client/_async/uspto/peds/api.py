@@ -113,6 +113,7 @@ class PatentExaminationDataSystemApi:
             url,
             json=params,
             headers={"Accept": "application/json"},
+            extensions={"idempotent": True},  # A search, so safe to retry
         )
         await self.check_response(response)
         return PedsPage.model_validate(response.json())
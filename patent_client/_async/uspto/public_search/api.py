@@ -1,11 +1,15 @@
 import asyncio
 import json
+from collections import OrderedDict
 from copy import deepcopy
+from functools import cached_property
 from pathlib import Path
 
 import httpx
 
 from patent_client._async.http_client import PatentClientSession
+from patent_client.util.concurrency import AsyncLock, AsyncSingleFlight
+from patent_client.util.metrics import metrics
 
 from .model import PublicSearchBiblioPage, PublicSearchDocument
 
@@ -23,8 +27,19 @@ def force_list(obj):
 
 
 class PublicSearchApi:
+    max_cached_queries = 256
+
     def __init__(self):
-        self.client = PatentClientSession(
+        self.session = dict()
+        self.case_id = None
+        self.access_token = None
+        self._session_lock = None
+        self.queries: OrderedDict[tuple, dict] = OrderedDict()
+        self.query_registrations = AsyncSingleFlight()
+
+    @cached_property
+    def client(self) -> PatentClientSession:
+        return PatentClientSession(
             headers={
                 "X-Requested-With": "XMLHttpRequest",
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
@@ -37,12 +52,12 @@ class PublicSearchApi:
             http2=True,
             follow_redirects=True,
         )
-        self.session = dict()
-        self.case_id = None
-        self.queries = dict()
-        self.search_query = json.loads((Path(__file__).parent / "search_query.json").read_text())
 
-    async def run_query(
+    @cached_property
+    def search_query(self) -> dict:
+        return json.loads((Path(__file__).parent / "search_query.json").read_text())
+
+    def build_query_data(
         self,
         query,
         start=0,
@@ -52,10 +67,7 @@ class PublicSearchApi:
         sources=["US-PGPUB", "USPAT", "USOCR"],
         expand_plurals=True,
         british_equivalents=True,
-    ) -> "PublicSearchBiblioPage":
-        if self.case_id is None:
-            await self.get_session()
-
+    ) -> dict:
         data = deepcopy(self.search_query)
         data["start"] = start
         data["pageCount"] = limit
@@ -70,15 +82,110 @@ class PublicSearchApi:
         ]
         data["query"]["plurals"] = expand_plurals
         data["query"]["britishEquivalents"] = british_equivalents
+        return data
 
+    async def get_query_plan(self, data) -> dict:
+        """Register a query with Public Search and return the server-side query state, which
+        includes the result count ("numResults"). Plans are cached per query, sort and sources
+        for the life of the session, so paging through a query only registers it once, even
+        when several pages are fetched at the same time."""
+        query = data["query"]
+        key = (
+            query["q"],
+            data["sort"],
+            tuple(f["databaseName"] for f in query["databaseFilters"]),
+            query["op"],
+            query["plurals"],
+            query["britishEquivalents"],
+        )
+        if key in self.queries:
+            self.queries.move_to_end(key)
+            return self.queries[key]
+        return await self.query_registrations.run(key, lambda: self.register_query(key, query))
+
+    async def register_query(self, key, query) -> dict:
+        counts_url = "https://ppubs.uspto.gov/dirsearch-public/searches/counts"
+        access_token = self.access_token
         counts = await self.make_request(
-            "POST",
-            "https://ppubs.uspto.gov/dirsearch-public/searches/counts",
-            json=data["query"],
+            "POST", counts_url, json=query, refresh_session=False, extensions={"idempotent": True}
         )
+        if counts.status_code == 403:
+            # The new session has a new case id, so the query is sent again under that one
+            await self.refresh_session(counts, access_token)
+            query["caseId"] = self.case_id
+            counts = await self.make_request(
+                "POST", counts_url, json=query, extensions={"idempotent": True}
+            )
         counts.raise_for_status()
+        plan = counts.json()
+        if plan.get("error", None) is not None:
+            raise UsptoException(
+                f"Error #{plan['error']['errorCode']}\n{plan['error']['errorMessage']}"
+            )
+        self.queries[key] = plan
+        while len(self.queries) > self.max_cached_queries:
+            self.queries.popitem(last=False)
+        return plan
+
+    async def count(
+        self,
+        query,
+        sort="date_publ desc",
+        default_operator="OR",
+        sources=["US-PGPUB", "USPAT", "USOCR"],
+        expand_plurals=True,
+        british_equivalents=True,
+    ) -> int:
+        await self.ensure_session()
+        data = self.build_query_data(
+            query,
+            sort=sort,
+            default_operator=default_operator,
+            sources=sources,
+            expand_plurals=expand_plurals,
+            british_equivalents=british_equivalents,
+        )
+        plan = await self.get_query_plan(data)
+        return plan["numResults"]
+
+    async def run_query(
+        self,
+        query,
+        start=0,
+        limit=500,
+        sort="date_publ desc",
+        default_operator="OR",
+        sources=["US-PGPUB", "USPAT", "USOCR"],
+        expand_plurals=True,
+        british_equivalents=True,
+    ) -> "PublicSearchBiblioPage":
+        await self.ensure_session()
+        query_args = dict(
+            query=query,
+            start=start,
+            limit=limit,
+            sort=sort,
+            default_operator=default_operator,
+            sources=sources,
+            expand_plurals=expand_plurals,
+            british_equivalents=british_equivalents,
+        )
+        data = self.build_query_data(**query_args)
+        await self.get_query_plan(data)
         search_url = "https://ppubs.uspto.gov/dirsearch-public/searches/searchWithBeFamily"
-        query_response = await self.make_request("POST", search_url, json=data)
+        access_token = self.access_token
+        query_response = await self.make_request(
+            "POST", search_url, json=data, refresh_session=False, extensions={"idempotent": True}
+        )
+        if query_response.status_code == 403:
+            # A new session has a new case id and none of our queries, so the query is rebuilt
+            # and registered again before it is retried
+            await self.refresh_session(query_response, access_token)
+            data = self.build_query_data(**query_args)
+            await self.get_query_plan(data)
+            query_response = await self.make_request(
+                "POST", search_url, json=data, extensions={"idempotent": True}
+            )
         query_response.raise_for_status()
         result = query_response.json()
         if result.get("error", None) is not None:
@@ -87,17 +194,21 @@ class PublicSearchApi:
             )
         return PublicSearchBiblioPage.model_validate(result)
 
-    async def make_request(self, method, url, **kwargs):
+    async def make_request(self, method, url, refresh_session=True, **kwargs):
+        """Send a request, replacing the session and retrying once if the session has expired.
+        Callers whose request carries the session's case id pass refresh_session=False and
+        handle the 403 themselves."""
+        access_token = self.access_token
         response = await self.client.request(method, url, **kwargs)
-        if response.status_code == 403:
-            await self.get_session()
-            response = await self.client.request(method, url, **kwargs)
-        if response.status_code == 429:
-            wait_time = int(response.headers["x-rate-limit-retry-after-seconds"]) + 1
-            await asyncio.sleep(wait_time)
+        if response.status_code == 403 and refresh_session:
+            await self.refresh_session(response, access_token)
             response = await self.client.request(method, url, **kwargs)
         return response
 
+    async def refresh_session(self, response, stale_token):
+        metrics.increment(response.request.url, "retries")
+        await self.ensure_session(stale_token=stale_token)
+
     async def get_document(self, bib) -> "PublicSearchDocument":
         url = f"https://ppubs.uspto.gov/dirsearch-public/internal/patents/{bib.guid}/highlight"
         params = {
@@ -110,6 +221,20 @@ class PublicSearchApi:
         response.raise_for_status()
         return PublicSearchDocument.model_validate(response.json())
 
+    @property
+    def session_lock(self):
+        # Created lazily so the lock is bound to the event loop that actually uses it
+        if self._session_lock is None:
+            self._session_lock = AsyncLock()
+        return self._session_lock
+
+    async def ensure_session(self, stale_token=None):
+        """Start a session if none exists, or replace the session if it still uses stale_token.
+        Concurrent requests that hit the same expired session only trigger a single refresh."""
+        async with self.session_lock:
+            if self.access_token is None or self.access_token == stale_token:
+                await self.get_session()
+
     async def get_session(self):
         self.client.cookies = httpx.Cookies()
         response = await self.client.get("https://ppubs.uspto.gov/pubwebapp/")
@@ -123,6 +248,8 @@ class PublicSearchApi:
             },
         )  # json=str(random.randint(10000, 99999)))
         self.session = response.json()
+        # Registered queries belong to the old session
+        self.queries.clear()
         self.case_id = self.session["userCase"]["caseId"]
         self.access_token = response.headers["X-Access-Token"]
         self.client.headers["X-Access-Token"] = self.access_token
@@ -151,8 +278,7 @@ class PublicSearchApi:
         out_path = Path(path).expanduser() / f"{obj.guid}.pdf"
         if out_path.exists():
             return out_path
-        if self.case_id is None:
-            await self.get_session()
+        await self.ensure_session()
         try:
             print_job_id = await self._request_save(obj)
         except httpx.HTTPStatusError:
@@ -1,7 +1,17 @@
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
 import pytest
 
+from patent_client._async.http_client import PatentClientSession
+from patent_client.util.concurrency import abounded_map
+
 from .api import PublicSearchApi
 
+fixtures = Path(__file__).parent / "fixtures"
+
 
 @pytest.mark.asyncio
 async def test_simple_search():
@@ -11,3 +21,97 @@ async def test_simple_search():
     )
     assert results.num_found == 1
     assert results.docs[0].publication_number == "6013599"
+
+
+@pytest.mark.asyncio
+async def test_query_plan_is_reused_across_pages_and_counts():
+    api = PublicSearchApi()
+    api.access_token = "token"
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    requests = list()
+
+    async def make_request(method, url, **kwargs):
+        requests.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/counts"):
+            content = {"numResults": search_result["numFound"], "error": None}
+        else:
+            content = search_result
+        return httpx.Response(200, json=content, request=httpx.Request(method, url))
+
+    api.make_request = make_request
+    assert await api.count("tennis.ti.") == 500
+    await api.run_query("tennis.ti.", start=0)
+    await api.run_query("tennis.ti.", start=500)
+    assert requests == ["counts", "searchWithBeFamily", "searchWithBeFamily"]
+    await api.run_query("tennis.ti.", sources=["USPAT"])
+    assert requests[-2:] == ["counts", "searchWithBeFamily"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_pages_register_query_once():
+    api = PublicSearchApi()
+    api.access_token = "token"
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    requests = list()
+
+    async def make_request(method, url, **kwargs):
+        requests.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/counts"):
+            await asyncio.sleep(0.05)
+            content = {"numResults": search_result["numFound"], "error": None}
+        else:
+            content = search_result
+        return httpx.Response(200, json=content, request=httpx.Request(method, url))
+
+    async def fetch_page(start):
+        return await api.run_query("tennis.ti.", start=start)
+
+    api.make_request = make_request
+    pages = [page async for page in abounded_map(fetch_page, [0, 500, 1000], limit=3)]
+    assert len(pages) == 3
+    assert requests.count("counts") == 1
+    assert requests.count("searchWithBeFamily") == 3
+
+
+@pytest.mark.no_vcr
+@pytest.mark.asyncio
+async def test_expired_session_reregisters_query_between_pages():
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    server = dict(case_id=0, token=None, registered=set())
+    searches = list()
+
+    def handler(request):
+        path = request.url.path
+        if path == "/pubwebapp/":
+            return httpx.Response(200)
+        if path.endswith("/users/me/session"):
+            server["case_id"] += 1
+            server["token"] = f"token-{server['case_id']}"
+            server["registered"] = set()
+            return httpx.Response(
+                200,
+                json={"userCase": {"caseId": server["case_id"]}},
+                headers={"X-Access-Token": server["token"]},
+            )
+        if request.headers.get("X-Access-Token") != server["token"]:
+            return httpx.Response(403)
+        body = json.loads(request.content)
+        query = body.get("query", body)
+        if query["caseId"] != server["case_id"]:
+            return httpx.Response(400)
+        if path.endswith("/counts"):
+            server["registered"].add(query["q"])
+            return httpx.Response(200, json={"numResults": 1000, "error": None})
+        if query["q"] not in server["registered"]:
+            return httpx.Response(400)
+        searches.append((query["caseId"], body["start"]))
+        return httpx.Response(200, json=search_result)
+
+    api = PublicSearchApi()
+    api.client = PatentClientSession(transport=httpx.MockTransport(handler))
+    await api.run_query("tennis.ti.", start=0)
+    # The server expires the session between pages
+    server["token"] = "expired"
+    await api.run_query("tennis.ti.", start=500)
+    assert searches == [(1, 0), (2, 500)]
+    assert api.case_id == 2
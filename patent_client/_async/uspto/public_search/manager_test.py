@@ -1,3 +1,7 @@
+import datetime
+import re
+from types import SimpleNamespace
+
 import pytest
 
 from . import (
@@ -7,6 +11,7 @@ from . import (
     PublishedApplication,
     PublishedApplicationBiblio,
 )
+from . import manager as manager_module
 
 
 class TestPatents:
@@ -206,3 +211,98 @@ class TestPublishedApplicationFullTextAsync:
             counter += 1
             assert p != old_p
         assert counter >= 525
+
+
+class FakePublicSearchApi:
+    """Serves an in-memory result set, understanding only the publication date range filter"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = list()
+
+    def matching(self, query, sort="date_publ desc"):
+        docs = self.docs
+        match = re.search(r"@PD>=(\d{8})<=(\d{8})", query)
+        if match:
+            start, end = match.groups()
+            docs = [d for d in docs if start <= d.publication_date.strftime("%Y%m%d") <= end]
+        field, direction = sort.split()[:2]
+        field = {"date_publ": "publication_date", "invention_title_sort": "patent_title"}[field]
+        return sorted(docs, key=lambda d: getattr(d, field), reverse=direction == "desc")
+
+    async def count(self, query, sources=None, sort="date_publ desc"):
+        return len(self.matching(query))
+
+    async def run_query(self, query, start=0, limit=500, sort="date_publ desc", sources=None):
+        self.queries.append((query, start))
+        docs = self.matching(query, sort)[start : start + limit]
+        return SimpleNamespace(docs=docs)
+
+
+class TestShardedSearch:
+    @pytest.fixture
+    def fake_api(self, monkeypatch):
+        first_day = datetime.date(2020, 1, 1)
+        docs = [
+            SimpleNamespace(
+                publication_number=str(10_000_000 + i),
+                publication_date=first_day + datetime.timedelta(days=i // 3),
+                patent_title=f"Title {(i * 37) % 100:03d}",
+            )
+            for i in range(100)
+        ]
+        api = FakePublicSearchApi(docs)
+        monkeypatch.setattr(manager_module, "public_search_api", api)
+        monkeypatch.setattr(PatentBiblio.objects.__class__, "page_size", 7)
+        return api
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_sharded_search_keeps_date_order(self, fake_api):
+        manager = PatentBiblio.objects.filter(cpc_inventive_class="H04W").option(
+            shard=True, shard_size=20, concurrency=3
+        )
+        docs = [doc async for doc in manager]
+        assert sorted(d.publication_number for d in docs) == sorted(
+            d.publication_number for d in fake_api.docs
+        )
+        dates = [d.publication_date for d in docs]
+        assert dates == sorted(dates, reverse=True)
+        # 100 results in five windows, three of which have 21 results and are cut in half
+        shard_queries = {q for q, _ in fake_api.queries if "@PD" in q}
+        assert len(shard_queries) == 8
+        assert max(len(fake_api.matching(q)) for q in shard_queries) <= 20
+
+        subset = [doc async for doc in manager.offset(10).limit(30)]
+        assert [d.publication_number for d in subset] == [d.publication_number for d in docs[10:40]]
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_sharded_search_merges_other_orders(self, fake_api):
+        manager = (
+            PatentBiblio.objects.filter(cpc_inventive_class="H04W")
+            .order_by("patent_title")
+            .option(shard=True, shard_size=20)
+        )
+        titles = [doc.patent_title async for doc in manager]
+        assert titles == sorted(d.patent_title for d in fake_api.docs)
+
+    @pytest.mark.no_vcr
+    @pytest.mark.asyncio
+    async def test_sharded_search_splits_crowded_windows(self, fake_api):
+        # 80 results on the first four days, then one every five days
+        first_day = datetime.date(2020, 1, 1)
+        for i, doc in enumerate(fake_api.docs):
+            days = i // 20 if i < 80 else 4 + (i - 80) * 5
+            doc.publication_date = first_day + datetime.timedelta(days=days)
+        manager = PatentBiblio.objects.filter(cpc_inventive_class="H04W").option(
+            shard=True, shard_size=20, concurrency=3
+        )
+        docs = [doc async for doc in manager]
+        assert sorted(d.publication_number for d in docs) == sorted(
+            d.publication_number for d in fake_api.docs
+        )
+        dates = [d.publication_date for d in docs]
+        assert dates == sorted(dates, reverse=True)
+        shard_queries = {q for q, _ in fake_api.queries if "@PD" in q}
+        assert max(len(fake_api.matching(q)) for q in shard_queries) == 20
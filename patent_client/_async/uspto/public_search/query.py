@@ -1,6 +1,7 @@
 import csv
 import datetime
 from collections.abc import Sequence
+from functools import cached_property, lru_cache
 from pathlib import Path
 
 from dateutil.parser import parse as parse_dt
@@ -11,17 +12,30 @@ class QueryException(Exception):
     pass
 
 
+@lru_cache(maxsize=None)
+def load_query_config() -> tuple:
+    config_file = Path(__file__).parent / "query_config.csv"
+    with config_file.open(encoding="utf-8-sig") as csvfile:
+        reader = csv.DictReader(csvfile)
+        return tuple(reader)
+
+
 class QueryBuilder:
-    def __init__(self):
-        config_file = Path(__file__).parent / "query_config.csv"
-        with config_file.open(encoding="utf-8-sig") as csvfile:
-            reader = csv.DictReader(csvfile)
-            config = list(reader)
-        self.search_keywords = {r["keyword"]: r["query_field"] for r in config if r["query_field"]}
-        self.order_by_keywords = {
-            r["keyword"]: r["order_by_field"] for r in config if r["order_by_field"]
+    # The keyword tables are built from query_config.csv on first use
+
+    @cached_property
+    def search_keywords(self):
+        return {r["keyword"]: r["query_field"] for r in load_query_config() if r["query_field"]}
+
+    @cached_property
+    def order_by_keywords(self):
+        return {
+            r["keyword"]: r["order_by_field"] for r in load_query_config() if r["order_by_field"]
         }
-        self.date_fields = [r["keyword"] for r in config if r["is_date"] == "X"]
+
+    @cached_property
+    def date_fields(self):
+        return [r["keyword"] for r in load_query_config() if r["is_date"] == "X"]
 
     def convert_date(self, date):
         if isinstance(date, str):
@@ -0,0 +1,19 @@
+# ********************************************************************************
+# *         WARNING: This file is automatically generated by unasync.py.         *
+# *                             DO NOT MANUALLY EDIT                             *
+# *            Source File: patent_client/_async/epo/ops/conftest.py             *
+# ********************************************************************************
+
+import time
+
+import pytest
+
+from .session import OpsTokenStore, session
+
+
+@pytest.fixture(autouse=True, scope="session")
+def ops_token(tmp_path_factory):
+    # Recorded cassettes don't include a token request, so start with a placeholder token.
+    # Tests that recorded a rejected token still refresh it from their cassette.
+    session.token_store = OpsTokenStore(tmp_path_factory.mktemp("ops") / "ops_token.json")
+    session.token, session.expires = "placeholder", time.time() + 24 * 60 * 60
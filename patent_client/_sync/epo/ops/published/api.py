@@ -5,10 +5,15 @@
 # ********************************************************************************
 
 import logging
+import re
+import typing as tp
 from io import BytesIO
 
+from lxml import etree
 from yankee.data import AttrDict
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, bounded_map
+
 from ..session import session
 from .model.biblio import BiblioResult
 from .model.fulltext import Claims, Description
@@ -17,8 +22,54 @@ from .model.search import Search
 
 logger = logging.getLogger(__name__)
 
+EXCHANGE_NS = "http://www.epo.org/exchange"
+NUMBER_RE = re.compile(r"^(?P<country>[A-Z]{2})\.?(?P<number>[0-9A-Z]+?)\.?(?P<kind>[A-Z][0-9]?)?$")
+
+
+def split_exchange_documents(
+    text: str, numbers: tp.Iterable[str], match_kind: bool = True
+) -> tp.Dict[str, str]:
+    """Split a multi-document OPS response into one response per requested number
+
+    Each exchange-document is matched to a number by its country, doc-number and, if the
+    number has one and match_kind is True, kind attributes. Each returned document keeps
+    the envelope of the original response, so it parses like a single-document response.
+    Numbers with no matching document are left out.
+    """
+    root = etree.fromstring(text.encode("utf-8"))
+    documents = list()
+    for doc in root.iter(f"{{{EXCHANGE_NS}}}exchange-document"):
+        documents.append((doc.getparent(), doc))
+    for parent, doc in documents:
+        parent.remove(doc)
+    results = dict()
+    for number in numbers:
+        match = NUMBER_RE.match(number.replace(" ", "").upper())
+        if match is None:
+            continue
+        matches = [
+            (parent, doc)
+            for parent, doc in documents
+            if doc.get("country") == match.group("country")
+            and doc.get("doc-number") == match.group("number")
+            and (
+                not match_kind or not match.group("kind") or doc.get("kind") == match.group("kind")
+            )
+        ]
+        if not matches:
+            continue
+        for parent, doc in matches:
+            parent.append(doc)
+        results[number] = etree.tostring(root, encoding="unicode")
+        for parent, doc in matches:
+            parent.remove(doc)
+    return results
+
 
 class PublishedBiblioApi:
+    # Published-data POST requests accept up to 100 numbers
+    batch_size = 100
+
     @classmethod
     def get_constituents(
         cls, number, doc_type="publication", format="docdb", constituents=("biblio",)
@@ -28,6 +79,7 @@ class PublishedBiblioApi:
         doc_type: document type (application / publication)
         format: document number format (original / docdb / epodoc)
         constituents: what data to retrieve. Can be combined. (biblio / abstract / full-cycle)
+
         """
         base_url = (
             f"http://ops.epo.org/3.2/rest-services/published-data/{doc_type}/{format}/{number}/"
@@ -36,6 +88,7 @@ class PublishedBiblioApi:
             constituents = (constituents,)
         url = base_url + ",".join(constituents)
         response = session.get(url)
+        response.raise_for_status()
         return response.text
 
     @classmethod
@@ -51,6 +104,107 @@ class PublishedBiblioApi:
     def get_full_cycle(cls, number, doc_type="publication", format="docdb"):
         return cls.get_constituents(number, doc_type, format, constituents="full-cycle")
 
+    @classmethod
+    def get_constituents_many(
+        cls,
+        numbers,
+        doc_type="publication",
+        format="docdb",
+        constituents=("biblio",),
+        concurrency=DEFAULT_CONCURRENCY,
+        return_exceptions=False,
+    ) -> tp.Dict[str, str]:
+        """Batch form of get_constituents
+
+        Numbers are sent in POST requests of up to `batch_size` numbers each, and the
+        responses are split back into one XML document per number. Numbers that OPS
+        doesn't return are missing from the result.
+
+        If a batch request fails, the numbers in that batch are looked up one by one. Numbers
+        whose own lookup fails are left out too, unless `return_exceptions` is True, in which
+        case they map to the exception.
+        """
+        if isinstance(constituents, str):
+            constituents = (constituents,)
+        url = (
+            f"http://ops.epo.org/3.2/rest-services/published-data/{doc_type}/{format}/"
+            + ",".join(constituents)
+        )
+        unique = list(dict.fromkeys(numbers))
+        chunks = [unique[i : i + cls.batch_size] for i in range(0, len(unique), cls.batch_size)]
+
+        def post_chunk(chunk):
+            response = session.post(
+                url,
+                content=",".join(chunk),
+                headers={"Content-Type": "text/plain"},
+                extensions={"idempotent": True},  # A lookup, so safe to retry
+            )
+            if response.status_code == 404:  # None of the numbers were found
+                return dict()
+            response.raise_for_status()
+            # Full-cycle responses include every publication stage, whatever kind was asked for
+            match_kind = "full-cycle" not in constituents
+            return split_exchange_documents(response.text, chunk, match_kind=match_kind)
+
+        def get_one(number):
+            return cls.get_constituents(number, doc_type, format, constituents)
+
+        results = dict()
+        failed = list()
+        chunk_results = bounded_map(post_chunk, chunks, limit=concurrency, return_exceptions=True)
+        for chunk, chunk_result in zip(chunks, [result for result in chunk_results]):
+            if isinstance(chunk_result, Exception):
+                logger.warning(
+                    f"Batch lookup of {len(chunk)} numbers failed ({chunk_result!r}), looking them up one by one"
+                )
+                failed += chunk
+            else:
+                results.update(chunk_result)
+        texts = bounded_map(get_one, failed, limit=concurrency, return_exceptions=True)
+        for number, text in zip(failed, [text for text in texts]):
+            if not isinstance(text, Exception) or return_exceptions:
+                results[number] = text
+        return results
+
+    @classmethod
+    def get_biblio_many(
+        cls,
+        numbers,
+        doc_type="publication",
+        format="docdb",
+        concurrency=DEFAULT_CONCURRENCY,
+        return_exceptions=False,
+    ) -> tp.Dict[str, "BiblioResult"]:
+        texts = cls.get_constituents_many(
+            numbers,
+            doc_type,
+            format,
+            constituents="biblio",
+            concurrency=concurrency,
+            return_exceptions=return_exceptions,
+        )
+        return {
+            number: text if isinstance(text, Exception) else BiblioResult.model_validate(text)
+            for number, text in texts.items()
+        }
+
+    @classmethod
+    def get_abstract_many(
+        cls, numbers, doc_type="publication", format="docdb", concurrency=DEFAULT_CONCURRENCY
+    ) -> tp.Dict[str, str]:
+        return cls.get_constituents_many(
+            numbers, doc_type, format, constituents="abstract", concurrency=concurrency
+        )
+
+    @classmethod
+    def get_full_cycle_many(
+        cls, numbers, doc_type="publication", format="docdb", concurrency=DEFAULT_CONCURRENCY
+    ) -> tp.Dict[str, str]:
+        return cls.get_constituents_many(
+            numbers, doc_type, format, constituents="full-cycle", concurrency=concurrency
+        )
+
 
 class PublishedFulltextApi:
     fulltext_jurisdictions = "EP, WO, AT, BE, BG, CA, CH, CY, CZ, DK, EE, ES, FR, GB, GR, HR, IE, IT, LT, LU, MC, MD, ME, NO, PL, PT, RO, RS, SE, SK".split(
@@ -66,6 +220,7 @@ class PublishedFulltextApi:
         doc_type: document type (application / publication)
         format: document number format (original / docdb / epodoc)
         inquiry: what data to retrieve. Can be combined. (fulltext / description / claims)
+
         """
         url = f"http://ops.epo.org/3.2/rest-services/published-data/{doc_type}/{format}/{number}/{inquiry}"
         if number[:2] not in cls.fulltext_jurisdictions:
@@ -108,6 +263,7 @@ class PublishedSearchApi:
                     "results": list(),
                 }
             )
+
         return Search.model_validate(response.text)
 
 
@@ -123,8 +279,8 @@ class PublishedImagesApi:
         response = session.get(
             f"https://ops.epo.org/3.2/rest-services/published-data/images/{country}/{number}/{kind}/{image_type}.{image_format}",
             params={"Range": page_number},
-            extensions={"force_cache": True},
         )
+        response.raise_for_status()
         return BytesIO(response.content)
 
     @classmethod
@@ -132,8 +288,8 @@ class PublishedImagesApi:
         response = session.get(
             f"https://ops.epo.org/3.2/rest-services/{link}.{image_format}",
             params={"Range": page_number},
-            extensions={"force_cache": True},
         )
+        response.raise_for_status()
         return BytesIO(response.content)
 
 
@@ -40,7 +40,7 @@ SEARCH_FIELDS = {
 def generate_query(**kwargs):
     query = list()
     for keyword, values in kwargs.items():
-        if isinstance(values, list):
+        if isinstance(values, (list, tuple)):
             for value in values:
                 if keyword:
                     query.append(f'{SEARCH_FIELDS[keyword]}="{value}"')
@@ -48,3 +48,8 @@ def generate_query(**kwargs):
             if keyword:
                 query.append(f'{SEARCH_FIELDS[keyword]}="{values}"')
     return " AND ".join(query)
+
+
+def publication_date_window(query, start, end):
+    """Restrict a CQL query to documents published from `start` to `end`, inclusive"""
+    return f'({query}) AND publicationdate within "{start:%Y%m%d} {end:%Y%m%d}"'
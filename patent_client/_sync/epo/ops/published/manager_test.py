@@ -4,6 +4,16 @@
 # *     Source File: patent_client/_async/epo/ops/published/manager_test.py      *
 # ********************************************************************************
 
+import datetime
+import re
+
+import httpx
+import pytest
+
+from patent_client._sync.http_client import PatentClientSession
+
+from . import api as api_module
+from .manager import SearchManager
 from .model.search import Inpadoc
 
 
@@ -60,3 +70,84 @@ class TestPublished:
         result = Inpadoc.objects.get("WO2010050748A2")
         result.download(tmpdir)
         assert len(tmpdir.listdir()) > 0
+
+
+def search_response(documents, total, begin, end):
+    references = "".join(
+        f'<ops:publication-reference family-id="1"><document-id document-id-type="docdb">'
+        f"<country>EP</country><doc-number>{number}</doc-number><kind>A1</kind>"
+        f"</document-id></ops:publication-reference>"
+        for number in documents
+    )
+    return (
+        '<ops:world-patent-data xmlns="http://www.epo.org/exchange" xmlns:ops="http://ops.epo.org">'
+        f'<ops:biblio-search total-result-count="{total}"><ops:query>q</ops:query>'
+        f'<ops:range begin="{begin}" end="{end}"/><ops:search-result>{references}'
+        "</ops:search-result></ops:biblio-search></ops:world-patent-data>"
+    )
+
+
+class TestShardedSearch:
+    @pytest.mark.no_vcr
+    def test_sharded_search(self, monkeypatch):
+        # One document a day from January 1st, and 15 on March 1st
+        first_day = datetime.date(2020, 1, 1)
+        documents = [(first_day + datetime.timedelta(days=i), 1000 + i) for i in range(40)]
+        documents += [(datetime.date(2020, 3, 1), 2000 + i) for i in range(15)]
+        queries = list()
+
+        def handler(request):
+            query = request.url.params["q"]
+            start, end = re.search(r'within "(\d{8}) (\d{8})"', query).groups()
+            matches = [n for day, n in documents if start <= day.strftime("%Y%m%d") <= end]
+            begin, last = map(int, request.url.params["Range"].split("-"))
+            assert last <= 10
+            queries.append((start, end, begin))
+            return httpx.Response(
+                200, text=search_response(matches[begin - 1 : last], len(matches), begin, last)
+            )
+
+        monkeypatch.setattr(
+            api_module, "session", PatentClientSession(transport=httpx.MockTransport(handler))
+        )
+        monkeypatch.setattr(SearchManager, "max_results", 10)
+        monkeypatch.setattr(SearchManager, "result_size", 4)
+        manager = Inpadoc.objects.filter(cpc_class="H04W").option(
+            shard=True, date_range=("2020-01-01", "2020-03-31"), concurrency=3
+        )
+        numbers = [doc.doc_number for doc in manager]
+        # Every document once, in date order, except March 1st which is cut at max_results
+        assert numbers == [str(n) for _, n in documents][:50]
+        assert ("20200301", "20200301", 1) in queries
+
+        numbers = [doc.doc_number for doc in manager.offset(5).limit(3)]
+        assert numbers == ["1005", "1006", "1007"]
+
+    @pytest.mark.no_vcr
+    def test_sharded_search_with_cql_query(self, monkeypatch):
+        first_day = datetime.date(2020, 1, 1)
+        documents = [(first_day + datetime.timedelta(days=i), 1000 + i) for i in range(20)]
+        queries = list()
+
+        def handler(request):
+            query = request.url.params["q"]
+            queries.append(query)
+            assert query.startswith('(pa="Google LLC") AND publicationdate within')
+            start, end = re.search(r'within "(\d{8}) (\d{8})"', query).groups()
+            matches = [n for day, n in documents if start <= day.strftime("%Y%m%d") <= end]
+            begin, last = map(int, request.url.params["Range"].split("-"))
+            return httpx.Response(
+                200, text=search_response(matches[begin - 1 : last], len(matches), begin, last)
+            )
+
+        monkeypatch.setattr(
+            api_module, "session", PatentClientSession(transport=httpx.MockTransport(handler))
+        )
+        monkeypatch.setattr(SearchManager, "max_results", 10)
+        monkeypatch.setattr(SearchManager, "result_size", 4)
+        manager = Inpadoc.objects.filter(cql_query='pa="Google LLC"').option(
+            shard=True, date_range=("2020-01-01", "2020-01-20"), concurrency=3
+        )
+        numbers = [doc.doc_number for doc in manager]
+        assert numbers == [str(n) for _, n in documents]
+        assert len(queries) > 1
@@ -5,19 +5,32 @@
 # ********************************************************************************
 
 import base64
-import datetime as dt
+import hashlib
+import json
 import logging
-from typing import Sequence
+import os
+import time
+import typing as tp
+from pathlib import Path
 
 import hishel
 import httpx
-from httpcore import Request, Response
 
-from patent_client import SETTINGS
-from patent_client._sync.http_client import PatentClientSession
-from patent_client.session import CACHE_DIR
+from patent_client import CACHE_DIR, SETTINGS
+from patent_client._sync.http_client import (
+    CacheStorage,
+    PatentClientSession,
+    cache_policies,
+    response_cache,
+)
+from patent_client.util.cache_policy import PolicyController
+from patent_client.util.concurrency import Lock
+from patent_client.util.file_lock import FileLock
+
+from .throttle import OpsFairUseError, OpsThrottle, ThrottledTransport
 
 logger = logging.getLogger(__name__)
+
 NS = {
     "http://ops.epo.org": None,
     "http://www.epo.org/exchange": None,
@@ -34,87 +47,178 @@ class OpsForbiddenError(Exception):
     pass
 
 
-class OpsFairUseError(Exception):
-    pass
-
-
-class OpsController(hishel.Controller):
-    def __init__(
-        self,
-        cacheable_methods: Sequence[str] = ("GET", "HEAD"),
-        cacheable_status_codes: Sequence[int] = (200,),
-    ):
-        super().__init__()
-        self.cacheable_methods = cacheable_methods
-        self.cacheable_status_codes = cacheable_status_codes
-
-    def is_cachable(self, request: Request, response: Response) -> bool:
-        return (
-            request.method in self.cacheable_methods
-            and response.status_code in self.cacheable_status_codes
+class OpsTokenStore:
+    """OPS access token kept in the cache directory so that every process can reuse it
+
+    The file records a hash of the API key it was issued for, so changing credentials never
+    picks up a stale token. `lock` serialises refreshes between processes.
+    """
+
+    def __init__(self, path: tp.Union[str, Path], key: tp.Optional[str] = None):
+        self.path = Path(path)
+        self.client_id = hashlib.sha256((key or "").encode()).hexdigest()[:16]
+
+    @property
+    def lock(self) -> FileLock:
+        return FileLock(self.path.with_suffix(".lock"))
+
+    def read(self) -> tp.Optional[tp.Tuple[str, float]]:
+        """The stored token and its expiry as a Unix timestamp, if there is one"""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("client") != self.client_id:
+            return None
+        try:
+            return str(data["access_token"]), float(data["expires"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def write(self, token: str, expires: float) -> None:
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(
+            json.dumps({"client": self.client_id, "access_token": token, "expires": expires})
         )
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
 
-    def construct_response_from_cache(self, request, response, original_request):
-        return response
 
+class OpsSession(PatentClientSession):
+    """Session that signs OPS requests with an OAuth access token
+
+    The token is fetched before the first request and refreshed `refresh_margin` seconds
+    before it expires, so requests normally never see an expired token. Only one refresh
+    runs at a time: concurrent requests in this process wait on `token_lock`, and other
+    processes wait on the token store's file lock and then pick up the new token from disk.
+    If OPS still rejects a token (e.g. it was revoked), it is refreshed and the request is
+    sent once more.
+    """
 
-class OpsAuth(httpx.Auth):
-    requires_response_body = True
     auth_url = "https://ops.epo.org/3.2/auth/accesstoken"
+    refresh_margin = 60.0
 
-    def __init__(self, key: str, secret: str):
+    def __init__(
+        self, key: str, secret: str, token_store: tp.Optional[OpsTokenStore] = None, **kwargs
+    ):
+        super().__init__(**kwargs)
         self.key = key
         self.secret = secret
-        self.authorization_header = "<unset>"
-
-    def auth_flow(self, request):
-        request.headers["Authorization"] = self.authorization_header
-        response = yield request
-        if response.status_code == 400:
-            response = yield self.build_refresh_request()
-            if response.status_code != 200:
-                logger.debug(f"EPO Authentication Error!\n{response.text}")
-                raise OpsAuthenticationError(
-                    "Failed to authenticate with EPO OPS! Please check your credentials. See the setup instructions at https://patent-client.readthedocs.io/en/stable/getting_started.html"
-                )
-            data = response.json()
-            self.expires = dt.datetime.fromtimestamp(int(data["issued_at"]) / 1000) + dt.timedelta(
-                seconds=int(data["expires_in"])
-            )
-            self.authorization_header = f"Bearer {data['access_token']}"
-            request.headers["Authorization"] = self.authorization_header
-            yield request
-
-    def build_refresh_request(self):
-        token = base64.b64encode(f"{self.key}:{self.secret}".encode())
-        return httpx.Request(
-            "post",
+        self.token_store = token_store or OpsTokenStore(CACHE_DIR / "ops_token.json", key)
+        self.token: tp.Optional[str] = None
+        self.expires = 0.0
+        self._token_lock = None
+
+    @property
+    def token_lock(self):
+        # Created lazily so that it binds to the running event loop
+        if self._token_lock is None:
+            self._token_lock = Lock()
+        return self._token_lock
+
+    def _usable(
+        self, token: tp.Optional[str], expires: float, stale_token: tp.Optional[str]
+    ) -> bool:
+        return (
+            token is not None
+            and token != stale_token
+            and expires - self.refresh_margin > time.time()
+        )
+
+    def ensure_token(self, stale_token: tp.Optional[str] = None) -> str:
+        """Return a usable access token, refreshing it if needed
+
+        Args:
+            stale_token: A token that OPS rejected. It is never returned, even if it hasn't
+                expired yet.
+        """
+        if self._usable(self.token, self.expires, stale_token):
+            return self.token
+        with self.token_lock:
+            # Another request may have refreshed the token while we waited
+            if self._usable(self.token, self.expires, stale_token):
+                return self.token
+            # Shared with other processes that use the same key, so only one of them refreshes
+            with self.token_store.lock:
+                stored = self.token_store.read()
+                if stored and self._usable(*stored, stale_token):
+                    self.token, self.expires = stored
+                else:
+                    self.token, self.expires = self.fetch_token()
+                    self.token_store.write(self.token, self.expires)
+        return self.token
+
+    def fetch_token(self) -> tp.Tuple[str, float]:
+        credentials = base64.b64encode(f"{self.key}:{self.secret}".encode()).decode()
+        response = self.post(
             self.auth_url,
-            headers={"Authorization": token},
+            headers={"Authorization": credentials},
             data={"grant_type": "client_credentials"},
+            extensions={"cache_disabled": True},
         )
+        if response.status_code != 200:
+            logger.debug(f"EPO Authentication Error!\n{response.text}")
+            raise OpsAuthenticationError(
+                "Failed to authenticate with EPO OPS! Please check your credentials. See the setup instructions at https://patent-client.readthedocs.io/en/stable/getting_started.html"
+            )
+        data = response.json()
+        # Timed from the local clock rather than "issued_at", so clock skew doesn't matter
+        return data["access_token"], time.time() + int(data["expires_in"])
+
+    def token_rejected(self, response: httpx.Response) -> bool:
+        if response.status_code not in (400, 401):
+            return False
+        if "invalid_token" in response.headers.get("WWW-Authenticate", ""):
+            return True
+        response.read()
+        return "access_token" in response.text
+
+    def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        if request.url == self.auth_url:
+            return super().send(request, **kwargs)
+        token = self.ensure_token()
+        request.headers["Authorization"] = f"Bearer {token}"
+        response = super().send(request, **kwargs)
+        if self.token_rejected(response):
+            response.close()
+            token = self.ensure_token(stale_token=token)
+            request.headers["Authorization"] = f"Bearer {token}"
+            response = super().send(request, **kwargs)
+        return response
+
 
+throttle = OpsThrottle()
 
 ops_transport = hishel.CacheTransport(
-    transport=httpx.HTTPTransport(
-        verify=False,
-        http2=True,
-        retries=3,
+    transport=ThrottledTransport(
+        httpx.HTTPTransport(
+            verify=False,
+            http2=True,
+            # Retries failed connection attempts only, on top of the session's retry policy
+            retries=3,
+        ),
+        throttle,
     ),
-    storage=hishel.FileStorage(base_path=CACHE_DIR, ttl=60 * 60 * 24 * 3),
-    controller=OpsController(),
+    storage=CacheStorage(response_cache, policies=cache_policies),
+    controller=PolicyController(cache_policies),
 )
 
 
 def handle_response(response):
     if response.status_code == 403:
+        # Quota rejections name the exceeded quota, e.g. "RegisteredQuotaPerWeek"
+        reason = response.headers.get("X-Rejection-Reason")
+        if reason:
+            raise OpsFairUseError(f"OPS fair use limit reached: {reason}")
         raise OpsForbiddenError("Forbidden")
     return response
 
 
-session = PatentClientSession(
+session = OpsSession(
+    key=SETTINGS.epo_api_key,
+    secret=SETTINGS.epo_api_secret,
     transport=ops_transport,
-    auth=OpsAuth(key=SETTINGS.epo_api_key, secret=SETTINGS.epo_api_secret),
     event_hooks={
         "response": [
             handle_response,
@@ -5,17 +5,15 @@
 # ********************************************************************************
 
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import Iterator, Optional, Tuple
 
 from yankee.base.schema import ListCollection
 
 from patent_client._sync.http_client import PatentClientSession
 
-from .convert import convert_xml_to_json
-from .model import AssignmentPage
+from .convert import convert_xml_to_json, iter_xml_docs
+from .model import Assignment, AssignmentPage
 
-if TYPE_CHECKING:
-    from .model import Assignment
 allowed_filters = [
     "PCTNumber",
     "OwnerName",
@@ -27,6 +25,7 @@ allowed_filters = [
     "IntlRegistrationNumber",
     "ReelFrame",
 ]
+
 allowed_sorts = ["ExecutionDate+desc", "ExecutionDate+asc"]
 
 
@@ -43,6 +42,20 @@ class AssignmentApi:
     def lookup(
         cls, query: str, filter: str, rows=8, start=0, sort="ExecutionDate+desc"
     ) -> ListCollection["Assignment"]:
+        content = cls._lookup_xml(query, filter, rows, start, sort)
+        return AssignmentPage.model_validate(convert_xml_to_json(content))
+
+    @classmethod
+    def iter_lookup(
+        cls, query: str, filter: str, rows=8, start=0, sort="ExecutionDate+desc"
+    ) -> Tuple[int, Iterator["Assignment"]]:
+        """Like lookup, but returns the total and an iterator of assignments converted one by one"""
+        content = cls._lookup_xml(query, filter, rows, start, sort)
+        num_found, docs = iter_xml_docs(content)
+        return int(num_found), (Assignment.model_validate(doc) for doc in docs)
+
+    @classmethod
+    def _lookup_xml(cls, query: str, filter: str, rows, start, sort) -> bytes:
         # Because of their limited utility, we omit fields, highlight, and facet
         url = "https://assignment-api.uspto.gov/patent/lookup"
         validate_input(filter, "filter", allowed_filters)
@@ -60,11 +73,12 @@ class AssignmentApi:
             headers={"Accept": "application/xml"},
         )
         response.raise_for_status()
-        return AssignmentPage.model_validate(convert_xml_to_json(response.content))
+        return response.content
 
     @classmethod
     def download_pdf(cls, reel: str, frame: str, path: Optional[Path] = None) -> Path:
         url = cls.get_download_url(reel, frame)
+
         if path is None:
             path = Path.cwd()
             output_path = output_path = path / f"assignment-pat-{reel}-{frame}.pdf"
@@ -72,6 +86,7 @@ class AssignmentApi:
             output_path = path / f"assignment-pat-{reel}-{frame}.pdf"
         else:
             output_path = path
+
         with output_path.open("wb") as f:
             with client.stream("GET", url) as response:
                 for chunk in response.iter_bytes():
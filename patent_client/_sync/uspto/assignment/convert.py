@@ -4,6 +4,9 @@
 # *        Source File: patent_client/_async/uspto/assignment/convert.py         *
 # ********************************************************************************
 
+import typing as tp
+from io import BytesIO
+
 import lxml.etree as ET
 
 
@@ -63,6 +66,7 @@ def convert_doc(doc):
     }
     del output["corrName"]
     del output["corr_address"]
+
     # Collect the address for each assignee into a single string
     for assignee in output["assignees"]:
         address_lines = "\n".join(
@@ -83,6 +87,7 @@ def convert_doc(doc):
             "patAssigneeCountryName",
         ]:
             del assignee[key]
+
     return output
 
 
@@ -93,11 +98,167 @@ def zip_lists(data, input_keys, output_key):
     return dicts
 
 
+def iter_xml_docs(xml_text) -> tp.Tuple[tp.Union[str, int], tp.Iterator[dict]]:
+    """Stream the docs of an Assignment API response
+
+    Returns the numFound of the response and an iterator over its converted docs. The XML is
+    read with iterparse, and each doc element is discarded once converted, so the whole
+    tree is never held in memory.
+    """
+    if isinstance(xml_text, str):
+        xml_text = xml_text.encode("utf-8")
+    events = ET.iterparse(BytesIO(xml_text), events=("start", "end"), tag=("result", "doc"))
+    num_found = 0
+    for event, element in events:
+        if event == "start" and element.tag == "result":
+            num_found = element.attrib["numFound"]
+            break
+
+    def docs():
+        for event, element in events:
+            if event != "end" or element.tag != "doc":
+                continue
+            yield convert_doc(element)
+            element.clear()
+            # Drop the docs already converted, which the parent still refers to
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    return num_found, docs()
+
+
 def convert_xml_to_json(xml_text) -> dict:
     """Convert the idiosyncratic xml of the Assignment API to ordinary json"""
-    tree = ET.fromstring(xml_text)
-    output = dict()
-    num_found = tree.find(".//result")
-    output["numFound"] = num_found.attrib["numFound"] if num_found is not None else 0
-    output["docs"] = [convert_doc(doc) for doc in tree.findall(".//result/doc")]
+    num_found, docs = iter_xml_docs(xml_text)
+    return {"numFound": num_found, "docs": list(docs)}
+
+
+# The Assignment API reports missing dates as the first day of year 1, which the model
+# reads as None
+NULL_DATE = "0001-01-01"
+
+
+def _text(element, path) -> tp.Optional[str]:
+    text = element.findtext(path)
+    if text is None:
+        return None
+    return text.strip() or None
+
+
+def convert_bulk_doc(element, header: tp.Optional[dict] = None) -> dict:
+    """Convert a <patent-assignment> from the USPTO bulk assignment XML
+
+    The result has the same shape as the docs returned by iter_xml_docs, so it can be
+    validated with Assignment.model_validate. `header` carries the file level fields
+    (dateProduced, actionKeyCode and transactionDate).
+    """
+    record = element.find("assignment-record")
+    reel, frame = int(_text(record, "reel-no")), int(_text(record, "frame-no"))
+    output = dict(header or dict())
+    output.update(
+        {
+            "id": f"{reel}-{frame}",
+            "reelNo": str(reel),
+            "frameNo": str(frame),
+            "lastUpdateDate": _text(record, "last-update-date/date") or NULL_DATE,
+            "purgeIndicator": _text(record, "purge-indicator") or "N",
+            "recordedDate": _text(record, "recorded-date/date") or NULL_DATE,
+            "pageCount": _text(record, "page-count") or "0",
+            "conveyanceText": _text(record, "conveyance-text") or "",
+        }
+    )
+    # Bulk records don't say whether an image exists, but every scanned page is an image
+    output["assignmentRecordHasImages"] = "Y" if int(output["pageCount"]) > 0 else "N"
+
+    correspondent = record.find("correspondent")
+    lines = list()
+    if correspondent is not None:
+        lines = [_text(correspondent, f"address-{i}") for i in range(1, 5)]
+    output["correspondent"] = {
+        "name": _text(record, "correspondent/name") or "",
+        "address": "\n".join(line for line in lines if line),
+    }
+
+    output["assignors"] = [
+        {
+            "patAssignorName": _text(assignor, "name"),
+            "patAssignorExDate": _text(assignor, "execution-date/date") or NULL_DATE,
+            "patAssignorDateAck": _text(assignor, "date-acknowledged/date") or NULL_DATE,
+        }
+        for assignor in element.iterfind("patent-assignors/patent-assignor")
+    ]
+    execution_dates = [
+        a["patAssignorExDate"] for a in output["assignors"] if a["patAssignorExDate"] != NULL_DATE
+    ]
+    output["patAssignorEarliestExDate"] = min(execution_dates, default=NULL_DATE)
+
+    output["assignees"] = list()
+    for assignee in element.iterfind("patent-assignees/patent-assignee"):
+        lines = [_text(assignee, "address-1"), _text(assignee, "address-2")]
+        city, state, postcode = (_text(assignee, k) for k in ("city", "state", "postcode"))
+        region = " ".join(x for x in (state, postcode) if x)
+        last_line = ", ".join(x for x in (city, region) if x)
+        country = _text(assignee, "country-name")
+        if country:
+            last_line = f"{last_line} ({country})" if last_line else country
+        lines.append(last_line)
+        output["assignees"].append(
+            {
+                "patAssigneeName": _text(assignee, "name"),
+                "patAssigneeAddress": "\n".join(line for line in lines if line),
+            }
+        )
+
+    output["properties"] = list()
+    for prop in element.iterfind("patent-properties/patent-property"):
+        title = prop.find("invention-title")
+        data = {
+            "inventionTitle": _text(prop, "invention-title") or "",
+            "inventionTitleLang": title.get("lang", "en") if title is not None else "en",
+            "applNum": "",
+        }
+        for doc_id in prop.iterfind("document-id"):
+            number, kind = _text(doc_id, "doc-number"), _text(doc_id, "kind") or ""
+            date = _text(doc_id, "date")
+            if kind == "X0":
+                data["applNum"] = number
+                if date:
+                    data["filingDate"] = date
+                if _text(doc_id, "country") == "WO" or number.upper().startswith("PCT"):
+                    data["pctNum"] = number
+            elif kind.startswith("A"):
+                data["publNum"] = number
+                if date:
+                    data["publDate"] = date
+            else:
+                data["patNum"] = number
+                if date:
+                    data["issueDate"] = date
+        output["properties"].append(data)
     return output
+
+
+def iter_bulk_docs(source) -> tp.Iterator[dict]:
+    """Stream the assignments in a USPTO bulk assignment XML file
+
+    `source` is a path or a binary file object. Each <patent-assignment> is converted with
+    convert_bulk_doc and then discarded, so files of any size are read in constant memory.
+    """
+    events = ET.iterparse(source, events=("start", "end"), huge_tree=True)
+    header = dict()
+    for event, element in events:
+        if event == "start":
+            if element.tag == "us-patent-assignments" and element.get("date-produced"):
+                header["dateProduced"] = element.get("date-produced")
+            continue
+        if element.tag == "action-key-code":
+            header["actionKeyCode"] = (element.text or "").strip() or None
+        elif (
+            element.tag == "transaction-date" and element.getparent().tag == "us-patent-assignments"
+        ):
+            header["transactionDate"] = _text(element, "date") or NULL_DATE
+        elif element.tag == "patent-assignment":
+            yield convert_bulk_doc(element, header)
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
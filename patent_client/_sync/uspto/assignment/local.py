@@ -0,0 +1,339 @@
+# ********************************************************************************
+# *         WARNING: This file is automatically generated by unasync.py.         *
+# *                             DO NOT MANUALLY EDIT                             *
+# *         Source File: patent_client/_async/uspto/assignment/local.py          *
+# ********************************************************************************
+
+"""Local copy of the USPTO patent assignment database, built from the bulk XML files.
+
+The USPTO publishes every recorded patent assignment as an annual backfile (product PASYR)
+and as daily updates (product PASDL). AssignmentDatabase streams those files into a single
+SQLite file with indexes on reel/frame, patent, application, publication and PCT numbers,
+and on assignee, assignor and correspondent names. Assignment.objects.local() answers
+queries from it in milliseconds, without the paging and per-query caps of the API.
+
+Each assignment is stored as the same JSON document the API converter produces, so local
+and remote results validate into identical Assignment objects. An assignment that appears
+in several files is replaced by its most recently updated version.
+
+The database is read and written with the blocking sqlite3 module, also from the async
+client. Lookups are answered from the indexes, so they run on the event loop like the HTTP
+cache does. Loading a file takes much longer and blocks the loop until it is written, so
+ingest_bulk_files is best run on its own rather than alongside other async work.
+"""
+
+import datetime
+import json
+import logging
+import re
+import sqlite3
+import typing as tp
+import zipfile
+from pathlib import Path
+
+from patent_client import BASE_DIR
+from patent_client.util.sqlite_cache import ThreadLocalConnection
+
+from .convert import iter_bulk_docs
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = BASE_DIR / "assignments.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignment (
+    id TEXT PRIMARY KEY,
+    reel INTEGER NOT NULL,
+    frame INTEGER NOT NULL,
+    execution_date TEXT,
+    last_update_date TEXT,
+    correspondent TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assignment_reel_frame ON assignment (reel, frame);
+CREATE INDEX IF NOT EXISTS assignment_correspondent ON assignment (correspondent);
+CREATE TABLE IF NOT EXISTS property (
+    assignment_id TEXT NOT NULL,
+    appl_num TEXT,
+    pat_num TEXT,
+    publ_num TEXT,
+    pct_num TEXT
+);
+CREATE INDEX IF NOT EXISTS property_assignment ON property (assignment_id);
+CREATE INDEX IF NOT EXISTS property_appl_num ON property (appl_num);
+CREATE INDEX IF NOT EXISTS property_pat_num ON property (pat_num);
+CREATE INDEX IF NOT EXISTS property_publ_num ON property (publ_num);
+CREATE INDEX IF NOT EXISTS property_pct_num ON property (pct_num);
+CREATE TABLE IF NOT EXISTS party (
+    assignment_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS party_assignment ON party (assignment_id);
+CREATE INDEX IF NOT EXISTS party_role_name ON party (role, name);
+CREATE TABLE IF NOT EXISTS ingested_file (
+    name TEXT PRIMARY KEY,
+    assignments INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+"""
+
+NUMBER_FIELDS = {
+    "PatentNumber": "pat_num",
+    "ApplicationNumber": "appl_num",
+    "PublicationNumber": "publ_num",
+    "PCTNumber": "pct_num",
+}
+PARTY_FIELDS = {"OwnerName": "assignee", "PriorOwnerName": "assignor"}
+
+NAME_CLEAN_RE = re.compile(r"[^0-9A-Z ]+")
+NUMBER_CLEAN_RE = re.compile(r"[^0-9A-Z]+")
+
+
+def name_key(name: tp.Optional[str]) -> str:
+    """Normalize a party name for prefix matching: upper case, no punctuation"""
+    return " ".join(NAME_CLEAN_RE.sub(" ", (name or "").upper()).split())
+
+
+def number_key(number: tp.Optional[str]) -> tp.Optional[str]:
+    if not number:
+        return None
+    return NUMBER_CLEAN_RE.sub("", number.upper()) or None
+
+
+def date_key(date: tp.Optional[str]) -> tp.Optional[str]:
+    """Reduce a YYYYMMDD or ISO date to YYYYMMDD, or None for the API's null date"""
+    digits = re.sub(r"\D", "", date or "")[:8]
+    if len(digits) < 8 or digits.startswith("0001"):
+        return None
+    return digits
+
+
+class AssignmentDatabase:
+    """An indexed SQLite store of assignments loaded from the USPTO bulk XML
+
+    Args:
+        path: Location of the database file. Parent directories are created as needed.
+        batch_size: Number of assignments written per transaction while ingesting.
+    """
+
+    def __init__(self, path: tp.Union[str, Path] = DEFAULT_DB_PATH, batch_size: int = 10_000):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._connections = ThreadLocalConnection(self.path, SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def close(self) -> None:
+        self._connections.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM assignment").fetchone()[0]
+
+    # Ingestion
+
+    def ingested_files(self) -> tp.Set[str]:
+        return {row[0] for row in self.connection.execute("SELECT name FROM ingested_file")}
+
+    def ingest(
+        self, source: tp.Union[str, Path], name: tp.Optional[str] = None, force: bool = False
+    ) -> int:
+        """Load a bulk assignment XML file, or a zip archive of them
+
+        Files are recorded by name (the file name unless `name` is given), and a file that
+        was already loaded is skipped unless `force` is set. Returns the number of
+        assignments written.
+        """
+        source = Path(source)
+        name = name or source.name
+        if not force and name in self.ingested_files():
+            logger.info("Skipping %s, which is already in %s", name, self.path)
+            return 0
+        if zipfile.is_zipfile(source):
+            count = 0
+            with zipfile.ZipFile(source) as archive:
+                for member in archive.namelist():
+                    if member.lower().endswith(".xml"):
+                        with archive.open(member) as f:
+                            count += self.ingest_docs(iter_bulk_docs(f))
+        else:
+            count = self.ingest_docs(iter_bulk_docs(str(source)))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO ingested_file (name, assignments, ingested_at) VALUES (?, ?, ?)",
+            (name, count, datetime.datetime.now(datetime.timezone.utc).isoformat()),
+        )
+        logger.info("Loaded %s assignments from %s into %s", count, name, self.path)
+        return count
+
+    def ingest_docs(self, docs: tp.Iterable[dict]) -> int:
+        """Write converted assignment docs, committing every `batch_size` docs"""
+        count = 0
+        batch = list()
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                count += self._write_batch(batch)
+                batch = list()
+        if batch:
+            count += self._write_batch(batch)
+        return count
+
+    def _write_batch(self, docs: tp.List[dict]) -> int:
+        conn = self.connection
+        written = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for doc in docs:
+                if self._write_doc(conn, doc):
+                    written += 1
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return written
+
+    def _write_doc(self, conn: sqlite3.Connection, doc: dict) -> bool:
+        assignment_id = doc["id"]
+        last_update = date_key(doc.get("lastUpdateDate"))
+        row = conn.execute(
+            "SELECT last_update_date FROM assignment WHERE id = ?", (assignment_id,)
+        ).fetchone()
+        if row is not None and (row[0] or "") > (last_update or ""):
+            # Keep the newer version, e.g. when an annual file is loaded after daily files
+            return False
+        reel, frame = (int(x) for x in assignment_id.split("-"))
+        conn.execute(
+            "INSERT OR REPLACE INTO assignment "
+            "(id, reel, frame, execution_date, last_update_date, correspondent, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                assignment_id,
+                reel,
+                frame,
+                date_key(doc.get("patAssignorEarliestExDate")),
+                last_update,
+                name_key(doc["correspondent"]["name"]),
+                json.dumps(doc),
+            ),
+        )
+        conn.execute("DELETE FROM property WHERE assignment_id = ?", (assignment_id,))
+        conn.execute("DELETE FROM party WHERE assignment_id = ?", (assignment_id,))
+        conn.executemany(
+            "INSERT INTO property (assignment_id, appl_num, pat_num, publ_num, pct_num) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    assignment_id,
+                    *(number_key(p.get(k)) for k in ("applNum", "patNum", "publNum", "pctNum")),
+                )
+                for p in doc["properties"]
+            ],
+        )
+        parties = [("assignee", a["patAssigneeName"]) for a in doc["assignees"]]
+        parties += [("assignor", a["patAssignorName"]) for a in doc["assignors"]]
+        conn.executemany(
+            "INSERT INTO party (assignment_id, role, name) VALUES (?, ?, ?)",
+            [(assignment_id, role, name_key(name)) for role, name in parties],
+        )
+        return True
+
+    def ingest_bulk_files(
+        self,
+        product: str = "PASDL",
+        from_date: tp.Optional[tp.Union[datetime.date, str]] = None,
+        to_date: tp.Optional[tp.Union[datetime.date, str]] = None,
+        download_dir: tp.Optional[tp.Union[str, Path]] = None,
+        keep_files: bool = False,
+    ) -> int:
+        """Download and load the bulk assignment files of a product
+
+        Use "PASYR" for the annual backfile and "PASDL" (the default) for the daily
+        updates. Files that are already in the database are not downloaded again, so
+        running this on a schedule keeps the database current. Downloads are deleted once
+        loaded unless `keep_files` is set. Returns the number of assignments written.
+
+        Each file is loaded with blocking sqlite3 calls, so in the async client the event
+        loop is held up until the file is written.
+        """
+        from ..bulk_data.model import File
+
+        download_dir = Path(download_dir or BASE_DIR / "bulk" / product)
+        download_dir.mkdir(exist_ok=True, parents=True)
+        done = self.ingested_files()
+        count = 0
+        for file in File.objects.filter_by_short_name(product, from_date, to_date):
+            if file.name in done:
+                continue
+            path = file.download(download_dir)
+            count += self.ingest(path, name=file.name)
+            done.add(file.name)
+            if not keep_files:
+                Path(path).unlink()
+        return count
+
+    # Queries
+
+    def _lookup_sql(self, field: str, value: str) -> tp.Tuple[str, tp.Tuple]:
+        """A query selecting the ids of assignments matching one Assignment API lookup"""
+        if field in NUMBER_FIELDS:
+            column = NUMBER_FIELDS[field]
+            return (
+                f"SELECT assignment_id FROM property WHERE {column} = ?",
+                (number_key(str(value)),),
+            )
+        if field in PARTY_FIELDS:
+            # GLOB with a literal prefix is answered from the (role, name) index
+            return (
+                "SELECT assignment_id FROM party WHERE role = ? AND name GLOB ?",
+                (PARTY_FIELDS[field], name_key(value) + "*"),
+            )
+        if field == "CorrespondentName":
+            return (
+                "SELECT id FROM assignment WHERE correspondent GLOB ?",
+                (name_key(value) + "*",),
+            )
+        if field == "ReelFrame":
+            reel, _, frame = str(value).partition("-")
+            return (
+                "SELECT id FROM assignment WHERE reel = ? AND frame = ?",
+                (int(reel), int(frame or 0)),
+            )
+        raise ValueError(f"{field} lookups are not supported by the local assignment database")
+
+    def _matching_ids(self, lookups: tp.Sequence[tp.Tuple[str, str]]) -> tp.Tuple[str, tp.Tuple]:
+        parts = [self._lookup_sql(field, value) for field, value in lookups]
+        sql = " UNION ".join(part for part, _ in parts)
+        params = tuple(param for _, part_params in parts for param in part_params)
+        return sql, params
+
+    def search(
+        self,
+        lookups: tp.Sequence[tp.Tuple[str, str]],
+        descending: bool = True,
+        limit: tp.Optional[int] = None,
+        offset: int = 0,
+    ) -> tp.Iterator[dict]:
+        """Yield the assignment docs matching any of the (field, value) lookups
+
+        Fields are the Assignment API lookup fields (PatentNumber, OwnerName, ...). Numbers
+        match exactly, ignoring punctuation, and names match by prefix, ignoring case and
+        punctuation. Results are ordered by earliest execution date like the API, with
+        assignments that have no execution date last.
+        """
+        ids, params = self._matching_ids(lookups)
+        direction = "DESC" if descending else "ASC"
+        cursor = self.connection.execute(
+            f"SELECT data FROM assignment WHERE id IN ({ids}) "
+            f"ORDER BY execution_date IS NULL, execution_date {direction}, reel {direction}, "
+            f"frame {direction} LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset or 0),
+        )
+        for (data,) in cursor:
+            yield json.loads(data)
+
+    def count(self, lookups: tp.Sequence[tp.Tuple[str, str]]) -> int:
+        ids, params = self._matching_ids(lookups)
+        return self.connection.execute(f"SELECT COUNT(*) FROM ({ids})", params).fetchone()[0]
@@ -5,7 +5,13 @@
 # ********************************************************************************
 
 import datetime
+from pathlib import Path
+from types import SimpleNamespace
 
+import pytest
+
+from .api import AssignmentApi
+from .local import AssignmentDatabase
 from .model import Assignment
 
 
@@ -76,8 +82,10 @@ class TestAssignment:
         assignments = Assignment.objects.filter(assignee="US Well Services")
         assignment_list1 = [assignment.id for assignment in assignments[0:5]]
         assert len(assignment_list1) == 5
+
         assignment_list2 = [assignment.id for assignment in assignments[:5]]
         assert len(assignment_list2) == 5
+
         assignment_list3 = [assignment.id for assignment in assignments[-5:]]
         assert len(assignment_list3) == 5
 
@@ -85,3 +93,117 @@ class TestAssignment:
         assignments = Assignment.objects.filter(assignee="US Well Services")
         assignment_list = [assignment.id for assignment in assignments]
         assert len(assignment_list) == assignments.count()
+
+
+class FakeLookup:
+    """Stand-in for AssignmentApi.iter_lookup over a fixed set of assignments per lookup"""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = list()
+        self.converted = 0
+
+    def convert(self, docs):
+        for doc in docs:
+            self.converted += 1
+            yield doc
+
+    def __call__(self, query, filter, rows=8, start=0, sort="ExecutionDate+desc"):
+        self.calls.append((filter, query, start))
+        docs = sorted(
+            self.results.get((filter, query), []),
+            key=lambda d: d.pat_assignor_earliest_ex_date,
+            reverse=sort.endswith("desc"),
+        )
+        return len(docs), self.convert(docs[start : start + rows])
+
+
+def assignment(reel_frame, date):
+    return SimpleNamespace(
+        id=reel_frame, pat_assignor_earliest_ex_date=datetime.date.fromisoformat(date)
+    )
+
+
+class TestAssignmentFanOut:
+    @pytest.fixture
+    def fake_lookup(self, monkeypatch):
+        shared = assignment("500-1", "2015-06-01")
+        lookup = FakeLookup(
+            {
+                ("PatentNumber", "7130913"): [
+                    assignment("100-1", "2010-01-01"),
+                    shared,
+                    assignment("100-2", "2020-01-01"),
+                ],
+                ("PatentNumber", "8789601"): [shared, assignment("200-1", "2012-03-04")],
+                ("OwnerName", "REALTIME DATA LLC"): [
+                    assignment(f"300-{i}", f"20{10 + i:02d}-05-05") for i in range(5)
+                ],
+            }
+        )
+        monkeypatch.setattr(AssignmentApi, "iter_lookup", lookup)
+        monkeypatch.setattr(Assignment.objects.__class__, "page_size", 2)
+        return lookup
+
+    @pytest.mark.no_vcr
+    def test_multiple_values_are_merged_by_execution_date(self, fake_lookup):
+        manager = Assignment.objects.filter(patent_number=["7,130,913", "8789601", "7130913"])
+        ids = [a.id for a in manager]
+        assert ids == ["100-2", "500-1", "200-1", "100-1"]
+        # The repeated patent number is looked up once
+        assert {(f, q) for f, q, _ in fake_lookup.calls} == {
+            ("PatentNumber", "7130913"),
+            ("PatentNumber", "8789601"),
+        }
+        assert manager.count() == 4
+
+        ids = [a.id for a in manager.order_by("execution_date")]
+        assert ids == ["100-1", "200-1", "500-1", "100-2"]
+
+    @pytest.mark.no_vcr
+    def test_multiple_filters_are_combined(self, fake_lookup):
+        manager = Assignment.objects.filter(patent_number="8789601", assignee="REALTIME DATA LLC")
+        ids = [a.id for a in manager]
+        assert ids == ["500-1", "300-4", "300-3", "300-2", "200-1", "300-1", "300-0"]
+        ids = [a.id for a in manager.offset(1).limit(2)]
+        assert ids == ["300-4", "300-3"]
+
+    @pytest.mark.no_vcr
+    @pytest.mark.parametrize(
+        "filter", [{"assignee": "REALTIME DATA LLC"}, {"patent_number": ["7130913", "8789601"]}]
+    )
+    def test_assignments_are_converted_as_they_are_consumed(self, fake_lookup, monkeypatch, filter):
+        monkeypatch.setattr(Assignment.objects.__class__, "page_size", 5)
+        for _ in Assignment.objects.filter(**filter):
+            break
+        # The assignment yielded, plus at most the next one of each lookup
+        assert fake_lookup.converted <= 1 + len(fake_lookup.calls)
+
+
+class TestLocalAssignments:
+    @pytest.fixture
+    def database_path(self, tmp_path):
+        path = tmp_path / "assignments.sqlite"
+        AssignmentDatabase(path).ingest(Path(__file__).parent / "fixtures" / "bulk_assignments.xml")
+        return path
+
+    @pytest.mark.no_vcr
+    def test_local_queries(self, database_path, monkeypatch):
+        monkeypatch.setattr(AssignmentApi, "iter_lookup", None)
+        manager = Assignment.objects.local(database_path)
+        a = manager.get("18247-405")
+        assert a.assignees[0].name == "REALTIME DATA LLC"
+
+        results = manager.filter(appl_id="17/123,456")
+        assert [a.id for a in results] == ["62100-1", "62100-90"]
+        assert results.count() == 2
+        results = manager.filter(assignee=["acme widgets", "Realtime"]).order_by("execution_date")
+        assert [a.id for a in results] == ["18247-405", "62100-1"]
+        assert [a.id for a in results.offset(1)] == ["62100-1"]
+        assert results.offset(1).count() == 1
+
+    @pytest.mark.no_vcr
+    def test_missing_database(self, tmp_path):
+        manager = Assignment.objects.local(tmp_path / "missing.sqlite").filter(patent_number="1")
+        with pytest.raises(FileNotFoundError):
+            manager.count()
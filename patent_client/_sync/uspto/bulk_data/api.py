@@ -5,6 +5,7 @@
 # ********************************************************************************
 
 import datetime
+import time
 import typing as tp
 
 from patent_client._sync.http_client import PatentClientSession
@@ -15,6 +16,10 @@ client = PatentClientSession()
 
 
 class BulkDataApi:
+    # Product metadata (date range and latest files) by short name, with the time fetched
+    products: tp.Dict[str, tp.Tuple[float, Product]] = dict()
+    product_ttl = 3600.0
+
     @classmethod
     def get_latest(cls) -> tp.List[Product]:
         """Returns all products with Latest Files"""
@@ -84,3 +89,13 @@ class BulkDataApi:
             params=params,
         )
         return Product.model_validate(response.json())
+
+    @classmethod
+    def get_product(cls, short_name: str) -> Product:
+        """Returns the metadata of a product, cached for `product_ttl` seconds"""
+        cached = cls.products.get(short_name)
+        if cached is not None and time.monotonic() - cached[0] < cls.product_ttl:
+            return cached[1]
+        product = cls.get_by_short_name(short_name)
+        cls.products[short_name] = (time.monotonic(), product)
+        return product
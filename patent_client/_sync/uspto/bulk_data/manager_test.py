@@ -5,7 +5,11 @@
 # ********************************************************************************
 
 import datetime
+import time
 
+import pytest
+
+from .api import BulkDataApi
 from .manager import date_ranges
 from .model import File, Product
 
@@ -28,10 +32,14 @@ class TestProduct:
 
 
 class TestFile:
+    # Cassette replay isn't thread safe, so these list one window at a time. The concurrent
+    # listing is covered by TestConcurrentFileListing
+    objects = File.objects.option(concurrency=1)
+
     def test_can_filter_by_short_name(self):
         results = [
             f
-            for f in File.objects.filter_by_short_name(
+            for f in self.objects.filter_by_short_name(
                 "PTGRXML", from_date="2023-06-15", to_date="2023-08-15"
             )
         ]
@@ -39,7 +47,7 @@ class TestFile:
         assert isinstance(results[0], File)
 
     def test_can_get_daily_assignments(self):
-        results = [f for f in File.objects.filter_by_short_name("PASDL")]
+        results = [f for f in self.objects.filter_by_short_name("PASDL")]
         assert len(results) > 1
         assert isinstance(results[0], File)
 
@@ -49,3 +57,78 @@ def test_date_ranges():
     assert result[0] == (datetime.date(2020, 1, 15), datetime.date(2020, 1, 31))
     assert result[-1] == (datetime.date(2021, 2, 1), datetime.date(2021, 2, 15))
     assert len(result) == 14
+
+
+def test_date_ranges_within_one_month():
+    result = list(date_ranges(datetime.date(2020, 1, 15), datetime.date(2020, 1, 20)))
+    assert result == [(datetime.date(2020, 1, 15), datetime.date(2020, 1, 20))]
+
+
+class FakeBulkDataApi:
+    """Stand-in for BulkDataApi.get_by_short_name with one weekly file per window"""
+
+    def __init__(self):
+        self.calls = list()
+        self.active = 0
+        self.max_active = 0
+
+    def __call__(self, product_name, from_date=None, to_date=None, max_files=20):
+        self.calls.append((from_date, to_date))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        # Later windows answer first
+        time.sleep(0.05 if from_date is None else 0.02 / from_date.month)
+        self.active -= 1
+        files = list()
+        if from_date is not None:
+            files = [
+                file(from_date.month * 10 + i, from_date + datetime.timedelta(days=i))
+                for i in (1, 0)
+            ]
+        return Product.model_validate(
+            {
+                "productLinkPath": "",
+                "productIdentifier": 1,
+                "productShortName": product_name,
+                "productDesc": "",
+                "productTitle": "",
+                "productLevel": "PRODUCT",
+                "productFromDate": "2020-01-01",
+                "productToDate": "2020-06-30",
+                "numberOfFiles": 12,
+                "productFiles": files,
+            }
+        )
+
+
+def file(identifier, date):
+    return {
+        "fileLinkPath": "",
+        "fileIdentifier": identifier,
+        "fileName": f"ipg{date:%y%m%d}.zip",
+        "fileSize": 1,
+        "fileDownloadUrl": "",
+        "fileFromTime": date.isoformat(),
+        "fileToTime": date.isoformat(),
+        "fileType": "zip",
+        "fileReleaseDate": date.isoformat(),
+    }
+
+
+class TestConcurrentFileListing:
+    @pytest.mark.no_vcr
+    def test_windows_are_fetched_concurrently_in_order(self, monkeypatch):
+        fake = FakeBulkDataApi()
+        monkeypatch.setattr(BulkDataApi, "get_by_short_name", fake)
+        monkeypatch.setattr(BulkDataApi, "products", dict())
+        manager = File.objects.option(concurrency=3)
+        files = [f for f in manager.filter_by_short_name("PTGRXML")]
+        dates = [f.from_date for f in files]
+        assert dates == sorted(dates)
+        assert len(files) == 12
+        assert fake.max_active == 3
+        # The product date range was looked up once, and is cached for the next listing
+        assert fake.calls.count((None, None)) == 1
+        files = [f for f in manager.filter_by_short_name("PTGRXML")]
+        assert len(files) == 12
+        assert fake.calls.count((None, None)) == 1
@@ -6,8 +6,8 @@
 
 import typing as tp
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, bounded_map
 from patent_client.util.manager import Manager
-from patent_client.util.request_util import get_start_and_row_count
 
 from .api import ODPApi
 from .model import SearchRequest, USApplication, USApplicationBiblio
@@ -26,6 +26,8 @@ if tp.TYPE_CHECKING:
         USApplication,
         USApplicationBiblio,
     )
+
+
 api = ODPApi()
 
 
@@ -33,20 +35,37 @@ class USApplicationManager(Manager):
     default_filter = "appl_id"
     default_fields = ["applicationNumberText"]
     response_model = USApplication
+    page_size = 50
+    # Maximum number of application records fetched at once. Override with .option(concurrency=n)
+    concurrency = DEFAULT_CONCURRENCY
 
     def count(self):
         return (api.post_search(self._create_search_obj(fields=["applicationNumberText"])))["count"]
 
-    def _get_results(self) -> tp.Iterator["SearchResult"]:
-        query_obj = self._create_search_obj()
-        for start, rows in get_start_and_row_count(self.config.limit):
+    def _get_search_results(self, fields: tp.Optional[tp.List[str]] = None):
+        query_obj = self._create_search_obj(fields=fields)
+
+        def fetch_page(start, rows):
             page_query = query_obj.model_dump()
             page_query["pagination"] = {"offset": start, "limit": rows}
-            page_query_obj = SearchRequest(**page_query)
-            for result in (api.post_search(page_query_obj))["patentBag"]:
-                app_id = result["applicationNumberText"]
-                app = api.get_application_data(app_id)
-                yield app
+            response = api.post_search(SearchRequest(**page_query))
+            return response["patentBag"], response["count"]
+
+        for result in self._paginate(fetch_page, self.page_size):
+            yield result
+
+    def _get_results(self) -> tp.Iterator["SearchResult"]:
+        if self.config.options.get("full_fields"):
+            # Without a field list the search returns whole records, so no detail calls are needed
+            for result in self._get_search_results(fields=list()):
+                yield self.response_model(**result)
+            return
+        # Records are fetched concurrently while the search pages are prefetched, and yielded in
+        # search order
+        concurrency = self.config.options.get("concurrency", self.concurrency)
+        app_ids = (result["applicationNumberText"] for result in self._get_search_results())
+        for app in bounded_map(api.get_application_data, app_ids, limit=concurrency):
+            yield app
 
     def _create_search_obj(self, fields: tp.Optional[tp.List[str]] = None):
         if fields is None:
@@ -86,13 +105,8 @@ class USApplicationBiblioManager(USApplicationManager):
     response_model = USApplicationBiblio
 
     def _get_results(self) -> tp.Iterator["SearchResult"]:
-        query_obj = self._create_search_obj(fields=self.default_fields)
-        for start, rows in get_start_and_row_count(self.config.limit):
-            page_query = query_obj.model_dump()
-            page_query["pagination"] = {"offset": start, "limit": rows}
-            page_query_obj = SearchRequest(**page_query)
-            for result in (api.post_search(page_query_obj))["patentBag"]:
-                yield self.response_model(**result)
+        for result in self._get_search_results(fields=self.default_fields):
+            yield self.response_model(**result)
 
     def get(self, *args, **kwargs):
         if len(args) == 1 and not kwargs:
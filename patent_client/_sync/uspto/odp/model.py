@@ -387,6 +387,24 @@ class USApplication(BaseODPModel):
         return v
 
 
+class ApplicationRecord(BaseODPModel):
+    """Every part of an application, as returned by ODPApi.get_full_record
+
+    Parts that weren't requested, or that ODP has no data for, are None.
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+    appl_id: Optional[str] = None
+    application: Optional[USApplication] = None
+    continuity: Optional[Continuity] = None
+    documents: Optional[list[Document]] = None
+    transactions: Optional[list[Transaction]] = None
+    assignments: Optional[list[Assignment]] = None
+    foreign_priority: Optional[list[ForeignPriority]] = None
+    term_adjustment: Optional[TermAdjustment] = None
+    attorney: Optional[CustomerNumber] = None
+
+
 ## RESPONSE Models
 
 
@@ -6,24 +6,32 @@
 
 import csv
 import typing as tp
+from functools import lru_cache
 from pathlib import Path
 
 from .model import SearchRequest
 
 if tp.TYPE_CHECKING:
     from patent_client.util.manager import ManagerConfig
+
 field_file = Path(__file__).parent / "query_fields.csv"
-field_index = dict()
-with field_file.open("r") as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        record = {
-            "field_name": row["field_name"],
-            "type": row["type"],
-        }
-        field_index[row["field_name"]] = record
-        field_index[row["underscore_case"]] = record
-        field_index[row["simple_name"]] = record
+
+
+@lru_cache(maxsize=None)
+def get_field_index() -> tp.Dict[str, dict]:
+    """Map every accepted spelling of a field name to its record. Loaded on first use"""
+    field_index = dict()
+    with field_file.open("r") as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            record = {
+                "field_name": row["field_name"],
+                "type": row["type"],
+            }
+            field_index[row["field_name"]] = record
+            field_index[row["underscore_case"]] = record
+            field_index[row["simple_name"]] = record
+    return field_index
 
 
 def create_post_search_obj(
@@ -35,6 +43,7 @@ def create_post_search_obj(
     )
     q_str = list()
     range_filters = dict()
+    field_index = get_field_index()
     for field, value in config.filter.items():
         if field.endswith("_gte") or field.endswith("_lte"):
             field_name, tail = field.rsplit("_", 1)
@@ -45,6 +54,7 @@ def create_post_search_obj(
                 range_filters[field_name] = {"valueFrom": value[0]}
             elif field.endswith("_lte"):
                 range_filters[field_name] = {"valueTo": value[0]}
+
         else:
             if field not in field_index:
                 raise ValueError(f"Unknown field: {field}")
@@ -53,6 +63,7 @@ def create_post_search_obj(
                 q_str.append(f"{field_data['field_name']}:({' OR '.join(value)})")
             else:
                 q_str.append(f"{field_data['field_name']}=({' OR '.join(value)})")
+
     for sort_field, direction in config.order_by:
         query_obj["sort"].append(
             dict(field=field_index[sort_field]["field_name"], direction=direction)
@@ -15,13 +15,13 @@ from dateutil.parser import parse as dt_parse
 from pypdf import PdfMerger
 
 from patent_client.util.manager import Manager
-from patent_client.util.request_util import get_start_and_row_count
 
 from .api import PatentExaminationDataSystemApi
 from .query import QueryFields
 
 if tp.TYPE_CHECKING:
     from .model import Document, USApplication
+
 logger = logging.getLogger(__name__)
 
 
@@ -53,6 +53,7 @@ def datetime_to_solr(date: datetime.datetime) -> str:
 
 class USApplicationManager(Manager["USApplication"]):
     default_filter = "appl_id"
+    page_size = 20
 
     def count(self):
         api = PatentExaminationDataSystemApi()
@@ -62,18 +63,13 @@ class USApplicationManager(Manager["USApplication"]):
     def _get_results(self) -> tp.Iterator["USApplication"]:
         query_params = self.get_query_params()
         api = PatentExaminationDataSystemApi()
-        counter = 0
-        for start, rows in get_start_and_row_count(
-            self.config.limit, self.config.offset, page_size=20
-        ):
+
+        def fetch_page(start, rows):
             page = api.create_query(**{**query_params, "start": start, "rows": rows})
-            for app in page.applications:
-                yield app
-                counter += 1
-                if self.config.limit and counter >= self.config.limit:
-                    break
-            if len(page.applications) < rows:
-                break
+            return page.applications, page.num_found
+
+        for app in self._paginate(fetch_page, self.page_size):
+            yield app
 
     def get_query_params(self):
         # Short circuit processing logic if the "query" filter is specified
@@ -91,6 +87,7 @@ class USApplicationManager(Manager["USApplication"]):
                 for k, v in self.config.filter.items()
                 if QueryFields.get(k) not in date_filters
             }
+
             date_filter_tuples = list()
             # Check date filters for validity
             for k, v in date_filters.items():
@@ -134,12 +131,14 @@ class USApplicationManager(Manager["USApplication"]):
                     query_date_filter_tuples.add((k, (gte_query, v)))
                 elif op == "exact":
                     query_date_filter_tuples.add((k, (v, v)))
+
             # Create the query string
             for k, v in query_date_filter_tuples:
                 start, end = v
                 start = datetime_to_solr(cast_as_datetime(start))
                 end = datetime_to_solr(cast_as_datetime(end, end_of_day=True))
                 query.append(f"{k}:[{start} TO {end}]")
+
             # Add non-date filters
             for k, v in non_date_filters.items():
                 if isinstance(v, Sequence) and not isinstance(v, str):
@@ -148,6 +147,7 @@ class USApplicationManager(Manager["USApplication"]):
                 else:
                     query.append(f"{k}:({v})")
             query_text = " AND ".join(query)
+
         if self.config.order_by:
             sort_query = ""
             for s in self.config.order_by:
@@ -157,7 +157,9 @@ class USApplicationManager(Manager["USApplication"]):
                     sort_query += (f"{QueryFields.get(s)} asc").strip()
         else:
             sort_query = None
+
         mm = "0%" if "appEarlyPubNumber" not in query else "90%"
+
         query_data = {
             "query": query_text,
             "facet": False,
@@ -193,18 +195,21 @@ class DocumentManager(Manager["Document"]):
             out_file = Path(path)
         else:
             out_file = Path(path) / "package.pdf"
+
         files = list()
         try:
             with TemporaryDirectory() as tmpdir:
                 for doc in docs:
                     if doc.access_level_category == "PUBLIC":
                         files.append((doc.adownload(tmpdir), doc))
+
                 out_pdf = PdfMerger()
                 page = 0
                 for f, doc in files:
                     bookmark = f"{doc.mail_room_date} - {doc.code} - {doc.description}"
                     out_pdf.append(str(f), bookmark=bookmark, import_bookmarks=False)
                     page += doc.page_count
+
                 out_pdf.write(str(out_file))
         except (PermissionError, NotADirectoryError):
             # This is needed due to a bug in Windows that prevents cleanup of the tmpdir
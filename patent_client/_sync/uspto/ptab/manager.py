@@ -4,13 +4,11 @@
 # *           Source File: patent_client/_async/uspto/ptab/manager.py            *
 # ********************************************************************************
 
-from copy import deepcopy
 from typing import Callable, Generic, Optional
 
 import inflection
 
 from patent_client.util.manager import Manager, ModelType
-from patent_client.util.request_util import get_start_and_row_count
 
 from .api import PtabApi
 from .model import PtabDecision, PtabDocument, PtabProceeding
@@ -24,24 +22,20 @@ class PtabManager(Manager, Generic[ModelType]):
     api_method: Optional[Callable] = None
 
     def _get_results(self):
-        query = deepcopy(self.config.filter)
-        query = peds_to_ptab(query)
+        query = peds_to_ptab(dict(self.config.filter))
         query["sort"] = " ".join(
             inflection.camelize(o, uppercase_first_letter=False) for o in self.config.order_by
         )
-        for start, rows in get_start_and_row_count(
-            self.config.limit, self.config.offset, self.page_size
-        ):
-            query["start"] = start
-            query["rows"] = rows
-            page = self.api_method(**query)
-            for doc in page.docs:
-                yield doc
-            if len(page.docs) < rows:
-                break
+
+        def fetch_page(start, rows):
+            page = self.api_method(**{**query, "start": start, "rows": rows})
+            return page.docs, page.num_found
+
+        for doc in self._paginate(fetch_page, self.page_size):
+            yield doc
 
     def count(self):
-        page = self.api_method(**peds_to_ptab(self.config.filter))
+        page = self.api_method(**peds_to_ptab(dict(self.config.filter)))
         return min(self.config.limit, page.num_found) if self.config.limit else page.num_found
 
     # def allowed_filters(self):
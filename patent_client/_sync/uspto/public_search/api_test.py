@@ -4,8 +4,20 @@
 # *      Source File: patent_client/_async/uspto/public_search/api_test.py       *
 # ********************************************************************************
 
+import json
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from patent_client._sync.http_client import PatentClientSession
+from patent_client.util.concurrency import bounded_map
+
 from .api import PublicSearchApi
 
+fixtures = Path(__file__).parent / "fixtures"
+
 
 def test_simple_search():
     api = PublicSearchApi()
@@ -14,3 +26,94 @@ def test_simple_search():
     )
     assert results.num_found == 1
     assert results.docs[0].publication_number == "6013599"
+
+
+def test_query_plan_is_reused_across_pages_and_counts():
+    api = PublicSearchApi()
+    api.access_token = "token"
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    requests = list()
+
+    def make_request(method, url, **kwargs):
+        requests.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/counts"):
+            content = {"numResults": search_result["numFound"], "error": None}
+        else:
+            content = search_result
+        return httpx.Response(200, json=content, request=httpx.Request(method, url))
+
+    api.make_request = make_request
+    assert api.count("tennis.ti.") == 500
+    api.run_query("tennis.ti.", start=0)
+    api.run_query("tennis.ti.", start=500)
+    assert requests == ["counts", "searchWithBeFamily", "searchWithBeFamily"]
+    api.run_query("tennis.ti.", sources=["USPAT"])
+    assert requests[-2:] == ["counts", "searchWithBeFamily"]
+
+
+def test_concurrent_pages_register_query_once():
+    api = PublicSearchApi()
+    api.access_token = "token"
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    requests = list()
+
+    def make_request(method, url, **kwargs):
+        requests.append(url.rsplit("/", 1)[-1])
+        if url.endswith("/counts"):
+            time.sleep(0.05)
+            content = {"numResults": search_result["numFound"], "error": None}
+        else:
+            content = search_result
+        return httpx.Response(200, json=content, request=httpx.Request(method, url))
+
+    def fetch_page(start):
+        return api.run_query("tennis.ti.", start=start)
+
+    api.make_request = make_request
+    pages = [page for page in bounded_map(fetch_page, [0, 500, 1000], limit=3)]
+    assert len(pages) == 3
+    assert requests.count("counts") == 1
+    assert requests.count("searchWithBeFamily") == 3
+
+
+@pytest.mark.no_vcr
+def test_expired_session_reregisters_query_between_pages():
+    search_result = json.loads((fixtures / "biblio.json").read_text())
+    server = dict(case_id=0, token=None, registered=set())
+    searches = list()
+
+    def handler(request):
+        path = request.url.path
+        if path == "/pubwebapp/":
+            return httpx.Response(200)
+        if path.endswith("/users/me/session"):
+            server["case_id"] += 1
+            server["token"] = f"token-{server['case_id']}"
+            server["registered"] = set()
+            return httpx.Response(
+                200,
+                json={"userCase": {"caseId": server["case_id"]}},
+                headers={"X-Access-Token": server["token"]},
+            )
+        if request.headers.get("X-Access-Token") != server["token"]:
+            return httpx.Response(403)
+        body = json.loads(request.content)
+        query = body.get("query", body)
+        if query["caseId"] != server["case_id"]:
+            return httpx.Response(400)
+        if path.endswith("/counts"):
+            server["registered"].add(query["q"])
+            return httpx.Response(200, json={"numResults": 1000, "error": None})
+        if query["q"] not in server["registered"]:
+            return httpx.Response(400)
+        searches.append((query["caseId"], body["start"]))
+        return httpx.Response(200, json=search_result)
+
+    api = PublicSearchApi()
+    api.client = PatentClientSession(transport=httpx.MockTransport(handler))
+    api.run_query("tennis.ti.", start=0)
+    # The server expires the session between pages
+    server["token"] = "expired"
+    api.run_query("tennis.ti.", start=500)
+    assert searches == [(1, 0), (2, 500)]
+    assert api.case_id == 2
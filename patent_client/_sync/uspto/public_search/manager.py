@@ -4,10 +4,14 @@
 # *       Source File: patent_client/_async/uspto/public_search/manager.py       *
 # ********************************************************************************
 
+import datetime
+import heapq
+import math
+from collections import deque
 from typing import Generic, Iterator, TypeVar
 
+from patent_client.util.concurrency import DEFAULT_CONCURRENCY, bounded_map
 from patent_client.util.manager import Manager
-from patent_client.util.request_util import get_start_and_row_count
 
 from .api import PublicSearchApi
 from .model import (
@@ -18,7 +22,7 @@ from .model import (
     PublishedApplication,
     PublishedApplicationBiblio,
 )
-from .query import QueryBuilder
+from .query import QueryBuilder, QueryException
 
 
 class CapacityException(Exception):
@@ -30,6 +34,7 @@ class FinishedException(Exception):
 
 
 T = TypeVar("T")
+
 public_search_api = PublicSearchApi()
 
 
@@ -58,21 +63,55 @@ class GenericPublicSearchManager(Manager, Generic[T]):
         query = self._query
         order_by = self._order_by
         sources = self.config.options.get("sources", ["US-PGPUB", "USPAT", "USOCR"])
-        page = public_search_api.run_query(
-            query=query, start=0, limit=self.page_size, sort=order_by, sources=sources
-        )
-        max_len = page.num_found - self.config.offset
+        num_found = public_search_api.count(query=query, sort=order_by, sources=sources)
+        max_len = num_found - self.config.offset
         return min(self.config.limit, max_len) if self.config.limit else max_len
 
 
+class SortKey:
+    """Sort key for merging results with several ascending or descending fields
+
+    Missing values sort last, as they do in Public Search.
+    """
+
+    __slots__ = ("values", "descending")
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+    def __lt__(self, other):
+        for value, other_value, descending in zip(self.values, other.values, self.descending):
+            if value == other_value:
+                continue
+            if value is None or other_value is None:
+                return other_value is None
+            return value > other_value if descending else value < other_value
+        return False
+
+
 class GenericPublicSearchBiblioManager(GenericPublicSearchManager, Generic[T]):
+    # Target number of results per date shard. Override with .option(shard_size=n)
+    shard_size = 10_000
+    date_field = "publication_date"
+
+    @property
+    def _sources(self):
+        return self.config.options.get("sources", ["US-PGPUB", "USPAT", "USOCR"])
+
     def _get_results(self) -> Iterator[T]:
+        if self.config.options.get("shard"):
+            for obj in self._get_sharded_results():
+                yield obj
+            return
         query = self._query
         order_by = self._order_by
-        sources = self.config.options.get("sources", ["US-PGPUB", "USPAT", "USOCR"])
-        for start, rows in get_start_and_row_count(
-            self.config.limit, self.config.offset, self.page_size
-        ):
+        sources = self._sources
+
+        def fetch_page(start, rows):
             page = public_search_api.run_query(
                 query=query,
                 start=start,
@@ -80,24 +119,168 @@ class GenericPublicSearchBiblioManager(GenericPublicSearchManager, Generic[T]):
                 sort=order_by,
                 sources=sources,
             )
-            for obj in page.docs:
+            # numFound only covers the page, so take the total from the (cached) query plan
+            total = public_search_api.count(query=query, sort=order_by, sources=sources)
+            return page.docs, total
+
+        for obj in self._paginate(fetch_page, self.page_size):
+            yield obj
+
+    def _get_shards(self, concurrency):
+        """Split the query into publication date windows of at most `shard_size` results
+
+        The total count sets the number of windows, which first divide the span between the
+        earliest and latest publication dates evenly. Windows are probed concurrently, level
+        by level, and a window with too many results is cut in half and its halves probed
+        again, down to single days. Returns ``(query, count)`` pairs in ascending date
+        order, leaving out empty windows.
+        """
+        query, sources = self._query, self._sources
+        shard_size = self.config.options.get("shard_size", self.shard_size)
+        total = public_search_api.count(query=query, sources=sources)
+        if total <= shard_size:
+            return [(query, total)] if total else list()
+
+        def first_date(sort):
+            page = public_search_api.run_query(query, limit=1, sort=sort, sources=sources)
+            return page.docs[0].publication_date
+
+        first, last = [
+            d for d in bounded_map(first_date, ["date_publ asc", "date_publ desc"], limit=2)
+        ]
+        days = (last - first).days + 1
+        num_shards = min(math.ceil(total / shard_size), days)
+        bounds = [
+            first + datetime.timedelta(days=days * i // num_shards) for i in range(num_shards + 1)
+        ]
+        windows = [
+            (start, end - datetime.timedelta(days=1)) for start, end in zip(bounds, bounds[1:])
+        ]
+        shards = dict()
+
+        def probe(window):
+            date_filter = self.query_builder.query_value(f"{self.date_field}__range", [window])
+            shard_query = f"({query}) AND {date_filter}"
+            count = public_search_api.count(query=shard_query, sources=sources)
+            return window, shard_query, count
+
+        while windows:
+            split = list()
+            for window, shard_query, count in bounded_map(probe, windows, limit=concurrency):
+                low, high = window
+                if count > shard_size and low < high:
+                    middle = low + (high - low) // 2
+                    split += [(low, middle), (middle + datetime.timedelta(days=1), high)]
+                elif count:
+                    shards[window] = (shard_query, count)
+            windows = split
+        return [shards[window] for window in sorted(shards)]
+
+    def _sort_key(self):
+        fields = list()
+        for value in self.config.order_by:
+            keyword = value.lstrip("+-")
+            if keyword not in PublicSearchBiblio.model_fields:
+                raise QueryException(f"Sharded searches can't be ordered by {keyword}")
+            fields.append((keyword, value.startswith("-")))
+        descending = tuple(d for _, d in fields)
+        return lambda obj: SortKey(tuple(getattr(obj, k, None) for k, _ in fields), descending)
+
+    def _get_sharded_results(self) -> Iterator[T]:
+        """Fetch the shards concurrently and merge them back into the requested order
+
+        When sorting by publication date the shards don't overlap, so their pages are
+        fetched `concurrency` at a time and yielded shard by shard. Any other order is a
+        k-way merge that holds at most one page per shard. The limit and offset apply to the
+        merged stream.
+        """
+        concurrency = self.config.options.get("concurrency", DEFAULT_CONCURRENCY)
+        order_by = self._order_by
+        shards = self._get_shards(concurrency)
+        if order_by.startswith("date_publ"):
+            if order_by.startswith("date_publ desc"):
+                shards.reverse()
+            merged = self._concatenate_shards(shards, order_by, concurrency)
+        else:
+            merged = self._merge_shards(shards, order_by, concurrency)
+        skip = self.config.offset or 0
+        remaining = self.config.limit
+        try:
+            for obj in merged:
+                if skip:
+                    skip -= 1
+                    continue
                 yield obj
-            if len(page.docs) < rows:
-                break
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining <= 0:
+                        return
+        finally:
+            merged.close()
+
+    def _fetch_shard_page(self, page):
+        query, start, order_by = page
+        result = public_search_api.run_query(
+            query=query, start=start, limit=self.page_size, sort=order_by, sources=self._sources
+        )
+        return result.docs
+
+    def _concatenate_shards(self, shards, order_by, concurrency):
+        pages = (
+            (query, start, order_by)
+            for query, count in shards
+            for start in range(0, count, self.page_size)
+        )
+        results = bounded_map(self._fetch_shard_page, pages, limit=concurrency)
+        try:
+            for docs in results:
+                for obj in docs:
+                    yield obj
+        finally:
+            results.close()
+
+    def _merge_shards(self, shards, order_by, concurrency):
+        sort_key = self._sort_key()
+        buffers = [list() for _ in shards]
+        next_start = [0 for _ in shards]
+        heap = list()
+
+        def refill(i):
+            query, count = shards[i]
+            docs = self._fetch_shard_page((query, next_start[i], order_by))
+            next_start[i] += self.page_size
+            return i, deque(docs)
+
+        for i, docs in bounded_map(refill, range(len(shards)), limit=concurrency):
+            buffers[i] = docs
+            if docs:
+                heapq.heappush(heap, (sort_key(docs[0]), i))
+        while heap:
+            _, i = heapq.heappop(heap)
+            yield buffers[i].popleft()
+            if not buffers[i] and next_start[i] < shards[i][1]:
+                _, buffers[i] = refill(i)
+            if buffers[i]:
+                heapq.heappush(heap, (sort_key(buffers[i][0]), i))
 
 
 capacity_limit = 501
 
 
 class GenericPublicSearchDocumentManager(GenericPublicSearchBiblioManager, Generic[T]):
+    # Maximum number of full documents fetched at once. Override with .option(concurrency=n)
+    concurrency = DEFAULT_CONCURRENCY
+
     def _get_results(self) -> Iterator["PublicSearchDocument"]:
         result_count = super().count()
         if result_count > capacity_limit:
             raise CapacityException(
                 f"Query would result in more than 501 results! ({result_count} > 20).\nPlease use the associated Biblio method to reduce load on the API (PublicSearch / PatentBiblio / PublishedApplicationBiblio"
             )
-        for obj in super()._get_results():
-            doc = public_search_api.get_document(obj)
+        concurrency = self.config.options.get("concurrency", self.concurrency)
+        for doc in bounded_map(
+            public_search_api.get_document, super()._get_results(), limit=concurrency
+        ):
             yield doc
 
 
@@ -112,17 +295,13 @@ class PublicSearchDocumentManager(GenericPublicSearchDocumentManager[PublicSearc
 class PatentBiblioManager(GenericPublicSearchBiblioManager[PatentBiblio]):
     def __init__(self, config=None):
         super().__init__(config=config)
-        self.config.options["sources"] = [
-            "USPAT",
-        ]
+        self.config = self.config.replace(options=self.config.options.set(sources=["USPAT"]))
 
 
 class PatentManager(GenericPublicSearchDocumentManager[Patent]):
     def __init__(self, config=None):
         super().__init__(config=config)
-        self.config.options["sources"] = [
-            "USPAT",
-        ]
+        self.config = self.config.replace(options=self.config.options.set(sources=["USPAT"]))
 
 
 class PublishedApplicationBiblioManager(
@@ -130,14 +309,10 @@ class PublishedApplicationBiblioManager(
 ):
     def __init__(self, config=None):
         super().__init__(config=config)
-        self.config.options["sources"] = [
-            "US-PGPUB",
-        ]
+        self.config = self.config.replace(options=self.config.options.set(sources=["US-PGPUB"]))
 
 
 class PublishedApplicationManager(GenericPublicSearchDocumentManager[PublishedApplication]):
     def __init__(self, config=None):
         super().__init__(config=config)
-        self.config.options["sources"] = [
-            "US-PGPUB",
-        ]
+        self.config = self.config.replace(options=self.config.options.set(sources=["US-PGPUB"]))
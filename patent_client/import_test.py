@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+
+
+def imported_modules(code: str) -> list:
+    """Run code in a fresh interpreter and return the names of all loaded modules"""
+    script = f"{code}\nimport json, sys\nprint(json.dumps(list(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_import_is_lazy():
+    modules = imported_modules("import patent_client")
+    assert not [m for m in modules if m.startswith(("patent_client._sync", "patent_client._async"))]
+    assert "httpx" not in modules
+
+
+def test_model_access_imports_one_subsystem():
+    modules = imported_modules("from patent_client import PtabProceeding")
+    assert "patent_client._sync.uspto.ptab.model" in modules
+    assert "patent_client._sync.uspto.public_search.model" not in modules
+    assert "patent_client._sync.epo.ops.published.model" not in modules
+
+
+def test_lazy_names_resolve():
+    import patent_client
+    from patent_client import _async
+
+    assert patent_client.USApplication.__module__ == "patent_client._sync.uspto.peds.model"
+    assert _async.Inpadoc.__module__.startswith("patent_client._async.epo.ops.published.model")
+    assert set(patent_client.__all__) - {"PublicSearch"} <= set(dir(patent_client))
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -10,8 +10,18 @@ class Settings(BaseSettings):
     base_dir: Path = Field(default=Path("~/.patent_client").expanduser())
     log_file: str = Field(default="patent_client.log")
     log_level: str = Field(default="INFO")
+    cache_max_bytes: Optional[int] = Field(default=2 * 1024**3)
+    cache_compression: str = Field(default="zlib")
+    cache_compression_level: Optional[int] = Field(default=None)
+    # URL regex -> {"mode": "default" | "force" | "disabled", "ttl": seconds or None}
+    cache_policies: Dict[str, Dict] = Field(default_factory=dict)
+    # Seconds between HTTP metrics snapshots written to the log. None disables the dump
+    metrics_log_interval: Optional[float] = Field(default=None)
     epo_api_key: Optional[str] = Field(default=None)
     epo_api_secret: Optional[str] = Field(default=None)
+    # EPO OPS fair use data quotas in bytes. None disables the check
+    epo_weekly_quota: Optional[int] = Field(default=4 * 1024**3)
+    epo_hourly_quota: Optional[int] = Field(default=450 * 1024**2)
     itc_username: Optional[str] = Field(default=None)
     itc_password: Optional[str] = Field(default=None)
     odp_api_key: Optional[str] = Field(default=None)
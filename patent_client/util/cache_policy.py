@@ -0,0 +1,116 @@
+"""Per-endpoint cache policies.
+
+A policy table maps URL regular expressions to a cache mode and a time-to-live. The first
+pattern that matches a request URL (using ``re.search``) decides how it is cached:
+
+- ``default`` follows the HTTP caching headers of the response, with heuristics
+- ``force`` caches every successful response, whatever its headers say. The cache key of a
+  POST includes its body, so each distinct search is cached separately
+- ``disabled`` never stores or serves the response from the cache
+
+``ttl`` is the maximum age in seconds of a cached response, or None for no limit. Entries
+from the ``cache_policies`` setting take precedence over the defaults below. Request
+extensions such as ``force_cache`` and ``cache_disabled`` still override both.
+"""
+
+import re
+import typing as tp
+
+import hishel
+import httpcore
+from hishel._utils import normalized_url
+
+DAY = 60 * 60 * 24
+
+
+class CachePolicy(tp.NamedTuple):
+    mode: str = "default"
+    ttl: tp.Optional[float] = None
+
+
+MODES = ("default", "force", "disabled")
+
+DEFAULT_CACHE_POLICIES: tp.Dict[str, CachePolicy] = {
+    # EPO OPS
+    r"ops\.epo\.org/.*/number-service/": CachePolicy("force"),
+    r"ops\.epo\.org/.*/images": CachePolicy("force"),
+    r"ops\.epo\.org/.*/biblio": CachePolicy("force", 30 * DAY),
+    r"ops\.epo\.org/.*/legal": CachePolicy("force", DAY),
+    r"ops\.epo\.org/.*/accesstoken": CachePolicy("disabled"),
+    r"ops\.epo\.org/": CachePolicy("force", 3 * DAY),
+    # USPTO
+    r"ped\.uspto\.gov/api/queries$": CachePolicy("force", 60 * 60),
+}
+
+
+class CachePolicies:
+    """Ordered table of URL patterns and the cache policy that applies to them"""
+
+    def __init__(self, policies: tp.Mapping[str, tp.Union[CachePolicy, tp.Mapping, tuple]]):
+        self.policies = list()
+        for pattern, policy in policies.items():
+            if isinstance(policy, tp.Mapping):
+                policy = CachePolicy(**policy)
+            policy = CachePolicy(*policy)
+            if policy.mode not in MODES:
+                raise ValueError(f"Invalid cache mode {policy.mode!r} for {pattern!r}")
+            self.policies.append((re.compile(pattern), policy))
+
+    @classmethod
+    def with_defaults(cls, overrides: tp.Mapping = dict()) -> "CachePolicies":
+        """Build a table with the given overrides ahead of the default policies"""
+        defaults = {k: v for k, v in DEFAULT_CACHE_POLICIES.items() if k not in overrides}
+        return cls({**overrides, **defaults})
+
+    def get(self, url: str) -> CachePolicy:
+        for pattern, policy in self.policies:
+            if pattern.search(url):
+                return policy
+        return CachePolicy()
+
+    def for_request(self, request: httpcore.Request) -> CachePolicy:
+        # Per-request extensions win over the table
+        if request.extensions.get("cache_disabled"):
+            return CachePolicy("disabled")
+        if request.extensions.get("force_cache"):
+            return CachePolicy("force")
+        return self.get(normalized_url(request.url))
+
+
+class PolicyController(hishel.Controller):
+    """Hishel controller that applies the cache mode from a CachePolicies table
+
+    Time-to-live is enforced by the storage, which knows when each response was stored.
+    """
+
+    def __init__(self, policies: CachePolicies, **kwargs):
+        super().__init__(**kwargs)
+        self.policies = policies
+
+    def is_cachable(self, request: httpcore.Request, response: httpcore.Response) -> bool:
+        mode = self.policies.for_request(request).mode
+        if mode == "disabled":
+            return False
+        if mode == "force":
+            return response.status == 200
+        return super().is_cachable(request=request, response=response)
+
+    def construct_response_from_cache(
+        self,
+        request: httpcore.Request,
+        response: httpcore.Response,
+        original_request: httpcore.Request,
+    ):
+        mode = self.policies.for_request(request).mode
+        if mode == "disabled":
+            return None
+        if mode == "force":
+            return response
+        result = super().construct_response_from_cache(
+            request=request, response=response, original_request=original_request
+        )
+        if isinstance(result, httpcore.Request):
+            # Flag the revalidation so the session can report it. The extensions dict is shared
+            # with the httpx request that is passed back with the response.
+            request.extensions["revalidated"] = True
+        return result
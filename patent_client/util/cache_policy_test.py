@@ -0,0 +1,43 @@
+import httpcore
+import pytest
+
+from .cache_policy import DAY, CachePolicies, CachePolicy, PolicyController
+
+OPS = "https://ops.epo.org/3.2/rest-services"
+
+
+def test_default_policies():
+    policies = CachePolicies.with_defaults()
+    assert policies.get(f"{OPS}/number-service/application/original/US.123/docdb").ttl is None
+    assert policies.get(f"{OPS}/published-data/publication/docdb/EP123/biblio").ttl == 30 * DAY
+    assert policies.get(f"{OPS}/legal/publication/docdb/EP123").ttl == DAY
+    assert policies.get(f"{OPS}/family/publication/docdb/EP123").ttl == 3 * DAY
+    assert policies.get("https://ops.epo.org/3.2/auth/accesstoken").mode == "disabled"
+    assert policies.get("https://ped.uspto.gov/api/queries") == CachePolicy("force", 3600)
+    assert policies.get("https://developer.uspto.gov/ptab-api/documents") == CachePolicy()
+
+
+def test_overrides_take_precedence():
+    policies = CachePolicies.with_defaults(
+        {r"ops\.epo\.org/.*/legal": {"mode": "force", "ttl": 60}, r"ptab-api": ["disabled"]}
+    )
+    assert policies.get(f"{OPS}/legal/publication/docdb/EP123").ttl == 60
+    assert policies.get("https://developer.uspto.gov/ptab-api/documents").mode == "disabled"
+    with pytest.raises(ValueError):
+        CachePolicies({"x": {"mode": "sometimes"}})
+
+
+def test_controller_applies_mode():
+    controller = PolicyController(CachePolicies.with_defaults({r"uncached": ["disabled"]}))
+    ok = httpcore.Response(200, headers=[(b"Cache-Control", b"no-store")])
+    forced = httpcore.Request("POST", "https://ped.uspto.gov/api/queries")
+    assert controller.is_cachable(forced, ok)
+    assert controller.construct_response_from_cache(forced, ok, forced) is ok
+    assert not controller.is_cachable(forced, httpcore.Response(500))
+    uncached = httpcore.Request("GET", "https://example.com/uncached")
+    assert not controller.is_cachable(uncached, ok)
+    assert controller.construct_response_from_cache(uncached, ok, uncached) is None
+    disabled = httpcore.Request(
+        "POST", "https://ped.uspto.gov/api/queries", extensions={"cache_disabled": True}
+    )
+    assert not controller.is_cachable(disabled, ok)
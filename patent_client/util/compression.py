@@ -0,0 +1,80 @@
+"""Framed compression for cached response bodies.
+
+Compressed values start with a short header naming the codec, so entries written with one
+codec stay readable after the setting changes. Values without a header are returned as-is.
+The ``zstd`` codec needs the optional ``zstandard`` package.
+"""
+
+import lzma
+import typing as tp
+import zlib
+
+MAGIC = b"PCZ"
+
+
+class Codec(tp.NamedTuple):
+    tag: bytes
+    default_level: int
+    compress: tp.Callable[[bytes, int], bytes]
+    decompress: tp.Callable[[bytes], bytes]
+
+
+def _zstd_compress(data: bytes, level: int) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+CODECS: tp.Dict[str, Codec] = {
+    "none": Codec(b"0", 0, lambda data, level: data, lambda data: data),
+    "zlib": Codec(b"1", 1, zlib.compress, zlib.decompress),
+    "lzma": Codec(
+        b"2",
+        0,
+        lambda data, level: lzma.compress(data, preset=level),
+        lzma.decompress,
+    ),
+    "zstd": Codec(b"3", 3, _zstd_compress, _zstd_decompress),
+}
+CODECS_BY_TAG = {codec.tag: codec for codec in CODECS.values()}
+
+
+def get_codec(name: str) -> Codec:
+    try:
+        codec = CODECS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown compression codec {name!r}! Must be one of {list(CODECS)}")
+    if name.lower() == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "The zstd codec requires the zstandard package: pip install zstandard"
+            )
+    return codec
+
+
+def compress(data: bytes, codec: str = "zlib", level: tp.Optional[int] = None) -> bytes:
+    """Compress data with the named codec and prefix it with a header naming the codec"""
+    selected = get_codec(codec)
+    level = selected.default_level if level is None else level
+    return MAGIC + selected.tag + selected.compress(data, level)
+
+
+def decompress(data: bytes) -> bytes:
+    """Reverse `compress`. Data without a compression header is returned unchanged"""
+    if not data.startswith(MAGIC):
+        return data
+    header_length = len(MAGIC) + 1
+    tag = data[len(MAGIC) : header_length]
+    try:
+        codec = CODECS_BY_TAG[tag]
+    except KeyError:
+        raise ValueError(f"Unknown compression tag {tag!r}")
+    return codec.decompress(data[header_length:])
@@ -0,0 +1,23 @@
+import pytest
+
+from .compression import compress, decompress
+
+DATA = b'{"content": "' + b"<biblio>repetitive</biblio>" * 200 + b'"}'
+
+
+@pytest.mark.parametrize("codec", ["none", "zlib", "lzma"])
+def test_round_trip(codec):
+    compressed = compress(DATA, codec)
+    assert decompress(compressed) == DATA
+    if codec != "none":
+        assert len(compressed) < len(DATA) / 5
+
+
+def test_level_and_uncompressed_values():
+    assert decompress(compress(DATA, "zlib", level=9)) == DATA
+    assert decompress(DATA) == DATA
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        compress(DATA, "snappy")
@@ -0,0 +1,156 @@
+"""Helpers for running API calls concurrently.
+
+Code in the ``_async`` packages uses the ``a``-prefixed / ``Async``-prefixed
+helpers below. ``unasync.py`` rewrites those names to their synchronous
+counterparts, which provide the same semantics using a thread pool.
+"""
+
+import asyncio
+import threading
+import typing as tp
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+T = tp.TypeVar("T")
+R = tp.TypeVar("R")
+
+DEFAULT_CONCURRENCY = 4
+
+AsyncLock = asyncio.Lock
+Lock = threading.Lock
+
+
+async def _aiterate(iterable: tp.Union[tp.Iterable[T], tp.AsyncIterable[T]]) -> tp.AsyncIterator[T]:
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
+
+
+async def abounded_map(
+    func: tp.Callable[[T], tp.Awaitable[R]],
+    iterable: tp.Union[tp.Iterable[T], tp.AsyncIterable[T]],
+    limit: int = DEFAULT_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> tp.AsyncIterator[R]:
+    """Apply ``func`` to every item of ``iterable`` with at most ``limit`` calls in flight.
+
+    Results are yielded in the order of the input, regardless of the order in which the
+    calls complete. Items are only pulled from ``iterable`` as slots free up, so infinite
+    iterators are fine. If ``return_exceptions`` is True, exceptions raised by ``func`` are
+    yielded in place of the result instead of aborting the iteration. Closing the generator
+    cancels any calls that are still outstanding.
+    """
+    limit = max(int(limit), 1)
+
+    async def run(item):
+        if not return_exceptions:
+            return await func(item)
+        try:
+            return await func(item)
+        except Exception as e:
+            return e
+
+    pending: tp.Deque[asyncio.Future] = deque()
+    try:
+        async for item in _aiterate(iterable):
+            pending.append(asyncio.ensure_future(run(item)))
+            if len(pending) >= limit:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            if task.done() and not task.cancelled():
+                task.exception()  # Mark exception as retrieved
+            task.cancel()
+
+
+def bounded_map(
+    func: tp.Callable[[T], R],
+    iterable: tp.Iterable[T],
+    limit: int = DEFAULT_CONCURRENCY,
+    return_exceptions: bool = False,
+) -> tp.Iterator[R]:
+    """Synchronous counterpart of :func:`abounded_map` backed by a thread pool."""
+    limit = max(int(limit), 1)
+
+    def run(item):
+        if not return_exceptions:
+            return func(item)
+        try:
+            return func(item)
+        except Exception as e:
+            return e
+
+    pending: tp.Deque = deque()
+    executor = ThreadPoolExecutor(max_workers=limit)
+    try:
+        for item in iterable:
+            pending.append(executor.submit(run, item))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent calls that share a key into a single call.
+
+    The first caller for a key starts ``func`` as a task; callers arriving while it runs
+    await the same task and receive the same result or exception. The task is shielded, so
+    a cancelled caller doesn't cancel the call for everyone else.
+    """
+
+    def __init__(self):
+        self._calls: tp.Dict[tp.Tuple[asyncio.AbstractEventLoop, tp.Hashable], asyncio.Task] = {}
+
+    async def run(self, key: tp.Hashable, func: tp.Callable[[], tp.Awaitable[R]]) -> R:
+        # Tasks belong to a loop, so calls on different event loops are never shared
+        call_key = (asyncio.get_running_loop(), key)
+        task = self._calls.get(call_key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[call_key] = task
+            task.add_done_callback(lambda _: self._calls.pop(call_key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class SingleFlight:
+    """Synchronous counterpart of :class:`AsyncSingleFlight` for calls made from threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: tp.Dict[tp.Hashable, Future] = {}
+
+    def run(self, key: tp.Hashable, func: tp.Callable[[], R]) -> R:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from .concurrency import AsyncSingleFlight, SingleFlight, abounded_map, bounded_map
+
+
+class TestAsyncBoundedMap:
+    @pytest.mark.asyncio
+    async def test_preserves_input_order(self):
+        async def func(i):
+            await asyncio.sleep(0.01 * (5 - i))
+            return i * 2
+
+        assert [r async for r in abounded_map(func, range(5), limit=5)] == [0, 2, 4, 6, 8]
+
+    @pytest.mark.asyncio
+    async def test_respects_limit(self):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def func(i):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return i
+
+        async def items():
+            for i in range(10):
+                yield i
+
+        assert [r async for r in abounded_map(func, items(), limit=3)] == list(range(10))
+        assert max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_return_exceptions(self):
+        async def func(i):
+            if i == 1:
+                raise ValueError(i)
+            return i
+
+        results = [r async for r in abounded_map(func, range(3), return_exceptions=True)]
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], ValueError)
+        with pytest.raises(ValueError):
+            [r async for r in abounded_map(func, range(3))]
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_outstanding_calls(self):
+        started = list()
+
+        async def func(i):
+            started.append(i)
+            await asyncio.sleep(0.01)
+            return i
+
+        gen = abounded_map(func, iter(range(1000)), limit=4)
+        assert await gen.__anext__() == 0
+        await gen.aclose()
+        await asyncio.sleep(0.02)
+        assert len(started) <= 5
+
+
+class TestBoundedMap:
+    def test_preserves_input_order(self):
+        def func(i):
+            time.sleep(0.01 * (5 - i))
+            return i * 2
+
+        assert list(bounded_map(func, range(5), limit=5)) == [0, 2, 4, 6, 8]
+
+    def test_respects_limit(self):
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        def func(i):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight -= 1
+            return i
+
+        assert list(bounded_map(func, range(10), limit=3)) == list(range(10))
+        assert max_in_flight <= 3
+
+    def test_return_exceptions(self):
+        def func(i):
+            if i == 1:
+                raise ValueError(i)
+            return i
+
+        results = list(bounded_map(func, range(3), return_exceptions=True))
+        assert isinstance(results[1], ValueError)
+        with pytest.raises(ValueError):
+            list(bounded_map(func, range(3)))
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_async_coalesces_concurrent_calls(self):
+        flight = AsyncSingleFlight()
+        calls = list()
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            if key == "bad":
+                raise ValueError(key)
+            return key.upper()
+
+        results = await asyncio.gather(
+            *[flight.run(key, lambda key=key: fetch(key)) for key in ["a", "a", "b", "a"]],
+            *[flight.run("bad", lambda: fetch("bad")) for _ in range(2)],
+            return_exceptions=True,
+        )
+        assert results[:4] == ["A", "A", "B", "A"]
+        assert all(isinstance(r, ValueError) for r in results[4:])
+        assert sorted(calls) == ["a", "b", "bad"]
+        assert len(flight) == 0
+        # Completed calls are not reused
+        assert await flight.run("a", lambda: fetch("a")) == "A"
+        assert calls.count("a") == 2
+
+    def test_sync_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = list()
+        barrier = threading.Barrier(4)
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return "result"
+
+        def worker(_):
+            barrier.wait()
+            return flight.run("key", fetch)
+
+        assert list(bounded_map(worker, range(4), limit=4)) == ["result"] * 4
+        assert len(calls) == 1
+        assert len(flight) == 0
@@ -0,0 +1,84 @@
+"""Exclusive advisory file lock shared between processes.
+
+Uses ``fcntl.flock`` on POSIX systems and ``msvcrt.locking`` on Windows. The lock file is
+created if needed and left in place afterwards.
+
+``with lock:`` blocks the calling thread until the lock is free. ``async with lock:`` polls
+for it instead, so other tasks on the event loop keep running while it waits.
+"""
+
+import asyncio
+import os
+import time
+import typing as tp
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+class FileLock:
+    # Seconds between attempts while waiting for the lock in an event loop
+    poll_interval = 0.05
+
+    def __init__(self, path: tp.Union[str, Path]):
+        self.path = Path(path)
+        self._fd: tp.Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock. If `blocking` is False, return False at once if it is held elsewhere"""
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    return False
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:  # LK_LOCK gives up after 10 seconds
+                        if not blocking:
+                            os.close(fd)
+                            return False
+                        time.sleep(0.1)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "FileLock":
+        while not self.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
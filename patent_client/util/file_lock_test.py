@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from .file_lock import FileLock
+
+
+def test_non_blocking_acquire_fails_while_held(tmp_path):
+    path = tmp_path / "test.lock"
+    with FileLock(path):
+        other = FileLock(path)
+        assert not other.acquire(blocking=False)
+    assert other.acquire(blocking=False)
+    other.release()
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_keeps_event_loop_running(tmp_path):
+    path = tmp_path / "test.lock"
+    holder = FileLock(path)
+    holder.acquire()
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def release_later():
+        await asyncio.sleep(0.2)
+        holder.release()
+
+    ticker = asyncio.create_task(tick())
+    release = asyncio.create_task(release_later())
+    async with FileLock(path) as lock:
+        assert lock._fd is not None
+    await release
+    ticker.cancel()
+    # The loop kept running while the lock was held elsewhere
+    assert ticks > 5
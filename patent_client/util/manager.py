@@ -1,25 +1,91 @@
 from __future__ import annotations
 
-from collections import OrderedDict
-from copy import deepcopy
+from collections.abc import Mapping
+from copy import copy
 from enum import Enum
-from itertools import chain
-from typing import TYPE_CHECKING, AsyncIterator, Generic, Iterator, TypeVar, Union
+from itertools import chain, takewhile
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+)
 
 from typing_extensions import Self
 from yankee.data import Collection
 
+from .concurrency import DEFAULT_CONCURRENCY, abounded_map, bounded_map
+from .request_util import get_start_and_row_count
+
 if TYPE_CHECKING:
     pass
 
 ModelType = TypeVar("ModelType")
 
+# A page fetcher takes a (start, rows) pair and returns the items on that page along with the
+# total number of results, if the API reports it
+PageFetcher = Callable[[int, int], tuple[Iterable, Optional[int]]]
+AsyncPageFetcher = Callable[[int, int], Awaitable[tuple[Iterable, Optional[int]]]]
+
 
 class OrderDirection(str, Enum):
     ASC = "asc"
     DESC = "desc"
 
 
+def _freeze(value):
+    """Convert a value into a hashable equivalent, recursing into containers"""
+    if isinstance(value, Mapping):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+class FrozenDict(Mapping):
+    """Read-only, hashable, insertion-ordered mapping"""
+
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+        self._hash = None
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(_freeze(self._data))
+        return self._hash
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return (self.__class__, (self._data,))
+
+    def set(self, **kwargs) -> FrozenDict:
+        """Return a copy with the given keys set"""
+        return self.__class__({**self._data, **kwargs})
+
+
 class ManagerConfig:
     """
     Manager Configuration Class
@@ -27,37 +93,75 @@ class ManagerConfig:
     This class is designed to store and manage configuration settings for a manager object. It allows for the customization of query parameters and options to tailor data retrieval processes. The attributes of this class include:
 
     Attributes:
-        filter (OrderedDict[str, list]): An ordered dictionary to store filter conditions for queries. The keys represent the field names, and the values represent the filter criteria.
-        order_by (list[tuple[str, OrderDirection]]): A list of tuples specifying the ordering of query results. Each tuple contains a field name and the direction ('asc' for ascending, 'desc' for descending) of the sort.
-        options (dict[str, str]): A dictionary to store additional options that may affect the query or its results.
+        filter (FrozenDict[str, tuple]): An ordered mapping to store filter conditions for queries. The keys represent the field names, and the values are tuples of filter criteria.
+        order_by (tuple[str, ...]): A tuple specifying the ordering of query results. Each entry is a field name, optionally prefixed with '-' for a descending sort.
+        options (FrozenDict[str, Any]): A mapping to store additional options that may affect the query or its results.
         limit (int | None): An optional integer specifying the maximum number of results to return. If None, no limit is applied.
         offset (int): An integer specifying the offset from the start of the result set. Used for pagination.
-        annotations (list[tuple[str, str]]): A list of tuples for annotating the results with extra information. Each tuple contains a field name and an annotation.
+        annotations (tuple[tuple[str, str], ...]): A tuple of pairs for annotating the results with extra information. Each pair contains a field name and an annotation.
 
-    The class also includes a method for comparing two `ManagerConfig` instances for equality based on their attributes.
+    Configurations are immutable and hashable, so they can be shared between managers and used as cache keys. Use `replace` to get a copy with some fields changed; unchanged fields are shared with the original rather than copied.
     """
 
-    def __init__(self):
-        self.filter: OrderedDict[str, list] = OrderedDict()
-        self.order_by: list[tuple[str, OrderDirection]] = list()
-        self.options: dict[str, str] = dict()
-        self.limit: int | None = None
-        self.offset: int = 0
-        self.annotations: list[tuple[str, str]] = list()
+    __slots__ = ("filter", "order_by", "options", "limit", "offset", "annotations", "_hash")
+    _fields = ("filter", "order_by", "options", "limit", "offset", "annotations")
+
+    def __init__(
+        self,
+        filter: Mapping[str, Sequence] = FrozenDict(),
+        order_by: Sequence[str] = (),
+        options: Mapping[str, Any] = FrozenDict(),
+        limit: int | None = None,
+        offset: int = 0,
+        annotations: Sequence[tuple[str, str]] = (),
+    ):
+        if not isinstance(filter, FrozenDict):
+            filter = FrozenDict((k, tuple(v)) for k, v in filter.items())
+        if not isinstance(options, FrozenDict):
+            options = FrozenDict(options)
+        set_field = super().__setattr__
+        set_field("filter", filter)
+        set_field("order_by", tuple(order_by))
+        set_field("options", options)
+        set_field("limit", limit)
+        set_field("offset", offset)
+        set_field("annotations", tuple(annotations))
+        set_field("_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable; use .replace()")
+
+    def replace(self, **changes) -> ManagerConfig:
+        """Return a copy of this configuration with the given fields changed"""
+        fields = {name: getattr(self, name) for name in self._fields}
+        fields.update(changes)
+        return self.__class__(**fields)
+
+    def _astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._fields)
 
     def __eq__(self, other):
-        return (
-            self.filter == other.filter
-            and self.order_by == other.order_by
-            and self.options == other.options
-            and self.limit == other.limit
-            and self.offset == other.offset
-            and self.annotations == other.annotations
-        )
+        if not isinstance(other, ManagerConfig):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __hash__(self):
+        if self._hash is None:
+            super().__setattr__("_hash", hash(_freeze(self._astuple())))
+        return self._hash
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{self.__class__.__name__}({fields})"
+
+    def __reduce__(self):
+        return (self.__class__, self._astuple())
 
 
 class BaseManager(Collection, Generic[ModelType]):
     default_filter: str = ""
+    # Number of pages requested ahead of the page being consumed. Override with .option(prefetch=n)
+    prefetch: int = 2
 
     def __init__(self, config=None):
         self.config = config or ManagerConfig()
@@ -70,49 +174,40 @@ class BaseManager(Collection, Generic[ModelType]):
 
     # Manager Modification Functions
 
+    def _replace_config(self, **changes) -> Self:
+        """Return a shallow copy of this manager with the given config fields changed"""
+        mger = copy(self)
+        mger.config = self.config.replace(**changes)
+        return mger
+
     def filter(self, *args, **kwargs) -> Self:
         """Apply a new filtering condition"""
-        mger = deepcopy(self)
         if args:
             kwargs[self.default_filter] = args
 
+        filters = dict(self.config.filter)
         for key, value in kwargs.items():
             if isinstance(value, (str, dict, int, float)):
-                kwargs[key] = [value]
-            else:
-                kwargs[key] = list(value)
+                value = (value,)
+            filters[key] = filters.get(key, ()) + tuple(value)
 
-        for key, value in kwargs.items():
-            if key in mger.config.filter:
-                mger.config.filter[key].extend(value)
-            else:
-                mger.config.filter[key] = value
-
-        return mger
+        return self._replace_config(filter=FrozenDict(filters))
 
     def order_by(self, *args) -> Self:
         """Specify the order that argument should be returned in"""
-        mger = deepcopy(self)
-        mger.config.order_by = args
-        return mger
+        return self._replace_config(order_by=args)
 
     def option(self, **kwargs) -> Self:
         """Set a key:value option on the manager"""
-        mger = deepcopy(self)
-        mger.config.options = {**mger.config.options, **kwargs}
-        return mger
+        return self._replace_config(options=self.config.options.set(**kwargs))
 
     def limit(self, limit) -> Self:
         """Limit the number of records that are returned"""
-        mger = deepcopy(self)
-        mger.config.limit = limit
-        return mger
+        return self._replace_config(limit=limit)
 
     def offset(self, offset) -> Self:
         """Specify the number of records from the beginning from which to apply an offset"""
-        mger = deepcopy(self)
-        mger.config.offset = self.config.offset + offset
-        return mger
+        return self._replace_config(offset=self.config.offset + offset)
 
     # Basic Manager Fetching
 
@@ -174,6 +269,44 @@ class Manager(BaseManager, Generic[ModelType]):
         """Get the first object in the manager"""
         return next(self.limit(1).__iter__())
 
+    def _paginate(self, fetch_page: PageFetcher, page_size: int) -> Iterator:
+        """Yield items from consecutive pages of a paged API, honoring the limit and offset
+
+        The first page is fetched on its own. If it reports a total, only pages within that
+        total are requested. Later pages are fetched up to `prefetch` pages ahead of the page
+        being consumed. Iteration stops at the first short page, and any outstanding page
+        requests are cancelled when iteration stops. A page may be a lazy iterator, so its
+        items are only built as they are consumed.
+        """
+        pages = get_start_and_row_count(self.config.limit, self.config.offset, page_size)
+        start, rows = next(pages)
+        items, total = fetch_page(start, rows)
+        count = 0
+        for item in items:
+            count += 1
+            yield item
+        if count < rows:
+            return
+        if total is not None:
+            pages = takewhile(lambda page: page[0] < total, pages)
+
+        def fetch(page):
+            start, rows = page
+            return rows, fetch_page(start, rows)[0]
+
+        depth = self.config.options.get("prefetch", self.prefetch)
+        results = bounded_map(fetch, pages, limit=depth + 1)
+        try:
+            for rows, items in results:
+                count = 0
+                for item in items:
+                    count += 1
+                    yield item
+                if count < rows:
+                    break
+        finally:
+            results.close()
+
     def get(self, *args, **kwargs) -> ModelType:
         """If the critera results in a single record, return it, else raise an exception"""
         mger = self.filter(*args, **kwargs)
@@ -184,6 +317,21 @@ class Manager(BaseManager, Generic[ModelType]):
             raise ValueError("No documents found!")
         return mger.first()
 
+    def get_many(
+        self, numbers: Iterable, concurrency: int = DEFAULT_CONCURRENCY
+    ) -> list[Union[ModelType, Exception]]:
+        """Look up several records with `get`, running up to `concurrency` lookups at once
+
+        Results are returned in the same order as `numbers`. A lookup that fails is returned
+        as the exception it raised, so one bad number does not abort the batch. Repeated
+        numbers are only looked up once.
+        """
+        numbers = list(numbers)
+        unique = list(dict.fromkeys(numbers))
+        results = bounded_map(self.get, unique, limit=concurrency, return_exceptions=True)
+        by_number = dict(zip(unique, results))
+        return [by_number[number] for number in numbers]
+
 
 class AsyncManager(BaseManager, Generic[ModelType]):
     """
@@ -250,6 +398,44 @@ class AsyncManager(BaseManager, Generic[ModelType]):
             async for doc in self.limit(1):
                 return doc
 
+    async def _paginate(self, fetch_page: AsyncPageFetcher, page_size: int) -> AsyncIterator:
+        """Yield items from consecutive pages of a paged API, honoring the limit and offset
+
+        The first page is fetched on its own. If it reports a total, only pages within that
+        total are requested. Later pages are fetched up to `prefetch` pages ahead of the page
+        being consumed. Iteration stops at the first short page, and any outstanding page
+        requests are cancelled when iteration stops. A page may be a lazy iterator, so its
+        items are only built as they are consumed.
+        """
+        pages = get_start_and_row_count(self.config.limit, self.config.offset, page_size)
+        start, rows = next(pages)
+        items, total = await fetch_page(start, rows)
+        count = 0
+        for item in items:
+            count += 1
+            yield item
+        if count < rows:
+            return
+        if total is not None:
+            pages = takewhile(lambda page: page[0] < total, pages)
+
+        async def fetch(page):
+            start, rows = page
+            return rows, (await fetch_page(start, rows))[0]
+
+        depth = self.config.options.get("prefetch", self.prefetch)
+        results = abounded_map(fetch, pages, limit=depth + 1)
+        try:
+            async for rows, items in results:
+                count = 0
+                for item in items:
+                    count += 1
+                    yield item
+                if count < rows:
+                    break
+        finally:
+            await results.aclose()
+
     async def get(self, *args, **kwargs) -> ModelType:
         """If the critera results in a single record, return it, else raise an exception"""
         mger = self.filter(*args, **kwargs)
@@ -260,6 +446,21 @@ class AsyncManager(BaseManager, Generic[ModelType]):
             raise ValueError("No documents found!")
         return await mger.first()
 
+    async def get_many(
+        self, numbers: Iterable, concurrency: int = DEFAULT_CONCURRENCY
+    ) -> list[Union[ModelType, Exception]]:
+        """Look up several records with `get`, running up to `concurrency` lookups at once
+
+        Results are returned in the same order as `numbers`. A lookup that fails is returned
+        as the exception it raised, so one bad number does not abort the batch. Repeated
+        numbers are only looked up once.
+        """
+        numbers = list(numbers)
+        unique = list(dict.fromkeys(numbers))
+        results = abounded_map(self.get, unique, limit=concurrency, return_exceptions=True)
+        by_number = dict(zip(unique, [result async for result in results]))
+        return [by_number[number] for number in numbers]
+
     async def to_list(self) -> list[ModelType]:
         """Return a list of all objects in the manager"""
         return [item async for item in self]
@@ -0,0 +1,162 @@
+import asyncio
+import pickle
+from copy import deepcopy
+
+import pytest
+
+from .manager import AsyncManager, Manager, ManagerConfig
+
+TOTAL = 95
+
+
+class FakeAsyncManager(AsyncManager):
+    page_size = 10
+
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.requested = list()
+
+    async def fetch_page(self, start, rows):
+        self.requested.append(start)
+        await asyncio.sleep(0.001)
+        return list(range(start, min(start + rows, TOTAL))), None
+
+    async def _get_results(self):
+        async for item in self._paginate(self.fetch_page, self.page_size):
+            yield item
+
+
+class FakeManager(Manager):
+    page_size = 10
+
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.requested = list()
+
+    def fetch_page(self, start, rows):
+        self.requested.append(start)
+        return list(range(start, min(start + rows, TOTAL))), TOTAL
+
+    def _get_results(self):
+        yield from self._paginate(self.fetch_page, self.page_size)
+
+
+class TestAsyncPaginate:
+    @pytest.mark.asyncio
+    async def test_yields_all_pages_in_order(self):
+        assert await FakeAsyncManager().option(prefetch=3).to_list() == list(range(TOTAL))
+
+    @pytest.mark.asyncio
+    async def test_honors_limit_and_offset(self):
+        manager = FakeAsyncManager().offset(5).limit(23)
+        assert await manager.to_list() == list(range(5, 28))
+
+    @pytest.mark.asyncio
+    async def test_stops_after_short_page(self):
+        manager = FakeAsyncManager().option(prefetch=2)
+        await manager.to_list()
+        # The short page at 90 is followed by at most `prefetch` speculative requests
+        assert max(manager.requested) <= 110
+
+    @pytest.mark.asyncio
+    async def test_closing_cancels_prefetch(self):
+        manager = FakeAsyncManager().option(prefetch=2)
+        results = manager._get_results()
+        assert [await results.__anext__() for _ in range(15)] == list(range(15))
+        await results.aclose()
+        await asyncio.sleep(0.01)
+        assert max(manager.requested) <= 30
+
+
+class TestPaginate:
+    def test_yields_all_pages_in_order(self):
+        assert list(iter(FakeManager().option(prefetch=3))) == list(range(TOTAL))
+
+    def test_stops_at_reported_total(self):
+        manager = FakeManager().option(prefetch=4)
+        list(iter(manager))
+        assert sorted(manager.requested) == list(range(0, TOTAL, 10))
+
+    def test_honors_limit_and_offset(self):
+        assert list(iter(FakeManager().offset(5).limit(23))) == list(range(5, 28))
+
+
+class TestManagerConfig:
+    def test_is_immutable(self):
+        config = ManagerConfig()
+        with pytest.raises(AttributeError):
+            config.limit = 5
+        with pytest.raises(TypeError):
+            config.filter["appl_id"] = ("123",)
+
+    def test_chained_calls_copy_on_write(self):
+        base = FakeManager().filter(appl_id="1").option(prefetch=1)
+        mger = base.filter(appl_id="3").order_by("-date").limit(5).offset(2)
+        assert base.config.filter == {"appl_id": ("1",)}
+        assert base.config.limit is None
+        assert mger.config.filter == {"appl_id": ("1", "3")}
+        assert mger.config.order_by == ("-date",)
+        assert (mger.config.limit, mger.config.offset) == (5, 2)
+        # Unchanged fields are shared, not copied
+        assert mger.config.options is base.config.options
+
+    def test_filter_extends_existing_values(self):
+        mger = FakeManager().filter(appl_id="1").filter(appl_id=["2", "3"])
+        assert mger.config.filter["appl_id"] == ("1", "2", "3")
+
+    def test_equal_configs_hash_equal(self):
+        a = FakeManager().filter(query={"q": ["x"]}).option(sources=["USPAT"]).limit(3)
+        b = FakeManager().limit(3).option(sources=["USPAT"]).filter(query={"q": ["x"]})
+        assert a.config == b.config
+        assert hash(a.config) == hash(b.config)
+        assert {a.config: 1}[b.config] == 1
+        assert a.config != a.limit(4).config
+
+    def test_copy_and_pickle(self):
+        config = FakeManager().filter(appl_id="1").option(prefetch=1).config
+        assert deepcopy(config) == config
+        assert pickle.loads(pickle.dumps(config)) == config
+
+
+class LookupAsyncManager(AsyncManager):
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.looked_up = list()
+
+    async def get(self, number):
+        self.looked_up.append(number)
+        await asyncio.sleep(0.001 * (len(number) % 3))
+        if number == "bad":
+            raise ValueError(number)
+        return f"doc-{number}"
+
+
+class LookupManager(Manager):
+    def __init__(self, config=None):
+        super().__init__(config=config)
+        self.looked_up = list()
+
+    def get(self, number):
+        self.looked_up.append(number)
+        if number == "bad":
+            raise ValueError(number)
+        return f"doc-{number}"
+
+
+class TestGetMany:
+    @pytest.mark.asyncio
+    async def test_async_get_many(self):
+        manager = LookupAsyncManager()
+        results = await manager.get_many(["1", "22", "bad", "333", "1"], concurrency=3)
+        assert results[:2] == ["doc-1", "doc-22"]
+        assert isinstance(results[2], ValueError)
+        assert results[3:] == ["doc-333", "doc-1"]
+        assert sorted(manager.looked_up) == ["1", "22", "333", "bad"]
+
+    def test_get_many(self):
+        manager = LookupManager()
+        results = manager.get_many(iter(["1", "bad", "2", "2"]), concurrency=2)
+        assert results[0] == "doc-1"
+        assert isinstance(results[1], ValueError)
+        assert results[2:] == ["doc-2", "doc-2"]
+        assert sorted(manager.looked_up) == ["1", "2", "bad"]
@@ -0,0 +1,150 @@
+"""In-process metrics for upstream HTTP traffic.
+
+``metrics`` is the shared registry. PatentClientSession records every request it sends,
+keyed by host and endpoint template. The template is the URL path with any segment that
+contains a digit replaced by ``{}``, so ``/applications/16123456/documents`` and
+``/applications/17000000/documents`` are counted together.
+
+``metrics.snapshot()`` returns the counters as plain dicts. ``metrics.start_periodic_log``
+writes the snapshot to the ``patent_client`` logger at a fixed interval.
+"""
+
+import json
+import logging
+import re
+import threading
+import typing as tp
+from collections import Counter
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("patent_client.metrics")
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+ID_SEGMENT_RE = re.compile(r"[^/]*\d[^/]*")
+
+
+def endpoint_template(path: str) -> str:
+    """Collapse path segments that look like identifiers into '{}'"""
+    return ID_SEGMENT_RE.sub("{}", path)
+
+
+class Histogram:
+    def __init__(self, buckets: tp.Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): n for bound, n in zip(self.buckets, self.counts)},
+        }
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.counters: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.latency = Histogram()
+
+    def snapshot(self) -> dict:
+        return {
+            **self.counters,
+            "statuses": dict(self.statuses),
+            "latency": self.latency.snapshot(),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms per upstream host and endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: tp.Dict[tp.Tuple[str, str], EndpointMetrics] = dict()
+        self._log_thread: tp.Optional[threading.Thread] = None
+        self._stop_logging = threading.Event()
+
+    def _endpoint(self, url) -> EndpointMetrics:
+        parts = urlsplit(str(url))
+        key = (parts.hostname or "", endpoint_template(parts.path))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = EndpointMetrics()
+        return endpoint
+
+    def record_response(
+        self,
+        url,
+        status_code: int,
+        elapsed: float,
+        bytes_out: int = 0,
+        bytes_in: int = 0,
+        cache: tp.Optional[str] = None,
+    ) -> None:
+        """Record an upstream response. cache is "hit", "miss", "revalidated" or None"""
+        with self._lock:
+            endpoint = self._endpoint(url)
+            endpoint.counters["requests"] += 1
+            endpoint.counters["bytes_out"] += bytes_out
+            endpoint.counters["bytes_in"] += bytes_in
+            if cache is not None:
+                endpoint.counters[f"cache_{cache}"] += 1
+            if 400 <= status_code < 500:
+                endpoint.counters["errors_4xx"] += 1
+            elif status_code >= 500:
+                endpoint.counters["errors_5xx"] += 1
+            endpoint.statuses[status_code] += 1
+            endpoint.latency.observe(elapsed)
+
+    def increment(self, url, counter: str, amount: int = 1) -> None:
+        """Increment a named counter, e.g. "retries", "coalesced" or "transport_errors" """
+        with self._lock:
+            self._endpoint(url).counters[counter] += amount
+
+    def snapshot(self) -> dict:
+        """Return {host: {endpoint: metrics}} along with per-counter totals under "totals" """
+        with self._lock:
+            hosts: tp.Dict[str, dict] = dict()
+            totals: Counter = Counter()
+            for (host, path), endpoint in sorted(self._endpoints.items()):
+                hosts.setdefault(host, dict())[path] = endpoint.snapshot()
+                totals.update(endpoint.counters)
+            return {"hosts": hosts, "totals": dict(totals)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+    def log_snapshot(self, level: int = logging.INFO) -> None:
+        logger.log(level, "HTTP metrics: %s", json.dumps(self.snapshot()))
+
+    def start_periodic_log(self, interval: float) -> None:
+        """Log a snapshot every interval seconds from a daemon thread"""
+        if self._log_thread is not None and self._log_thread.is_alive():
+            return
+        self._stop_logging.clear()
+
+        def run():
+            while not self._stop_logging.wait(interval):
+                self.log_snapshot()
+
+        self._log_thread = threading.Thread(target=run, name="patent_client-metrics", daemon=True)
+        self._log_thread.start()
+
+    def stop_periodic_log(self) -> None:
+        self._stop_logging.set()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,47 @@
+import json
+import logging
+
+from .metrics import MetricsRegistry, endpoint_template
+
+
+def test_endpoint_template():
+    assert endpoint_template("/api/v1/applications/16123456/documents") == (
+        "/api/{}/applications/{}/documents"
+    )
+    assert endpoint_template(
+        "/3.2/rest-services/published-data/publication/docdb/EP1234567A1/biblio"
+    ) == ("/{}/rest-services/published-data/publication/docdb/{}/biblio")
+
+
+def test_record_and_snapshot():
+    registry = MetricsRegistry()
+    registry.record_response("https://example.com/biblio/1", 200, 0.02, bytes_in=10, cache="miss")
+    registry.record_response("https://example.com/biblio/2", 200, 0.3, bytes_in=10, cache="hit")
+    registry.record_response("https://example.com/biblio/3", 404, 0.3, bytes_out=5)
+    registry.record_response("https://other.com/search", 503, 12.0)
+    registry.increment("https://other.com/search", "retries")
+
+    snapshot = registry.snapshot()
+    biblio = snapshot["hosts"]["example.com"]["/biblio/{}"]
+    assert biblio["requests"] == 3
+    assert (biblio["cache_hit"], biblio["cache_miss"], biblio["errors_4xx"]) == (1, 1, 1)
+    assert (biblio["bytes_in"], biblio["bytes_out"]) == (20, 5)
+    assert biblio["statuses"] == {200: 2, 404: 1}
+    assert biblio["latency"]["count"] == 3
+    assert biblio["latency"]["buckets"]["0.05"] == 1
+    assert biblio["latency"]["buckets"]["0.5"] == 2
+    assert snapshot["totals"]["errors_5xx"] == 1
+    assert snapshot["totals"]["retries"] == 1
+    assert snapshot["totals"]["requests"] == 4
+
+    registry.reset()
+    assert registry.snapshot() == {"hosts": {}, "totals": {}}
+
+
+def test_log_snapshot(caplog):
+    registry = MetricsRegistry()
+    registry.record_response("https://example.com/search", 200, 0.1)
+    with caplog.at_level(logging.INFO, logger="patent_client.metrics"):
+        registry.log_snapshot()
+    message = caplog.records[-1].getMessage()
+    assert json.loads(message.split(": ", 1)[1])["totals"]["requests"] == 1
@@ -0,0 +1,100 @@
+"""Retry policies for transient upstream errors.
+
+A RetryPolicy decides whether a failed request is tried again and how long to wait first.
+Responses are retried when their status code is listed in ``statuses``, which also caps the
+number of retries for that status. Connection resets and timeouts are retried up to
+``connection_retries`` times.
+
+When the server says how long to wait, through ``Retry-After`` or one of the vendor headers
+in ``retry_after_headers``, that delay is used. Otherwise the delay grows exponentially from
+``backoff`` up to ``max_backoff``, with random jitter so that concurrent clients spread out.
+No retry is attempted once ``deadline`` seconds have passed since the first attempt.
+
+Only requests whose method is in ``methods`` are retried. POST is left out because it isn't
+always safe to send twice. Read-only POSTs, such as searches, opt in by setting the
+``idempotent`` request extension.
+
+The connection pool also retries failed connection attempts (``retries=3`` on the
+transport). Those happen before anything is sent, so they apply to every method and stack
+with ``connection_retries``, which covers errors on an established connection.
+"""
+
+import datetime
+import random
+import typing as tp
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+DEFAULT_RETRY_STATUSES: tp.Dict[int, int] = {
+    429: 8,  # Too Many Requests
+    500: 2,
+    502: 4,
+    503: 6,  # Service Unavailable, usually maintenance or throttling
+    504: 4,
+}
+
+RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class RetryPolicy(tp.NamedTuple):
+    statuses: tp.Mapping[int, int] = DEFAULT_RETRY_STATUSES
+    connection_retries: int = 3
+    backoff: float = 1.0
+    max_backoff: float = 60.0
+    jitter: float = 0.5
+    deadline: tp.Optional[float] = 600.0
+    methods: tp.Tuple[str, ...] = ("GET", "HEAD", "OPTIONS")
+    retry_after_headers: tp.Tuple[str, ...] = (
+        "Retry-After",
+        "X-Rate-Limit-Retry-After-Seconds",  # USPTO Public Search
+        "X-RateLimit-Reset-After",
+    )
+
+    def retries_for(self, request: httpx.Request, status_code: tp.Optional[int] = None) -> int:
+        """Maximum number of retries for a status code, or for a connection error if None"""
+        if request.method not in self.methods and not request.extensions.get("idempotent"):
+            return 0
+        if status_code is None:
+            return self.connection_retries
+        return self.statuses.get(status_code, 0)
+
+    def retry_after(self, response: httpx.Response) -> tp.Optional[float]:
+        """Seconds the server asked us to wait, if it said so"""
+        for header in self.retry_after_headers:
+            value = response.headers.get(header)
+            if value is None:
+                continue
+            delay = parse_retry_after(value)
+            if delay is not None:
+                return delay
+        return None
+
+    def delay(self, attempt: int, response: tp.Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry number `attempt` (starting at 1)"""
+        if response is not None:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                return retry_after
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+def parse_retry_after(value: str) -> tp.Optional[float]:
+    """Parse a delay in seconds or an HTTP date into seconds from now"""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (when - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+NO_RETRY = RetryPolicy(statuses=dict(), connection_retries=0)
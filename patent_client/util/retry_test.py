@@ -0,0 +1,38 @@
+import datetime
+from email.utils import format_datetime
+
+import httpx
+
+from .retry import RetryPolicy, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("-5") == 0
+    assert parse_retry_after("soon") is None
+    when = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+
+
+def test_delay_prefers_server_hint():
+    policy = RetryPolicy(backoff=1, max_backoff=8, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 8, 8]
+    response = httpx.Response(429, headers={"x-rate-limit-retry-after-seconds": "7"})
+    assert policy.delay(1, response) == 7
+
+
+def test_jitter_shortens_delay():
+    policy = RetryPolicy(backoff=10, jitter=0.5)
+    assert all(5 <= policy.delay(1) <= 10 for _ in range(50))
+
+
+def test_retries_for():
+    policy = RetryPolicy(statuses={503: 2}, connection_retries=1, methods=("GET",))
+    get = httpx.Request("GET", "https://example.com")
+    assert policy.retries_for(get, 503) == 2
+    assert policy.retries_for(get, 404) == 0
+    assert policy.retries_for(get) == 1
+    assert policy.retries_for(httpx.Request("DELETE", "https://example.com"), 503) == 0
+    search = httpx.Request("POST", "https://example.com", extensions={"idempotent": True})
+    assert policy.retries_for(search, 503) == 2
+    assert RetryPolicy().retries_for(httpx.Request("POST", "https://example.com"), 503) == 0
@@ -0,0 +1,185 @@
+"""Size-bounded key/value store for cached HTTP responses, backed by a single SQLite file.
+
+The database runs in WAL mode, so readers never block the writer. Each process and thread
+opens its own connection, which makes one cache file safe to share between worker
+processes. The total size of the stored values is kept in a one-row table by triggers.
+When it exceeds ``max_bytes``, the least recently used entries are evicted.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing as tp
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (id, total_bytes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE stats SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+"""
+
+
+class ThreadLocalConnection:
+    """Opens one connection to a WAL-mode SQLite database per thread and process
+
+    Connections can't be shared across threads or inherited over a fork, so each thread
+    (and each process after a fork) gets its own, created on first use along with the
+    tables in ``schema``.
+    """
+
+    def __init__(self, path: tp.Union[str, Path], schema: str):
+        self.path = Path(path)
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._local.connection = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def close(self) -> None:
+        """Close the connection of the calling thread, if it has one"""
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+
+class SQLiteCache:
+    """A least-recently-used byte store in a WAL-mode SQLite database
+
+    Args:
+        path: Location of the database file. Parent directories are created as needed.
+        max_bytes: Byte budget for stored values. None disables eviction.
+        touch_interval: Minimum number of seconds between access-time updates for one entry.
+            This keeps lookups from turning into a write on every cache hit.
+        evict_to: Fraction of ``max_bytes`` to evict down to once the budget is exceeded,
+            so eviction runs in batches rather than on every write.
+    """
+
+    def __init__(
+        self,
+        path: tp.Union[str, Path],
+        max_bytes: tp.Optional[int] = None,
+        touch_interval: float = 60.0,
+        evict_to: float = 0.9,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.evict_to = evict_to
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._connections = ThreadLocalConnection(self.path, SCHEMA)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, key: str, ttl: tp.Optional[float] = None) -> tp.Optional[bytes]:
+        """Return the value stored at key, or None if it is missing or older than ttl seconds"""
+        row = self.connection.execute(
+            "SELECT data, created_at, accessed_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, created_at, accessed_at = row
+        now = time.time()
+        if ttl is not None and created_at + ttl < now:
+            self.delete(key)
+            return None
+        if accessed_at + self.touch_interval < now:
+            self.connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        """Store a value, replacing any existing value at key"""
+        now = time.time()
+        self.connection.execute(
+            "INSERT INTO responses (key, data, size, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET data = excluded.data, size = excluded.size, "
+            "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+            (key, data, len(data), now, now),
+        )
+        self.evict()
+
+    def update(self, key: str, data: bytes) -> bool:
+        """Replace the value at key without resetting its age. Returns False if key is missing"""
+        cursor = self.connection.execute(
+            "UPDATE responses SET data = ?, size = ?, accessed_at = ? WHERE key = ?",
+            (data, len(data), time.time(), key),
+        )
+        if cursor.rowcount:
+            self.evict()
+        return bool(cursor.rowcount)
+
+    def delete(self, key: str) -> None:
+        self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self.connection.execute("DELETE FROM responses")
+
+    @property
+    def total_bytes(self) -> int:
+        return self.connection.execute("SELECT total_bytes FROM stats WHERE id = 0").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the store is back under its byte budget"""
+        if self.max_bytes is None or self.total_bytes <= self.max_bytes:
+            return 0
+        excess = self.total_bytes - int(self.max_bytes * self.evict_to)
+        conn = self.connection
+        keys = list()
+        cursor = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+        for key, size in cursor:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+        cursor.close()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        logger.debug("Evicted %s entries from %s", len(keys), self.path)
+        return len(keys)
+
+    def close(self) -> None:
+        self._connections.close()
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .sqlite_cache import SQLiteCache, ThreadLocalConnection
+
+
+def test_set_get_and_update(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite")
+    assert cache.get("missing") is None
+    cache.set("a", b"first")
+    assert cache.get("a") == b"first"
+    assert cache.update("a", b"second")
+    assert cache.get("a") == b"second"
+    assert not cache.update("b", b"data")
+    assert cache.total_bytes == len(b"second")
+    cache.delete("a")
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
+
+
+def test_ttl(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite")
+    cache.set("a", b"data")
+    assert cache.get("a", ttl=60) == b"data"
+    time.sleep(0.02)
+    assert cache.get("a", ttl=0.01) is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=350, touch_interval=0)
+    for key in "abc":
+        cache.set(key, b"x" * 100)
+        time.sleep(0.01)
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") is not None
+    cache.set("d", b"x" * 100)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.total_bytes <= 350
+
+
+def test_shared_between_connections(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    writer = SQLiteCache(path)
+
+    def write(i):
+        writer.set(str(i), str(i).encode())
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(write, range(100)))
+    reader = SQLiteCache(path)
+    assert len(reader) == 100
+    assert reader.get("42") == b"42"
+    assert reader.total_bytes == sum(len(str(i)) for i in range(100))
+
+
+def test_one_wal_connection_per_thread(tmp_path):
+    connections = ThreadLocalConnection(
+        tmp_path / "data.sqlite", "CREATE TABLE IF NOT EXISTS t (x);"
+    )
+    conn = connections.get()
+    assert connections.get() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with ThreadPoolExecutor(1) as executor:
+        other = executor.submit(connections.get).result()
+    assert other is not conn
+    connections.close()
+    assert connections.get() is not conn
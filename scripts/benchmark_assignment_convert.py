@@ -0,0 +1,89 @@
+"""Compare the streaming Assignment XML converter with whole-tree parsing.
+
+Usage: python scripts/benchmark_assignment_convert.py [--file page.xml] [--copies 50] [--runs 5]
+
+The input is an Assignment API response, by default the largest test fixture with its docs
+repeated ``--copies`` times to make a large page. Both converters run on the same bytes, and
+the script reports the median time and peak traced memory of each, and checks that their
+output is identical.
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import lxml.etree as ET
+
+from patent_client._async.uspto.assignment.convert import (
+    convert_doc,
+    convert_xml_to_json,
+    iter_xml_docs,
+)
+
+FIXTURE = (
+    Path(__file__).parent.parent
+    / "patent_client"
+    / "_async"
+    / "uspto"
+    / "assignment"
+    / "fixtures"
+    / "assignment_3.xml"
+)
+
+
+def tree_convert(xml_text: bytes) -> dict:
+    """The previous converter, which parses the whole response first"""
+    tree = ET.fromstring(xml_text)
+    num_found = tree.find(".//result")
+    return {
+        "numFound": num_found.attrib["numFound"] if num_found is not None else 0,
+        "docs": [convert_doc(doc) for doc in tree.findall(".//result/doc")],
+    }
+
+
+def stream_convert(xml_text: bytes) -> int:
+    # Count rather than keep the docs, as a consumer of the stream would
+    _, docs = iter_xml_docs(xml_text)
+    return sum(1 for _ in docs)
+
+
+def make_page(xml_text: bytes, copies: int) -> bytes:
+    tree = ET.fromstring(xml_text)
+    result = tree.find(".//result")
+    docs = result.findall("doc")
+    for _ in range(copies - 1):
+        for doc in docs:
+            result.append(ET.fromstring(ET.tostring(doc)))
+    return ET.tostring(tree)
+
+
+def measure(func, xml_text: bytes, runs: int):
+    times = list()
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(xml_text)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(xml_text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", type=Path, default=FIXTURE)
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    xml_text = make_page(args.file.read_bytes(), args.copies)
+    if convert_xml_to_json(xml_text) != tree_convert(xml_text):
+        raise SystemExit("The converters disagree!")
+    num_docs = len(ET.fromstring(xml_text).findall(".//result/doc"))
+    print(f"{num_docs} docs, {len(xml_text) / 1e6:.1f} MB")
+    for name, func in (("tree", tree_convert), ("stream", stream_convert)):
+        median, peak = measure(func, xml_text, args.runs)
+        print(f"{name:>6}: median {median * 1000:.1f} ms, peak memory {peak / 1e6:.1f} MB")
@@ -0,0 +1,45 @@
+"""Measure how long `import patent_client` takes in a fresh interpreter.
+
+Usage: python scripts/benchmark_import.py [--module patent_client] [--runs 10] [--max-ms 1000]
+
+Each run starts a new Python process with ``-X importtime`` and reads the cumulative import
+time of the module from its report. With ``--max-ms``, the script exits with status 1 when the
+median is over budget, so it can guard the import time in CI.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def import_time_us(module: str) -> int:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in reversed(result.stderr.splitlines()):
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        if name == module:
+            return int(cumulative)
+    raise RuntimeError(f"{module} missing from the import time report")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="patent_client")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    times_ms = [import_time_us(args.module) / 1000 for _ in range(args.runs)]
+    median = statistics.median(times_ms)
+    print(
+        f"import {args.module}: median {median:.1f} ms, "
+        f"min {min(times_ms):.1f} ms, max {max(times_ms):.1f} ms over {args.runs} runs"
+    )
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"Over budget of {args.max_ms:.1f} ms")
+        sys.exit(1)
@@ -23,12 +23,16 @@ SUBS = [
     ("AsyncByteStream", "ByteStream"),
     ("AsyncHTTPTransport", "HTTPTransport"),
     ("AsyncFileStorage", "FileStorage"),
+    ("AsyncBaseStorage", "BaseStorage"),
+    ("AsyncCacheStorage", "CacheStorage"),
     ("AsyncCacheConnectionPool", "CacheConnectionPool"),
     ("handle_async_request", "handle_request"),
     ("aread", "read"),
     ("aclose", "close"),
     ("asleep", "sleep"),
     ("AsyncLock", "Lock"),
+    ("abounded_map", "bounded_map"),
+    ("AsyncSingleFlight", "SingleFlight"),
     (
         "from httpcore._async.interfaces import AsyncRequestInterface",
         "from httpcore._sync.interfaces import RequestInterface",